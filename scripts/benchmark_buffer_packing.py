@@ -0,0 +1,127 @@
+"""Compares the NumPy buffer packer against the per-pixel packing of the Waveshare drivers.
+
+Usage: python scripts/benchmark_buffer_packing.py
+
+Reports the time per frame of both packers for every buffer layout and panel size, and fails
+if the packed buffers differ.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from display.buffer_packing import pack_pixels, pack_color_planes, get_blank_plane
+
+RESOLUTIONS = [
+    [800, 480],   # Waveshare 7.5" / 7.3"
+    [1304, 984],  # Waveshare 12.48"
+]
+# layout name, number of palette colours
+LAYOUTS = [("1 bit", 2), ("2 bit", 4), ("4 bit", 7), ("bi-colour planes", 3)]
+ITERATIONS = 3
+
+
+def driver_pack_1bit(image):
+    """Packs a 1 bit image the way the Waveshare black and white drivers' getbuffer does."""
+    width, height = image.size
+    line_width = width // 8 + (width % 8 != 0)
+    buf = [0xFF] * (line_width * height)
+    pixels = image.convert("1").load()
+    for y in range(height):
+        for x in range(width):
+            if pixels[x, y] == 0:
+                buf[x // 8 + y * line_width] &= ~(0x80 >> (x % 8))
+    return buf
+
+
+def driver_pack_2bit(indices):
+    """Packs palette indices the way the Waveshare 4 colour drivers' getbuffer does."""
+    flat = indices.tobytes()
+    buf = [0x00] * (len(flat) // 4)
+    for i in range(0, len(flat), 4):
+        buf[i // 4] = (flat[i] << 6) + (flat[i + 1] << 4) + (flat[i + 2] << 2) + flat[i + 3]
+    return buf
+
+
+def driver_pack_4bit(indices):
+    """Packs palette indices the way the Waveshare 7 colour drivers' getbuffer does."""
+    flat = indices.tobytes()
+    buf = [0x00] * (len(flat) // 2)
+    for i in range(0, len(flat), 2):
+        buf[i // 2] = (flat[i] << 4) + flat[i + 1]
+    return buf
+
+
+def driver_pack_planes(indices):
+    """Splits and packs a bi-colour frame like split_color_planes and the drivers' getbuffer did."""
+    image = Image.fromarray(indices, "L")
+    black_image = image.point(lambda index: 0 if index == 0 else 255, "1")
+    color_image = image.point(lambda index: 0 if index == 2 else 255, "1")
+    return driver_pack_1bit(black_image), driver_pack_1bit(color_image)
+
+
+def driver_pack(layout, indices):
+    if layout == "1 bit":
+        return [driver_pack_1bit(Image.fromarray((indices * 255).astype(np.uint8), "L"))]
+    if layout == "2 bit":
+        return [driver_pack_2bit(indices)]
+    if layout == "4 bit":
+        return [driver_pack_4bit(indices)]
+    return list(driver_pack_planes(indices))
+
+
+def numpy_pack(layout, indices):
+    if layout == "1 bit":
+        return [pack_pixels(indices, 1)]
+    if layout == "2 bit":
+        return [pack_pixels(indices, 2)]
+    if layout == "4 bit":
+        return [pack_pixels(indices, 4)]
+    return list(pack_color_planes(indices))
+
+
+def measure(packer, *args):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        result = packer(*args)
+    return result, (time.perf_counter() - start) / ITERATIONS
+
+
+def synthetic_indices(size, colours):
+    """Bands of every palette colour plus noise, like a dithered frame."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    indices = (np.arange(width)[np.newaxis, :] * colours // width).repeat(height, axis=0)
+    noise = rng.random((height, width)) < 0.2
+    indices[noise] = rng.integers(0, colours, noise.sum())
+    return indices.astype(np.uint8)
+
+
+def main():
+    print(f"{'resolution':>10} {'layout':>16} {'driver ms':>10} {'numpy ms':>9} {'speedup':>8}")
+    failed = False
+    for resolution in RESOLUTIONS:
+        for layout, colours in LAYOUTS:
+            indices = synthetic_indices(resolution, colours)
+            expected, driver_time = measure(driver_pack, layout, indices)
+            packed, numpy_time = measure(numpy_pack, layout, indices)
+
+            matches = all(bytes(a) == bytes(b) for a, b in zip(expected, packed))
+            failed |= not matches
+            print(f"{'x'.join(map(str, resolution)):>10} {layout:>16} {driver_time * 1000:10.1f} "
+                  f"{numpy_time * 1000:9.2f} {driver_time / numpy_time:7.0f}x{'' if matches else '  MISMATCH'}")
+
+        width, height = resolution
+        blank = driver_pack_1bit(Image.new("1", (width, height), 255))
+        failed |= bytes(blank) != get_blank_plane(width, height)
+
+    if failed:
+        sys.exit("NumPy packer differs from the driver packing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Compares the fused display post-processing pipeline against the original step by step one.
+
+Usage: python scripts/benchmark_display_pipeline.py [path/to/image.png]
+
+Reports the time per frame of both paths, the number of intermediate images they allocate and
+the largest per-pixel difference between them for every supported resolution, orientation and inversion.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.image_utils import change_orientation, resize_image, prepare_display_image
+
+RESOLUTIONS = [
+    [400, 300],   # Inky wHAT
+    [640, 400],   # Inky Impression 4"
+    [600, 448],   # Inky Impression 5.7"
+    [800, 480],   # Inky Impression 7.3"
+    [1304, 984],  # Waveshare 12.48"
+]
+ORIENTATIONS = ["horizontal", "vertical"]
+ENHANCEMENT_SETTINGS = {"brightness": 1.1, "contrast": 1.3, "saturation": 1.4, "sharpness": 1.6}
+ITERATIONS = 5
+# largest per-channel difference accepted between both paths
+TOLERANCE = 4
+
+
+def legacy_pipeline(image, resolution, orientation, inverted, enhancement_settings):
+    """The post processing as DisplayManager applied it before the fused pipeline."""
+    image = change_orientation(image, orientation)
+    image = resize_image(image, resolution)
+    if inverted:
+        image = image.rotate(180)
+    image = ImageEnhance.Brightness(image).enhance(enhancement_settings.get("brightness", 1.0))
+    image = ImageEnhance.Contrast(image).enhance(enhancement_settings.get("contrast", 1.0))
+    image = ImageEnhance.Color(image).enhance(enhancement_settings.get("saturation", 1.0))
+    image = ImageEnhance.Sharpness(image).enhance(enhancement_settings.get("sharpness", 1.0))
+    return image
+
+
+def fused_pipeline(image, resolution, orientation, inverted, enhancement_settings):
+    return prepare_display_image(image, resolution, orientation=orientation, inverted=inverted,
+                                 enhancement_settings=enhancement_settings)
+
+
+def measure(pipeline, *args):
+    """Returns the result, the time per run and the number of full frame images allocated per run."""
+    allocations = count_allocations(pipeline, *args)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        result = pipeline(*args)
+    elapsed = (time.perf_counter() - start) / ITERATIONS
+    return result, elapsed, allocations
+
+
+def count_allocations(pipeline, *args):
+    """Counts the images created by PIL while running the pipeline once."""
+    original_new = Image.Image._new
+    count = 0
+
+    def counting_new(self, im):
+        nonlocal count
+        count += 1
+        return original_new(self, im)
+
+    Image.Image._new = counting_new
+    try:
+        pipeline(*args)
+    finally:
+        Image.Image._new = original_new
+    return count
+
+
+def synthetic_image(size):
+    """Gradients plus hard edges, close to what rendered plugin screenshots look like."""
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, np.newaxis]
+    pixels = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                       (x + y) % 256], axis=-1)
+    pixels[height // 4:height // 2, width // 4:width // 2] = [250, 20, 20]
+    return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+
+def main():
+    source = Image.open(sys.argv[1]).convert("RGB") if len(sys.argv) > 1 else None
+
+    print(f"{'resolution':>10} {'orientation':>11} {'inverted':>8} {'legacy ms':>10} {'fused ms':>9} "
+          f"{'legacy images':>13} {'fused images':>12} {'max diff':>8}")
+    failed = False
+    for resolution in RESOLUTIONS:
+        for orientation in ORIENTATIONS:
+            for inverted in (False, True):
+                size = resolution if orientation == "horizontal" else resolution[::-1]
+                image = source or synthetic_image(size)
+                args = (image, resolution, orientation, inverted, ENHANCEMENT_SETTINGS)
+
+                legacy, legacy_time, legacy_images = measure(legacy_pipeline, *args)
+                fused, fused_time, fused_images = measure(fused_pipeline, *args)
+
+                diff = np.abs(np.asarray(legacy, dtype=np.int16) - np.asarray(fused, dtype=np.int16))
+                max_diff = int(diff.max())
+                failed |= max_diff > TOLERANCE or legacy.size != fused.size
+                print(f"{'x'.join(map(str, resolution)):>10} {orientation:>11} {str(inverted):>8} "
+                      f"{legacy_time * 1000:10.1f} {fused_time * 1000:9.1f} "
+                      f"{legacy_images:13} {fused_images:12} {max_diff:8}")
+
+    if failed:
+        sys.exit(f"Fused pipeline differs from the legacy pipeline by more than {TOLERANCE}")
+
+
+if __name__ == "__main__":
+    main()
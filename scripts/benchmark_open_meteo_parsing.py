@@ -0,0 +1,93 @@
+"""Compares the hourly Open-Meteo parsing of the weather plugin against the previous per-series scans.
+
+Usage: python scripts/benchmark_open_meteo_parsing.py
+
+The previous implementation parsed the hourly time strings again for every data point and for the
+hourly forecast, the current one parses them once into an epoch index. Reports the time per render
+of both for 8 forecast days and fails if they pick different values.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from plugins.weather.hourly_series import HourlySeries
+
+FORECAST_DAYS = 8
+ITERATIONS = 200
+SERIES = ["relative_humidity_2m", "surface_pressure", "visibility"]
+AQI_SERIES = ["uv_index", "european_aqi"]
+
+
+def synthetic_responses(now):
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    times = [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(FORECAST_DAYS * 24)]
+    weather = {"utc_offset_seconds": 0, "hourly": {"time": times}}
+    aqi = {"utc_offset_seconds": 0, "hourly": {"time": times[:5 * 24]}}
+    for i, name in enumerate(SERIES + ["temperature_2m"]):
+        weather["hourly"][name] = [float(i * 100 + j) for j in range(len(times))]
+    for i, name in enumerate(AQI_SERIES):
+        aqi["hourly"][name] = [float(i * 100 + j) for j in range(len(aqi["hourly"]["time"]))]
+    return weather, aqi
+
+
+def legacy_parse(weather, aqi, tz):
+    """The lookups of the previous implementation, one scan with fromisoformat per data point."""
+    current_time = datetime.now(tz)
+    values = []
+    for response, names in ((weather, SERIES), (aqi, AQI_SERIES)):
+        for name in names:
+            value = None
+            for i, time_str in enumerate(response["hourly"]["time"]):
+                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
+                    value = response["hourly"][name][i]
+                    break
+            values.append(value)
+
+    start_index = 0
+    for i, time_str in enumerate(weather["hourly"]["time"]):
+        dt_hourly = datetime.fromisoformat(time_str).astimezone(tz)
+        if dt_hourly.date() == current_time.date() and dt_hourly.hour >= current_time.hour:
+            start_index = i
+            break
+    hours = [datetime.fromisoformat(t).astimezone(tz).hour for t in weather["hourly"]["time"][start_index:start_index + 24]]
+    return values, hours
+
+
+def indexed_parse(weather, aqi, tz):
+    now = datetime.now(tz).timestamp()
+    hours, aqi_hours = HourlySeries.from_response(weather, tz), HourlySeries.from_response(aqi, tz)
+    current_hour, current_aqi_hour = hours.get_index(now), aqi_hours.get_index(now)
+    values = [hours.get_value(name, current_hour) for name in SERIES]
+    values += [aqi_hours.get_value(name, current_aqi_hour) for name in AQI_SERIES]
+    start_index = current_hour or 0
+    return values, [hours.get_datetime(i, tz).hour for i in range(start_index, min(start_index + 24, len(hours)))]
+
+
+def measure(parse, *args):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        result = parse(*args)
+    return result, (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    # the previous implementation read naive times as system local time, compare both in UTC
+    os.environ["TZ"] = "UTC"
+    time.tzset()
+    weather, aqi = synthetic_responses(datetime.now(timezone.utc))
+
+    expected, legacy_time = measure(legacy_parse, weather, aqi, timezone.utc)
+    result, indexed_time = measure(indexed_parse, weather, aqi, timezone.utc)
+
+    print(f"{'hours':>6} {'legacy ms':>10} {'indexed ms':>11} {'speedup':>8}")
+    print(f"{len(weather['hourly']['time']):>6} {legacy_time * 1000:10.3f} {indexed_time * 1000:11.3f} "
+          f"{legacy_time / indexed_time:7.0f}x")
+    if result != expected:
+        sys.exit(f"Indexed parsing differs: {result} != {expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify, current_app, render_template, send_file
+from flask import Blueprint, request, jsonify, current_app, render_template, send_file, Response, stream_with_context
+import json
 import os
 from datetime import datetime
+from utils.render_cache import get_render_cache
+from utils.http_client import get_http_client
+from utils.data_store import get_data_store
 
 main_bp = Blueprint("main", __name__)
 
+# Seconds between keepalive comments on idle job event streams
+JOB_STREAM_KEEPALIVE_SECONDS = 15
+
 @main_bp.route('/')
 def main_page():
     device_config = current_app.config['DEVICE_CONFIG']
@@ -13,7 +20,16 @@ def main_page():
 def get_current_image():
     """Serve current_image.png with conditional request support (If-Modified-Since)."""
     image_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'images', 'current_image.png')
-    
+    return send_image_file(image_path)
+
+@main_bp.route('/api/panel_preview')
+def get_panel_preview():
+    """Serve the current image as quantized to the colours of the panel, i.e. what the panel really shows."""
+    device_config = current_app.config['DEVICE_CONFIG']
+    return send_image_file(device_config.panel_preview_file)
+
+def send_image_file(image_path):
+    """Send an image file with conditional request support (If-Modified-Since)."""
     if not os.path.exists(image_path):
         return jsonify({"error": "Image not found"}), 404
     
@@ -39,4 +55,74 @@ def get_current_image():
     response = send_file(image_path, mimetype='image/png')
     response.headers['Last-Modified'] = last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT')
     response.headers['Cache-Control'] = 'no-cache'
-    return response
\ No newline at end of file
+    return response
+
+@main_bp.route('/api/stats')
+def get_stats():
+    """Returns runtime counters for the rendering pipeline."""
+    refresh_task = current_app.config['REFRESH_TASK']
+    display_manager = current_app.config['DISPLAY_MANAGER']
+    render_cache = get_render_cache()
+    data_store = get_data_store()
+    return jsonify({
+        "render_cache": render_cache.get_stats() if render_cache else None,
+        "prerender": refresh_task.get_prerender_stats(),
+        "display": display_manager.get_stats(),
+        "http": get_http_client().get_stats(),
+        "http_cache": get_http_client().get_cache_stats(),
+        "http_dedup": get_http_client().get_dedup_stats(),
+        "data_store": data_store.get_stats() if data_store else None
+    })
+
+@main_bp.route('/api/data/invalidate', methods=['POST'])
+def invalidate_data():
+    """Drops cached plugin data, all of it or the snapshots whose key starts with the given prefix, e.g. 'weather:'."""
+    data_store = get_data_store()
+    if not data_store:
+        return jsonify({"error": "Data store is disabled"}), 400
+    prefix = (request.get_json(silent=True) or {}).get("prefix", "")
+    return jsonify({"invalidated": data_store.invalidate(prefix)})
+
+@main_bp.route('/api/schedule')
+def get_schedule():
+    """Returns the upcoming refresh deadlines, earliest first."""
+    refresh_task = current_app.config['REFRESH_TASK']
+    return jsonify({"schedule": refresh_task.get_schedule()})
+
+@main_bp.route('/api/jobs/<string:job_id>')
+def get_job(job_id):
+    """Returns the current stage and stage timings of a manual update job."""
+    refresh_task = current_app.config['REFRESH_TASK']
+    job = refresh_task.get_job(job_id)
+    if not job:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(job.to_dict())
+
+@main_bp.route('/api/jobs/<string:job_id>/events')
+def stream_job(job_id):
+    """Streams the stages of a manual update job as Server-Sent Events until it is finished."""
+    refresh_task = current_app.config['REFRESH_TASK']
+    job = refresh_task.get_job(job_id)
+    if not job:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+
+    def generate():
+        version = None
+        last_stage_count = 0
+        while True:
+            job_dict = job.to_dict()
+            if len(job_dict["stages"]) != last_stage_count:
+                last_stage_count = len(job_dict["stages"])
+                yield f"event: stage\ndata: {json.dumps(job_dict)}\n\n"
+            if job.is_finished():
+                break
+            new_version = refresh_task.jobs.wait_for_change(version, timeout=JOB_STREAM_KEEPALIVE_SECONDS)
+            if new_version == version:
+                # keep idle connections open
+                yield ": keepalive\n\n"
+            version = new_version
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
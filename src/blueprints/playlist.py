@@ -63,6 +63,7 @@ def add_plugin():
             return jsonify({"error": "Failed to add to playlist"}), 500
 
         device_config.write_config()
+        refresh_task.signal_playlist_change(playlist)
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     return jsonify({"success": True, "message": "Scheduled refresh configured."})
@@ -82,6 +83,7 @@ def playlists():
 @playlist_bp.route('/create_playlist', methods=['POST'])
 def create_playlist():
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.json
@@ -105,6 +107,7 @@ def create_playlist():
 
         # save changes to device config file
         device_config.write_config()
+        refresh_task.signal_playlist_change(playlist_name)
 
     except Exception as e:
         logger.exception("EXCEPTION CAUGHT: " + str(e))
@@ -116,6 +119,7 @@ def create_playlist():
 @playlist_bp.route('/update_playlist/<string:playlist_name>', methods=['PUT'])
 def update_playlist(playlist_name):
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.get_json()
@@ -134,12 +138,15 @@ def update_playlist(playlist_name):
     if not result:
         return jsonify({"error": "Failed to delete playlist"}), 500
     device_config.write_config()
+    refresh_task.signal_playlist_change(playlist_name)
+    refresh_task.signal_playlist_change(new_name)
 
     return jsonify({"success": True, "message": f"Updated playlist '{playlist_name}'!"})
 
 @playlist_bp.route('/delete_playlist/<string:playlist_name>', methods=['DELETE'])
 def delete_playlist(playlist_name):
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     if not playlist_name:
@@ -151,6 +158,7 @@ def delete_playlist(playlist_name):
 
     playlist_manager.delete_playlist(playlist_name)
     device_config.write_config()
+    refresh_task.signal_playlist_change(playlist_name)
 
     return jsonify({"success": True, "message": f"Deleted playlist '{playlist_name}'!"})
 
@@ -73,6 +73,7 @@ def image(plugin_id, filename):
 @plugin_bp.route('/delete_plugin_instance', methods=['POST'])
 def delete_plugin_instance():
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.json
@@ -91,6 +92,7 @@ def delete_plugin_instance():
 
         # save changes to device config file
         device_config.write_config()
+        refresh_task.signal_playlist_change(playlist_name)
 
     except Exception as e:
         logger.exception("EXCEPTION CAUGHT: " + str(e))
@@ -142,11 +144,13 @@ def display_plugin_instance():
         if not plugin_instance:
             return jsonify({"success": False, "message": f"Plugin instance '{plugin_instance_name}' not found"}), 400
 
-        refresh_task.manual_update(PlaylistRefresh(playlist, plugin_instance, force=True))
+        job = refresh_task.manual_update(PlaylistRefresh(playlist, plugin_instance, force=True))
+        if not job:
+            return jsonify({"error": "Refresh task is not running"}), 503
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
-    return jsonify({"success": True, "message": "Display updated"}), 200
+    return jsonify({"success": True, "message": "Display update queued", "job_id": job.job_id}), 202
 
 @plugin_bp.route('/update_now', methods=['POST'])
 def update_now():
@@ -161,7 +165,8 @@ def update_now():
 
         # Check if refresh task is running
         if refresh_task.running:
-            refresh_task.manual_update(ManualRefresh(plugin_id, plugin_settings))
+            job = refresh_task.manual_update(ManualRefresh(plugin_id, plugin_settings))
+            return jsonify({"success": True, "message": "Display update queued", "job_id": job.job_id}), 202
         else:
             # In development mode, directly update the display
             logger.info("Refresh task not running, updating display directly")
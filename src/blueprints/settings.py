@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app, render_template, Response
 from utils.time_utils import calculate_seconds
+from utils.image_utils import clear_enhancement_luts
 from datetime import datetime, timedelta
 import os
 import pytz
@@ -48,6 +49,7 @@ def save_settings():
         if not time_format or time_format not in ["12h", "24h"]:
             return jsonify({"error": "Time format is required"}), 400
         previous_interval_seconds = device_config.get_config("plugin_cycle_interval_seconds")
+        previous_image_settings = device_config.get_config("image_settings")
         plugin_cycle_interval_seconds = calculate_seconds(int(interval), unit)
         if plugin_cycle_interval_seconds > 86400 or plugin_cycle_interval_seconds <= 0:
             return jsonify({"error": "Plugin cycle interval must be less than 24 hours"}), 400
@@ -69,6 +71,10 @@ def save_settings():
         }
         device_config.update_config(settings)
 
+        if settings["image_settings"] != previous_image_settings:
+            # enhancement tables compiled for the previous values are no longer needed
+            clear_enhancement_luts()
+
         if plugin_cycle_interval_seconds != previous_interval_seconds:
             # wake the background thread up to signal interval config change
             refresh_task = current_app.config['REFRESH_TASK']
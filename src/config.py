@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import threading
 from dotenv import load_dotenv
 from model import PlaylistManager, RefreshInfo
 
@@ -16,10 +17,15 @@ class Config:
     # File path for storing the current image being displayed
     current_image_file = os.path.join(BASE_DIR, "static", "images", "current_image.png")
 
+    # File path for the current image as quantized to the colours of the panel
+    panel_preview_file = os.path.join(BASE_DIR, "static", "images", "panel_preview.png")
+
     # Directory path for storing plugin instance images
     plugin_image_dir = os.path.join(BASE_DIR, "static", "images", "plugins")
 
     def __init__(self):
+        # the config is updated and written from the web server, refresh and display threads
+        self.config_lock = threading.RLock()
         self.config = self.read_config()
         self.plugins_list = self.read_plugins_list()
         self.playlist_manager = self.load_playlist_manager()
@@ -55,10 +61,14 @@ class Config:
     def write_config(self):
         """Updates the cached config from the model objects and writes to the config file."""
         logger.debug(f"Writing device config to {self.config_file}")
-        self.update_value("playlist_config", self.playlist_manager.to_dict())
-        self.update_value("refresh_info", self.refresh_info.to_dict())
-        with open(self.config_file, 'w') as outfile:
-            json.dump(self.config, outfile, indent=4)
+        with self.config_lock:
+            self.update_value("playlist_config", self.playlist_manager.to_dict())
+            self.update_value("refresh_info", self.refresh_info.to_dict())
+            # replaced in one step, a crash or concurrent reader never sees a partially written file
+            tmp_file = f"{self.config_file}.tmp"
+            with open(tmp_file, 'w') as outfile:
+                json.dump(self.config, outfile, indent=4)
+            os.replace(tmp_file, self.config_file)
 
     def get_config(self, key=None, default={}):
         """Gets the value of a specific configuration key or returns the entire config if none provided."""
@@ -82,14 +92,16 @@ class Config:
 
     def update_config(self, config):
         """Updates the config with the new values provided and writes to the config file."""
-        self.config.update(config)
-        self.write_config()
+        with self.config_lock:
+            self.config.update(config)
+            self.write_config()
 
     def update_value(self, key, value, write=False):
         """Updates a specific key in the configuration with a new value and optionally writes it to the config file."""
-        self.config[key] = value
-        if write:
-            self.write_config()
+        with self.config_lock:
+            self.config[key] = value
+            if write:
+                self.write_config()
 
     def load_env_key(self, key):
         """Loads an environment variable using dotenv and returns its value."""
@@ -114,3 +126,15 @@ class Config:
     def get_refresh_info(self):
         """Returns the refresh information."""
         return self.refresh_info
+
+    def set_refresh_info(self, refresh_info):
+        """Replaces the refresh information, keeping the hash of the frame shown on the display."""
+        with self.config_lock:
+            refresh_info.frame_hash = self.refresh_info.frame_hash
+            self.refresh_info = refresh_info
+
+    def update_frame_hash(self, frame_hash):
+        """Stores the hash of the frame last sent to the display in the refresh information and writes the config file."""
+        with self.config_lock:
+            self.refresh_info.frame_hash = frame_hash
+            self.write_config()
@@ -43,3 +43,9 @@ class AbstractDisplay:
             NotImplementedError: If not implemented in a subclass.
         """
         raise NotImplementedError("Method 'display_image(...) must be provided in a subclass.")
+
+    def get_stats(self):
+        """
+        Returns device specific refresh statistics, or None if the display does not keep any.
+        """
+        return None
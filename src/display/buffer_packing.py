@@ -0,0 +1,66 @@
+import functools
+
+import numpy as np
+
+# Bits per pixel of the panel buffer for frames quantized to a Waveshare palette, see PANEL_PALETTES
+PALETTE_BITS_PER_PIXEL = {
+    "waveshare_bw": 1,
+    "waveshare_4colour": 2,
+    "waveshare_7colour": 4,
+    "spectra6": 4,
+}
+# Palette indices of a bi-colour panel, the black and the colour plane are sent separately
+BLACK_INDEX = 0
+COLOR_INDEX = 2
+
+
+def pack_pixels(indices, bits_per_pixel):
+    """
+    Packs a 2D array of palette indices into the buffer layout of the Waveshare drivers.
+
+    Pixels are packed row by row with the leftmost pixel in the most significant bits, rows are
+    padded to full bytes.
+
+    Args:
+        indices (numpy.ndarray): Palette indices in the native orientation of the panel.
+        bits_per_pixel (int): 1, 2 or 4.
+
+    Returns:
+        bytearray: The packed buffer.
+    """
+    if bits_per_pixel not in (1, 2, 4):
+        raise ValueError(f"Unsupported bits per pixel: {bits_per_pixel}")
+
+    indices = np.asarray(indices, dtype=np.uint8)
+    pixels_per_byte = 8 // bits_per_pixel
+    height, width = indices.shape
+    padding = -width % pixels_per_byte
+    if padding:
+        # the drivers start from an all white buffer, so padding bits stay set
+        indices = np.pad(indices, ((0, 0), (0, padding)), constant_values=1 if bits_per_pixel == 1 else 0)
+    if bits_per_pixel == 1:
+        return bytearray(np.packbits(indices & 1, axis=1).tobytes())
+
+    groups = indices.reshape(height, -1, pixels_per_byte) & ((1 << bits_per_pixel) - 1)
+    packed = np.zeros(groups.shape[:2], dtype=np.uint8)
+    for position in range(pixels_per_byte):
+        packed |= groups[:, :, position] << (8 - bits_per_pixel * (position + 1))
+    return bytearray(packed.tobytes())
+
+
+def pack_color_planes(indices):
+    """
+    Splits the palette indices of a bi-colour frame into its packed black and colour plane.
+
+    A set bit leaves the pixel white, like the 1 bit images the drivers expect.
+    """
+    indices = np.asarray(indices)
+    black_plane = pack_pixels(indices != BLACK_INDEX, 1)
+    color_plane = pack_pixels(indices != COLOR_INDEX, 1)
+    return black_plane, color_plane
+
+
+@functools.lru_cache(maxsize=4)
+def get_blank_plane(width, height):
+    """Returns the packed 1 bit buffer of an all white plane, cached per resolution."""
+    return bytes([0xFF]) * (((width + 7) // 8) * height)
@@ -1,9 +1,14 @@
 import fnmatch
 import json
 import logging
+import threading
+import time
+from datetime import datetime
 
-from utils.image_utils import resize_image, change_orientation, apply_image_enhancement
+from utils.image_utils import prepare_display_image, quantize_image, compute_frame_hash, get_frame_difference, PANEL_PALETTES
+import numpy as np
 from display.mock_display import MockDisplay
+from display.virtual_display import VirtualDisplay
 
 logger = logging.getLogger(__name__)
 
@@ -36,11 +41,29 @@ class DisplayManager:
         """
         
         self.device_config = device_config
+
+        # single slot, latest-wins queue feeding the display worker thread
+        self.push_condition = threading.Condition()
+        self.pending_push = None
+        self.push_in_progress = False
+        self.worker = None
+        self.running = False
+        self.push_stats = {"pushes": 0, "superseded": 0, "failed": 0, "total_duration": 0.0,
+                           "skipped_identical": 0, "skipped_below_threshold": 0}
+        self.last_push = None
+
+        # final frame last sent to the panel, refreshes are skipped when the panel would show the same pixels;
+        # the hash is persisted in the refresh info so an unchanged frame is not pushed again after a restart
+        self.last_frame_hash = device_config.get_refresh_info().frame_hash
+        self.last_frame = None
      
         display_type = device_config.get_config("display_type", default="inky")
 
         if display_type == "mock":
             self.display = MockDisplay(device_config)
+        elif display_type == "virtual":
+            # emulates a panel's palette and refresh timing, see VIRTUAL_MODELS
+            self.display = VirtualDisplay(device_config)
         elif display_type == "inky":
             self.display = InkyDisplay(device_config)
         elif fnmatch.fnmatch(display_type, "epd*in*"):  
@@ -59,10 +82,16 @@ class DisplayManager:
         """
         Delegates image rendering to the appropriate display instance.
 
+        The panel refresh is skipped when the final, quantized frame is identical to the frame last
+        sent to the panel, or differs in less than the 'refresh_diff_threshold' fraction of pixels.
+
         Args:
             image (PIL.Image): The image to be displayed.
             image_settings (list, optional): List of settings to modify image rendering.
 
+        Returns:
+            bool: True if the image was sent to the panel, False if the refresh was skipped.
+
         Raises:
             ValueError: If no valid display instance is found.
         """
@@ -74,11 +103,191 @@ class DisplayManager:
         logger.info(f"Saving image to {self.device_config.current_image_file}")
         image.save(self.device_config.current_image_file)
 
-        # Resize and adjust orientation
-        image = change_orientation(image, self.device_config.get_config("orientation"))
-        image = resize_image(image, self.device_config.get_resolution(), image_settings)
-        if self.device_config.get_config("inverted_image"): image = image.rotate(180)
-        image = apply_image_enhancement(image, self.device_config.get_config("image_settings"))
+        # Resize, adjust orientation and apply the image enhancements in one pass
+        image = prepare_display_image(
+            image,
+            self.device_config.get_resolution(),
+            orientation=self.device_config.get_config("orientation"),
+            inverted=self.device_config.get_config("inverted_image"),
+            image_settings=image_settings,
+            enhancement_settings=self.device_config.get_config("image_settings")
+        )
+
+        # Map onto the colours the panel can show, the drivers use the result as is
+        palette = self.get_panel_palette()
+        if palette:
+            image = quantize_image(image, palette, self.device_config.get_config("dither_mode", default="floyd-steinberg"))
+            image.save(self.device_config.panel_preview_file)
+
+        frame_hash = compute_frame_hash(image)
+        frame_pixels = np.asarray(image)
+        if self.is_frame_displayed(frame_hash, frame_pixels):
+            return False
 
         # Pass to the concrete instance to render to the device.
-        self.display.display_image(image, image_settings)
\ No newline at end of file
+        self.display.display_image(image, image_settings)
+        self.last_frame_hash = frame_hash
+        self.last_frame = frame_pixels
+        self.device_config.update_frame_hash(frame_hash)
+        return True
+
+    def is_frame_displayed(self, frame_hash, frame_pixels):
+        """
+        Checks whether the panel already shows the frame, or close enough to skip the refresh.
+        """
+        if frame_hash == self.last_frame_hash:
+            logger.info("Panel already shows this frame, skipping refresh.")
+            with self.push_condition:
+                self.push_stats["skipped_identical"] += 1
+            return True
+
+        threshold = float(self.device_config.get_config("refresh_diff_threshold", default=0) or 0)
+        if threshold > 0:
+            difference = get_frame_difference(frame_pixels, self.last_frame)
+            if difference < threshold:
+                logger.info(f"Frame differs in {difference:.4%} of pixels, below refresh_diff_threshold {threshold:.4%}, skipping refresh.")
+                with self.push_condition:
+                    self.push_stats["skipped_below_threshold"] += 1
+                return True
+        return False
+
+    def get_panel_palette(self):
+        """
+        Returns the palette frames are quantized to before being pushed, or None to push them unquantized.
+
+        The 'panel_palette' config value selects a palette from PANEL_PALETTES, 'auto' (the default)
+        uses the palette of the connected panel and 'none' disables quantization.
+        """
+        palette = self.device_config.get_config("panel_palette", default="auto")
+        if palette == "auto":
+            return getattr(self.display, "palette", None)
+        if palette == "none":
+            return None
+        if palette not in PANEL_PALETTES:
+            logger.warning(f"Unknown panel palette '{palette}', frames are not quantized")
+            return None
+        return palette
+
+    def start(self):
+        """Starts the worker thread that pushes submitted images to the display."""
+        with self.push_condition:
+            if self.worker and self.worker.is_alive():
+                return
+            logger.info("Starting display worker")
+            self.running = True
+            self.worker = threading.Thread(target=self._run_worker, daemon=True)
+            self.worker.start()
+
+    def stop(self, timeout=None):
+        """Stops the worker thread once the push in progress, if any, has finished."""
+        with self.push_condition:
+            self.running = False
+            self.push_condition.notify_all()
+        if self.worker:
+            logger.info("Stopping display worker")
+            self.worker.join(timeout)
+
+    def submit(self, image, image_settings=[], on_done=None):
+        """
+        Queues an image to be pushed to the display by the worker thread and returns immediately.
+
+        Only the latest submitted image is kept, an image that has not been pushed yet is superseded
+        by the next submission. Falls back to a blocking push if the worker is not running.
+
+        Args:
+            image (PIL.Image): The image to be displayed.
+            image_settings (list, optional): List of settings to modify image rendering.
+            on_done (callable, optional): Called with the outcome ('done', 'skipped', 'failed' or 'superseded')
+                and an error message once the image has been handled.
+        """
+        submitted_dt = datetime.now().astimezone()
+        superseded = None
+        with self.push_condition:
+            queued = self.running
+            if queued:
+                if self.pending_push is not None:
+                    logger.info("Superseding display push that has not started yet")
+                    self.push_stats["superseded"] += 1
+                    superseded = self.pending_push
+                self.pending_push = (image, image_settings, submitted_dt, on_done)
+                self.push_condition.notify_all()
+
+        if superseded and superseded[3]:
+            superseded[3]("superseded", None)
+        if not queued:
+            self._push(image, image_settings, submitted_dt, on_done)
+
+    def wait_until_idle(self, timeout=None):
+        """Blocks until no push is queued or in progress. Returns False if the timeout expired first."""
+        with self.push_condition:
+            return self.push_condition.wait_for(
+                lambda: self.pending_push is None and not self.push_in_progress, timeout)
+
+    def get_stats(self):
+        """Returns counters and timings of the pushes to the display."""
+        with self.push_condition:
+            pushes = self.push_stats["pushes"]
+            stats = {
+                "pushes": pushes,
+                "superseded": self.push_stats["superseded"],
+                "failed": self.push_stats["failed"],
+                "refreshes_avoided": self.push_stats["skipped_identical"] + self.push_stats["skipped_below_threshold"],
+                "skipped_identical": self.push_stats["skipped_identical"],
+                "skipped_below_threshold": self.push_stats["skipped_below_threshold"],
+                "queued": self.pending_push is not None,
+                "in_progress": self.push_in_progress,
+                "average_duration_seconds": round(self.push_stats["total_duration"] / pushes, 2) if pushes else None,
+                "last_push": self.last_push
+            }
+        # read without holding push_condition, the panel may block its own stats while refreshing
+        stats["panel"] = self.display.get_stats()
+        return stats
+
+    def _run_worker(self):
+        while True:
+            with self.push_condition:
+                self.push_condition.wait_for(lambda: self.pending_push is not None or not self.running)
+                if not self.running:
+                    break
+                image, image_settings, submitted_dt, on_done = self.pending_push
+                self.pending_push = None
+                self.push_in_progress = True
+            try:
+                self._push(image, image_settings, submitted_dt, on_done)
+            finally:
+                with self.push_condition:
+                    self.push_in_progress = False
+                    self.push_condition.notify_all()
+
+    def _push(self, image, image_settings, submitted_dt, on_done=None):
+        """Pushes a single image to the display and records its timings."""
+        started_dt = datetime.now().astimezone()
+        start = time.monotonic()
+        error = None
+        pushed = False
+        try:
+            pushed = self.display_image(image, image_settings)
+        except Exception as e:
+            logger.exception("Failed to push image to the display")
+            error = str(e)
+        duration = time.monotonic() - start
+        finished_dt = datetime.now().astimezone()
+        logger.info(f"Display push finished in {duration:.1f}s, queued for {(started_dt - submitted_dt).total_seconds():.1f}s")
+
+        with self.push_condition:
+            if error:
+                self.push_stats["failed"] += 1
+            # skipped refreshes only show up in their own counters
+            if pushed or error:
+                self.push_stats["pushes"] += 1
+                self.push_stats["total_duration"] += duration
+                self.last_push = {
+                    "submitted": submitted_dt.isoformat(),
+                    "started": started_dt.isoformat(),
+                    "finished": finished_dt.isoformat(),
+                    "duration_seconds": round(duration, 2),
+                    "error": error
+                }
+
+        if on_done:
+            on_done("failed" if error else "done" if pushed else "skipped", error)
@@ -0,0 +1,73 @@
+import numpy as np
+
+# Partial refresh windows start and end on byte boundaries of the 1 bit per pixel panel buffer
+BYTE_ALIGNMENT = 8
+# Changed pixels closer than this many rows or columns end up in the same window
+MERGE_GAP = 16
+# More windows than this are merged into their bounding box, every window costs a controller round trip
+MAX_DIRTY_BOXES = 8
+# Partial or fast refreshes in a row before a full, clean refresh removes the ghosting they leave behind
+DEFAULT_PARTIAL_REFRESH_LIMIT = 10
+# Windowed partial refreshes are only used while the changed windows cover at most this fraction of the panel
+PARTIAL_REFRESH_MAX_AREA = 0.5
+
+
+def get_changed_mask(frame, previous_frame):
+    """Returns a 2D boolean array marking the pixels that differ between two frames given as numpy arrays."""
+    changed = frame != previous_frame
+    if changed.ndim == 3:
+        changed = changed.any(axis=-1)
+    return changed
+
+
+def get_dirty_boxes(frame, previous_frame, alignment=BYTE_ALIGNMENT, merge_gap=MERGE_GAP, max_boxes=MAX_DIRTY_BOXES):
+    """
+    Computes the windows that changed between the previously pushed frame and the new one.
+
+    Changed rows are grouped into bands, and the changed columns of every band into windows,
+    whenever they are at most merge_gap pixels apart. Horizontal window edges are widened to
+    multiples of alignment.
+
+    Args:
+        frame (numpy.ndarray): The new frame.
+        previous_frame (numpy.ndarray): The frame last pushed to the panel, or None.
+
+    Returns:
+        list: Boxes as (left, upper, right, lower) tuples with exclusive right and lower edges,
+            empty if nothing changed, or None if the frames cannot be compared.
+    """
+    if previous_frame is None or frame.shape != previous_frame.shape:
+        return None
+
+    changed = get_changed_mask(frame, previous_frame)
+    width = changed.shape[1]
+    boxes = []
+    for rows in _split_runs(np.flatnonzero(changed.any(axis=1)), merge_gap):
+        band = changed[rows[0]:rows[-1] + 1]
+        for columns in _split_runs(np.flatnonzero(band.any(axis=0)), merge_gap):
+            window_rows = np.flatnonzero(band[:, columns[0]:columns[-1] + 1].any(axis=1))
+            left = columns[0] // alignment * alignment
+            right = min(-(-(columns[-1] + 1) // alignment) * alignment, width)
+            boxes.append((int(left), int(rows[0] + window_rows[0]), int(right), int(rows[0] + window_rows[-1] + 1)))
+
+    if len(boxes) > max_boxes:
+        boxes = [get_bounding_box(boxes)]
+    return boxes
+
+
+def get_bounding_box(boxes):
+    """Returns the smallest box containing every given box."""
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def get_boxes_area(boxes):
+    """Returns the number of pixels covered by the boxes, which do not overlap."""
+    return sum((right - left) * (lower - upper) for left, upper, right, lower in boxes)
+
+
+def _split_runs(indices, merge_gap):
+    """Splits sorted indices wherever two neighbours are more than merge_gap apart."""
+    if not indices.size:
+        return []
+    return np.split(indices, np.flatnonzero(np.diff(indices) > merge_gap) + 1)
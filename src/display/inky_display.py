@@ -5,6 +5,21 @@ from display.abstract_display import AbstractDisplay
 
 logger = logging.getLogger(__name__)
 
+# Panel palettes of the multi-colour Inky drivers, keyed by driver module
+INKY_MODULE_PALETTES = {
+    "inky.inky_uc8159": "inky_7colour",
+    "inky.inky_ac073tc1a": "inky_7colour",
+    "inky.inky_e673": "spectra6",
+    "inky.inky_e640": "spectra6",
+    "inky.inky_el133uf1": "spectra6",
+}
+# Panel palettes of the two and three colour Inky drivers, keyed by their colour
+INKY_COLOUR_PALETTES = {
+    "black": "inky_bw",
+    "red": "inky_red",
+    "yellow": "inky_yellow",
+}
+
 class InkyDisplay(AbstractDisplay):
 
     """
@@ -30,6 +45,10 @@ class InkyDisplay(AbstractDisplay):
         self.inky_display = auto()
         self.inky_display.set_border(self.inky_display.BLACK)
 
+        self.palette = INKY_MODULE_PALETTES.get(
+            type(self.inky_display).__module__,
+            INKY_COLOUR_PALETTES.get(getattr(self.inky_display, "colour", None)))
+
         # store display resolution in device config
         if not self.device_config.get_config("resolution"):
             self.device_config.update_value(
@@ -43,7 +62,8 @@ class InkyDisplay(AbstractDisplay):
         Displays the provided image on the Inky display.
 
         The image has been processed by adjusting orientation and resizing 
-        before being sent to the display.
+        before being sent to the display. Images quantized to the panel palette
+        ('P' mode with driver indices) are used by the driver as is.
 
         Args:
             image (PIL.Image): The image to be displayed.
@@ -0,0 +1,162 @@
+import os
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+from .abstract_display import AbstractDisplay
+from .frame_diff import get_dirty_boxes, get_boxes_area, DEFAULT_PARTIAL_REFRESH_LIMIT, PARTIAL_REFRESH_MAX_AREA
+
+logger = logging.getLogger(__name__)
+
+# Emulated panels: resolution, palette (see PANEL_PALETTES) and refresh timings in seconds,
+# partial_refresh is None for panels without partial refresh support
+VIRTUAL_MODELS = {
+    "inky_what_red": {"resolution": [400, 300], "palette": "inky_red", "full_refresh": 15.0, "partial_refresh": None},
+    "inky_impression_7_3": {"resolution": [800, 480], "palette": "inky_7colour", "full_refresh": 32.0, "partial_refresh": None},
+    "inky_impression_spectra_7_3": {"resolution": [800, 480], "palette": "spectra6", "full_refresh": 25.0, "partial_refresh": None},
+    "epd7in5_V2": {"resolution": [800, 480], "palette": "waveshare_bw", "full_refresh": 4.0, "partial_refresh": 0.5},
+    "epd7in5b_V2": {"resolution": [800, 480], "palette": "waveshare_bwr", "full_refresh": 16.0, "partial_refresh": None},
+    "epd7in3f": {"resolution": [800, 480], "palette": "waveshare_7colour", "full_refresh": 35.0, "partial_refresh": None},
+    "epd7in3e": {"resolution": [800, 480], "palette": "spectra6", "full_refresh": 20.0, "partial_refresh": None},
+    "epd12in48": {"resolution": [1304, 984], "palette": "waveshare_bw", "full_refresh": 8.0, "partial_refresh": None},
+}
+DEFAULT_VIRTUAL_MODEL = "inky_impression_7_3"
+# Frames kept in memory
+DEFAULT_FRAME_BUFFER_SIZE = 10
+
+class VirtualDisplay(AbstractDisplay):
+    """
+    Emulates an e-ink panel for benchmarking without hardware.
+
+    The 'virtual_model' config value selects one of VIRTUAL_MODELS, whose palette and resolution are used
+    for the frames. Every push blocks for the model's refresh time, scaled by 'virtual_time_scale', like
+    a driver waiting on the busy pin. The last frames are kept in memory, and optionally the last
+    'virtual_disk_frames' frames are written to 'output_dir'.
+    """
+
+    def initialize_display(self):
+        """
+        Sets up the emulated panel and stores its resolution in the device configuration.
+
+        Raises:
+            ValueError: If the configured model is unknown.
+        """
+        model_name = self.device_config.get_config("virtual_model", default=DEFAULT_VIRTUAL_MODEL)
+        if model_name not in VIRTUAL_MODELS:
+            raise ValueError(f"Unsupported virtual display model: {model_name}")
+        logger.info(f"Initializing virtual display emulating {model_name}")
+
+        self.model_name = model_name
+        self.model = VIRTUAL_MODELS[model_name]
+        self.palette = self.model["palette"]
+        self.width, self.height = self.model["resolution"]
+        self.time_scale = float(self.device_config.get_config("virtual_time_scale", default=1.0))
+        self.frames = deque(maxlen=int(self.device_config.get_config("virtual_frame_buffer", default=DEFAULT_FRAME_BUFFER_SIZE)))
+        self.disk_frames = int(self.device_config.get_config("virtual_disk_frames", default=0))
+        self.output_dir = self.device_config.get_config("output_dir", default="mock_display_output")
+        if self.disk_frames:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self.saved_frames = deque()
+
+        # held while the emulated panel refreshes, like the busy pin of a real panel
+        self.busy_lock = threading.Lock()
+        # guards the frames and counters, only held briefly so they can be read during a refresh
+        self.stats_lock = threading.Lock()
+        self.last_frame = None
+        self.partial_refreshes = 0
+        self.stats = {"full": 0, "partial": 0, "busy_seconds": 0.0, "wait_seconds": 0.0}
+        self.last_refresh = None
+
+        if self.device_config.get_config("resolution") != self.model["resolution"]:
+            self.device_config.update_value("resolution", list(self.model["resolution"]), write=True)
+
+    def display_image(self, image, image_settings=[]):
+        """
+        Refreshes the emulated panel with the image, blocking for the refresh time of the model.
+
+        Only the changed windows are refreshed on models with partial refresh support, up to
+        'partial_refresh_limit' times in a row.
+
+        Raises:
+            ValueError: If no image is provided or it does not match the panel resolution.
+        """
+        if not image:
+            raise ValueError("No image provided.")
+        if image.size not in ((self.width, self.height), (self.height, self.width)):
+            raise ValueError(f"Image size {image.size} does not match the {self.model_name} resolution {self.width}x{self.height}")
+
+        wait_start = time.monotonic()
+        with self.busy_lock:
+            waited = time.monotonic() - wait_start
+            frame = np.asarray(image)
+            boxes = get_dirty_boxes(frame, self.last_frame)
+            mode = self.get_refresh_mode(boxes)
+            duration = self.model["full_refresh"] if mode == "full" else self.model["partial_refresh"] * len(boxes)
+
+            time.sleep(duration * self.time_scale)
+
+            self.last_frame = frame
+            self.partial_refreshes = 0 if mode == "full" else self.partial_refreshes + 1
+            self._keep_frame(image, mode)
+            with self.stats_lock:
+                self.stats[mode] += 1
+                self.stats["busy_seconds"] += duration
+                self.stats["wait_seconds"] += waited
+                self.last_refresh = {
+                    "mode": mode,
+                    "windows": boxes if mode == "partial" else None,
+                    "busy_seconds": duration,
+                    "time": datetime.now().astimezone().isoformat()
+                }
+        logger.info(f"Virtual {self.model_name} {mode} refresh, busy for {duration:.1f}s")
+
+    def get_refresh_mode(self, boxes):
+        """Picks 'full' or 'partial' refresh for the changed windows, like WaveshareDisplay.get_refresh_mode."""
+        limit = int(self.device_config.get_config("partial_refresh_limit", default=DEFAULT_PARTIAL_REFRESH_LIMIT))
+        if boxes is None or self.model["partial_refresh"] is None or self.partial_refreshes >= limit:
+            return "full"
+        if get_boxes_area(boxes) > self.width * self.height * PARTIAL_REFRESH_MAX_AREA:
+            return "full"
+        return "partial"
+
+    def is_busy(self):
+        """Returns True while the emulated panel is refreshing."""
+        return self.busy_lock.locked()
+
+    def get_frames(self):
+        """Returns the frames kept in memory as (time, refresh mode, image) tuples, oldest first."""
+        with self.stats_lock:
+            return list(self.frames)
+
+    def get_stats(self):
+        """Returns counters of the emulated refreshes, busy time is in emulated, unscaled seconds."""
+        with self.stats_lock:
+            return {
+                "model": self.model_name,
+                "refreshes": self.stats["full"] + self.stats["partial"],
+                "full_refreshes": self.stats["full"],
+                "partial_refreshes": self.stats["partial"],
+                "busy_seconds": round(self.stats["busy_seconds"], 2),
+                "wait_seconds": round(self.stats["wait_seconds"], 2),
+                "frames_buffered": len(self.frames),
+                "last_refresh": self.last_refresh
+            }
+
+    def _keep_frame(self, image, mode):
+        timestamp = datetime.now().astimezone()
+        with self.stats_lock:
+            self.frames.append((timestamp.isoformat(), mode, image.copy()))
+        if not self.disk_frames:
+            return
+
+        filepath = os.path.join(self.output_dir, f"virtual_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.png")
+        image.save(filepath, "PNG")
+        image.save(os.path.join(self.output_dir, "latest.png"), "PNG")
+        self.saved_frames.append(filepath)
+        while len(self.saved_frames) > self.disk_frames:
+            old_filepath = self.saved_frames.popleft()
+            if os.path.exists(old_filepath):
+                os.remove(old_filepath)
@@ -1,15 +1,30 @@
+import fnmatch
 import inspect
 import importlib
 import logging
 import sys
+import time
+from datetime import datetime
 
+import numpy as np
 from display.abstract_display import AbstractDisplay
-from PIL import Image
+from display.frame_diff import get_dirty_boxes, get_boxes_area, DEFAULT_PARTIAL_REFRESH_LIMIT, PARTIAL_REFRESH_MAX_AREA
+from display.buffer_packing import pack_pixels, pack_color_planes, get_blank_plane, PALETTE_BITS_PER_PIXEL
 from pathlib import Path
 from plugins.plugin_registry import get_plugin_instance
 
 logger = logging.getLogger(__name__)
 
+# Panel palettes by display_type pattern, first match wins; everything else is treated as black and white
+WAVESHARE_PALETTES = [
+    ("epd*f", "waveshare_7colour"),
+    ("epd*e", "spectra6"),
+    ("epd*g", "waveshare_4colour"),
+]
+
+# Bounds of windowed partial refreshes, lower cased without underscores, e.g. display_Partial(Image, Xstart, Ystart, Xend, Yend)
+WINDOW_ARGS = ["xstart", "ystart", "xend", "yend"]
+
 class WaveshareDisplay(AbstractDisplay):
     """
     Handles Waveshare e-paper display dynamically based on device type.
@@ -71,6 +86,18 @@ class WaveshareDisplay(AbstractDisplay):
             raise ValueError(f"Display does not support required methods: {display_type}")
 
         self.bi_color_display = len(display_args_spec.args) > 2
+        self._detect_refresh_modes()
+        self._count_spi_writes(epd_module)
+        self.last_frame = None
+        self.partial_refreshes = 0
+        self.refresh_stats = {"full": 0, "partial": 0, "fast": 0, "spi_bytes": 0, "total_duration": 0.0}
+        self.last_refresh = None
+        self.palette = next((palette for pattern, palette in WAVESHARE_PALETTES
+                             if fnmatch.fnmatch(display_type, pattern)), "waveshare_bw")
+        if self.bi_color_display:
+            self.palette = "waveshare_bwr"
+        # whether the NumPy packer matched the driver's getbuffer, by buffer layout, checked on first use
+        self.packer_checks = {}
 
         # update the resolution directly from the loaded device context
         if not self.device_config.get_config("resolution"):
@@ -88,7 +115,8 @@ class WaveshareDisplay(AbstractDisplay):
         Displays an image on the Waveshare display.
 
         The image has been processed by adjusting orientation, resizing, and converting it
-        into the buffer format required for e-paper rendering.
+        into the buffer format required for e-paper rendering. Only the windows that changed since
+        the last push are refreshed if the driver supports partial refreshes, see get_refresh_mode.
 
         Args:
             image (PIL.Image): The image to be displayed.
@@ -102,6 +130,71 @@ class WaveshareDisplay(AbstractDisplay):
         if not image:
             raise ValueError(f"No image provided.")
 
+        # diff in the orientation of the panel, getbuffer rotates landscape frames for portrait panels
+        native_image = image
+        if image.size != (self.epd_display.width, self.epd_display.height):
+            native_image = image.rotate(90, expand=True)
+        frame = np.asarray(native_image)
+        boxes = get_dirty_boxes(frame, self.last_frame)
+        mode = self.get_refresh_mode(boxes)
+
+        start = time.monotonic()
+        spi_bytes = self.spi_bytes
+        # the frame on the panel is unknown until the push succeeded
+        self.last_frame = None
+
+        if mode == "full":
+            self._display_full(image, frame)
+        elif mode == "fast":
+            self._display_fast(image, frame)
+        else:
+            self._display_partial(image, native_image, frame, boxes)
+
+        # Put device into low power mode (EPD displays maintain image when powered off)
+        logger.info("Putting Waveshare display into sleep mode for power saving.")
+        self.epd_display.sleep()
+
+        self.last_frame = frame
+        self.partial_refreshes = 0 if mode == "full" else self.partial_refreshes + 1
+        self._record_refresh(mode, boxes, self.spi_bytes - spi_bytes, time.monotonic() - start)
+
+    def get_refresh_mode(self, boxes):
+        """
+        Picks how the next frame is pushed: 'full', 'partial' or 'fast'.
+
+        Partial and fast refreshes skip the clearing flashes of a full refresh, but leave ghosting behind,
+        so a full refresh is forced after 'partial_refresh_limit' of them in a row. A limit of 0 disables them.
+
+        Args:
+            boxes (list): Changed windows as returned by get_dirty_boxes, or None if unknown.
+        """
+        limit = int(self.device_config.get_config("partial_refresh_limit", default=DEFAULT_PARTIAL_REFRESH_LIMIT))
+        if boxes is None or self.bi_color_display or self.partial_refreshes >= limit:
+            return "full"
+
+        panel_area = self.epd_display.width * self.epd_display.height
+        if self.display_window and get_boxes_area(boxes) <= panel_area * PARTIAL_REFRESH_MAX_AREA:
+            return "partial"
+        if self.display_partial:
+            return "partial"
+        if self.init_fast:
+            return "fast"
+        return "full"
+
+    def get_stats(self):
+        """Returns counters of the refreshes by mode and the bytes written over SPI."""
+        pushes = self.refresh_stats["full"] + self.refresh_stats["partial"] + self.refresh_stats["fast"]
+        return {
+            "full_refreshes": self.refresh_stats["full"],
+            "partial_refreshes": self.refresh_stats["partial"],
+            "fast_refreshes": self.refresh_stats["fast"],
+            "partial_refreshes_since_full": self.partial_refreshes,
+            "spi_bytes": self.refresh_stats["spi_bytes"],
+            "average_duration_seconds": round(self.refresh_stats["total_duration"] / pushes, 2) if pushes else None,
+            "last_refresh": self.last_refresh
+        }
+
+    def _display_full(self, image, frame):
         # Assume device was in sleep mode.
         self.epd_display_init()
 
@@ -110,14 +203,176 @@ class WaveshareDisplay(AbstractDisplay):
 
         # Display the image on the WS display.
         if not self.bi_color_display:
-            self.epd_display.display(self.epd_display.getbuffer(image))
+            # drivers with full frame partial refreshes keep the frame as base for the next ones
+            display = self.display_base or self.epd_display.display
+            display(self._get_buffer(image, frame))
         else:
-            color_image = Image.new('1', image.size, 255)
-            self.epd_display.display(
-                self.epd_display.getbuffer(image),
-                self.epd_display.getbuffer(color_image)
-            )
+            self.epd_display.display(*self._get_color_planes(image, frame))
 
-        # Put device into low power mode (EPD displays maintain image when powered off)
-        logger.info("Putting Waveshare display into sleep mode for power saving.")
-        self.epd_display.sleep()
+    def _display_fast(self, image, frame):
+        self.init_fast()
+        display = self.display_fast or self.epd_display.display
+        display(self._get_buffer(image, frame))
+
+    def _display_partial(self, image, native_image, frame, boxes):
+        if not boxes:
+            logger.info("Frame unchanged, nothing to push.")
+            return
+        if self.display_window:
+            (self.init_partial or self.epd_display_init)()
+            for box in boxes:
+                logger.info(f"Partial refresh of window {box}")
+                self.display_window(self._get_window_buffer(image, native_image, frame, box), *box)
+        else:
+            # a full init would reset the base image the driver diffs against, displayPartial wakes the panel itself
+            if self.init_partial:
+                self.init_partial()
+            self.display_partial(self._get_buffer(image, frame))
+
+    def _get_buffer(self, image, frame):
+        """
+        Returns the display buffer of the frame, packed with NumPy if it was quantized to the panel palette.
+
+        Many drivers pack the buffer pixel by pixel in Python, which takes seconds on large panels.
+        """
+        bits_per_pixel = PALETTE_BITS_PER_PIXEL.get(self.palette)
+        if bits_per_pixel and self._is_packable(image, bits_per_pixel):
+            buffer = pack_pixels(frame, bits_per_pixel)
+            if self._check_packer(bits_per_pixel, lambda: [buffer], lambda: [self._get_driver_buffer(image)]):
+                return buffer
+        return self._get_driver_buffer(image)
+
+    def _get_window_buffer(self, image, native_image, frame, box):
+        """
+        Returns the 1 bit buffer of a window, the windowed drivers index it by the window's width and height.
+
+        Args:
+            box (tuple): Window (x0, y0, x1, y1) in the native orientation of the panel, x0 and x1 byte aligned.
+        """
+        x0, y0, x1, y1 = box
+        if self.palette == "waveshare_bw" and self._is_packable(image, 1):
+            return pack_pixels(frame[y0:y1, x0:x1], 1)
+        window = native_image.crop(box)
+        # like the drivers' getbuffer, a set bit leaves the pixel white
+        return bytearray((window.convert("RGB") if window.mode == "P" else window).convert("1").tobytes())
+
+    def _get_color_planes(self, image, frame):
+        """Returns the black and the colour plane buffers of a bi-color display."""
+        if self._is_packable(image, "planes"):
+            planes = pack_color_planes(frame)
+            if self._check_packer("planes", lambda: planes, lambda: [
+                    self.epd_display.getbuffer(plane) for plane in self.split_color_planes(image)]):
+                return planes
+
+        black_image, color_image = self.split_color_planes(image)
+        if color_image is None:
+            return self.epd_display.getbuffer(black_image), get_blank_plane(self.epd_display.width, self.epd_display.height)
+        return self.epd_display.getbuffer(black_image), self.epd_display.getbuffer(color_image)
+
+    def _get_driver_buffer(self, image):
+        # frames quantized to the panel palette only hold colours the driver maps exactly
+        return self.epd_display.getbuffer(image.convert("RGB") if image.mode == "P" else image)
+
+    def _is_packable(self, image, layout):
+        """Checks whether the frame holds indices of the panel palette, as long as the packer has not failed its check."""
+        if image.mode != "P" or self.packer_checks.get(layout) is False:
+            return False
+        return self.device_config.get_config("panel_palette", default="auto") in ("auto", self.palette)
+
+    def _check_packer(self, layout, get_packed, get_expected):
+        """Compares the packed buffers with the driver's own on first use of a layout, falls back to the driver if they differ."""
+        if layout not in self.packer_checks:
+            matches = all(bytes(packed) == bytes(expected) for packed, expected in zip(get_packed(), get_expected()))
+            if not matches:
+                logger.warning(f"Packed buffer differs from the driver's for layout '{layout}', using the driver's getbuffer")
+            self.packer_checks[layout] = matches
+        return self.packer_checks[layout]
+
+    def _detect_refresh_modes(self):
+        """
+        Looks up the partial and fast refresh methods of the loaded driver, their names differ between models.
+
+        Windowed partial refreshes take the buffer of a window and its bounds, e.g.
+        display_Partial(buffer, Xstart, Ystart, Xend, Yend), full frame partial refreshes only the full frame
+        buffer, e.g. displayPartial(buffer). Methods with any other signature are not used.
+        """
+        self.display_window = None
+        self.display_partial = None
+        for name in ("display_Partial", "displayPartial", "display_partial"):
+            method = getattr(self.epd_display, name, None)
+            if not callable(method):
+                continue
+            args = [arg.lower().replace("_", "") for arg in inspect.getfullargspec(method).args[1:]]
+            if len(args) == 5 and args[1:] == WINDOW_ARGS:
+                self.display_window = method
+            elif len(args) == 1:
+                self.display_partial = method
+            else:
+                logger.info(f"Ignoring {name}{tuple(args)}, unknown partial refresh signature")
+        self.init_partial = self._find_method("init_part", "init_Part", "init_partial", "init_Partial")
+        self.display_base = self._find_method("displayPartBaseImage", "display_Base") if self.display_partial else None
+        self.init_fast = self._find_method("init_fast", "init_Fast")
+        self.display_fast = self._find_method("display_fast", "display_Fast")
+        logger.info(f"Waveshare refresh modes | windowed partial: {bool(self.display_window)}, "
+                    f"partial: {bool(self.display_partial)}, fast: {bool(self.init_fast)}")
+
+    def _find_method(self, *names):
+        return next((getattr(self.epd_display, name) for name in names
+                     if callable(getattr(self.epd_display, name, None))), None)
+
+    def _count_spi_writes(self, epd_module):
+        """
+        Wraps the SPI writes of the driver's epdconfig module to count the bytes sent to the panel.
+
+        Multi-byte spi_writebyte calls go through spi_writebyte2 in one transfer, spidev's writebytes
+        is limited to 4096 bytes while writebytes2 splits larger buffers itself.
+        """
+        self.spi_bytes = 0
+        epdconfig = getattr(epd_module, "epdconfig", None)
+        spi_writebyte = getattr(epdconfig, "spi_writebyte", None)
+        spi_writebyte2 = getattr(epdconfig, "spi_writebyte2", None)
+
+        if callable(spi_writebyte2):
+            def write_block(data):
+                self.spi_bytes += len(data)
+                return spi_writebyte2(data)
+            epdconfig.spi_writebyte2 = write_block
+
+        if callable(spi_writebyte):
+            def write_bytes(data):
+                self.spi_bytes += len(data)
+                if len(data) > 1 and callable(spi_writebyte2):
+                    return spi_writebyte2(data)
+                return spi_writebyte(data)
+            epdconfig.spi_writebyte = write_bytes
+
+    def _record_refresh(self, mode, boxes, spi_bytes, duration):
+        logger.info(f"Waveshare {mode} refresh sent {spi_bytes} bytes over SPI in {duration:.1f}s")
+        self.refresh_stats[mode] += 1
+        self.refresh_stats["spi_bytes"] += spi_bytes
+        self.refresh_stats["total_duration"] += duration
+        self.last_refresh = {
+            "mode": mode,
+            "windows": boxes if mode == "partial" and self.display_window else None,
+            "spi_bytes": spi_bytes,
+            "duration_seconds": round(duration, 2),
+            "time": datetime.now().astimezone().isoformat()
+        }
+
+
+    def split_color_planes(self, image):
+        """
+        Splits an image into the black and the colour plane of a bi-color display.
+
+        Images quantized to a palette with a third colour put the pixels of that colour on the
+        colour plane, any other image is shown in black and white without a colour plane.
+        """
+        if image.mode != "P":
+            return image, None
+        if len(image.getpalette()) < 9:
+            return image.convert("RGB"), None
+
+        # palette index 0 is black and index 2 the panel colour, see PANEL_PALETTES['waveshare_bwr']
+        black_image = image.point(lambda index: 0 if index == 0 else 255, "1")
+        color_image = image.point(lambda index: 0 if index == 2 else 255, "1")
+        return black_image, color_image
@@ -19,7 +19,7 @@ import json
 import logging
 import threading
 import argparse
-from utils.app_utils import generate_startup_image
+from utils.app_utils import generate_startup_image, get_cache_dir
 from flask import Flask, request
 from werkzeug.serving import is_running_from_reloader
 from config import Config
@@ -31,6 +31,12 @@ from blueprints.plugin import plugin_bp
 from blueprints.playlist import playlist_bp
 from jinja2 import ChoiceLoader, FileSystemLoader
 from plugins.plugin_registry import load_plugins
+from utils.render_server import configure_render_server, shutdown_render_server, DEFAULT_IDLE_TIMEOUT
+from utils.render_cache import configure_render_cache, DEFAULT_MAX_DISK_BYTES
+from utils.http_client import configure_http_client, DEFAULT_TIMEOUT, DEFAULT_RETRIES, DEFAULT_MAX_PER_HOST, DEFAULT_DEDUP_WINDOW
+from utils.http_cache import DEFAULT_MAX_DISK_BYTES as DEFAULT_HTTP_CACHE_BYTES, DEFAULT_STALE_IF_ERROR
+from utils.data_store import configure_data_store
+from utils.image_utils import configure_image_loading, DEFAULT_MAX_IMAGE_PIXELS, DEFAULT_MAX_DOWNLOAD_BYTES
 from waitress import serve
 
 
@@ -51,6 +57,10 @@ else:
     DEV_MODE = False
     PORT = 80
     logger.info("Starting InkyPi in PRODUCTION mode on port 80")
+
+# Web server worker threads, every open job progress stream occupies one
+WEB_SERVER_THREADS = 4
+
 logging.getLogger('waitress.queue').setLevel(logging.ERROR)
 app = Flask(__name__)
 template_dirs = [
@@ -65,6 +75,33 @@ refresh_task = RefreshTask(device_config, display_manager)
 
 load_plugins(device_config.get_plugins())
 
+# Keep a warm headless browser around for HTML based plugins
+configure_render_server(
+    enabled=device_config.get_config("render_server", default=True),
+    idle_timeout=device_config.get_config("render_server_idle_timeout", default=DEFAULT_IDLE_TIMEOUT))
+configure_render_cache(
+    enabled=device_config.get_config("render_cache", default=True),
+    max_disk_bytes=device_config.get_config("render_cache_max_bytes", default=DEFAULT_MAX_DISK_BYTES))
+# Shared keep-alive HTTP client of the plugins, revalidating cached GET responses
+configure_http_client(
+    timeout=device_config.get_config("http_timeout", default=DEFAULT_TIMEOUT),
+    retries=device_config.get_config("http_retries", default=DEFAULT_RETRIES),
+    max_per_host=device_config.get_config("http_max_per_host", default=DEFAULT_MAX_PER_HOST),
+    cache_dir=get_cache_dir("http") if device_config.get_config("http_cache", default=True) else None,
+    cache_max_bytes=device_config.get_config("http_cache_max_bytes", default=DEFAULT_HTTP_CACHE_BYTES),
+    stale_if_error=device_config.get_config("http_stale_if_error", default=DEFAULT_STALE_IF_ERROR),
+    plugin_ttls=device_config.get_config("http_cache_ttl", default={}),
+    dedup_window=device_config.get_config("http_dedup_window", default=DEFAULT_DEDUP_WINDOW))
+# Plugins render from the latest snapshot of their data while it is refreshed in the background
+data_store_enabled = device_config.get_config("data_store", default=True)
+configure_data_store(
+    enabled=data_store_enabled,
+    cache_dir=get_cache_dir("data") if data_store_enabled else None)
+# Refuse to download or decode oversized source images, the others are decoded close to display size
+configure_image_loading(
+    max_pixels=device_config.get_config("image_max_pixels", default=DEFAULT_MAX_IMAGE_PIXELS),
+    max_download_bytes=device_config.get_config("image_max_download_bytes", default=DEFAULT_MAX_DOWNLOAD_BYTES))
+
 # Store dependencies
 app.config['DEVICE_CONFIG'] = device_config
 app.config['DISPLAY_MANAGER'] = display_manager
@@ -84,14 +121,15 @@ register_heif_opener()
 
 if __name__ == '__main__':
 
-    # start the background refresh task
+    # start the display worker and the background refresh task
+    display_manager.start()
     refresh_task.start()
 
     # display default inkypi image on startup
     if device_config.get_config("startup") is True:
         logger.info("Startup flag is set, displaying startup image")
         img = generate_startup_image(device_config.get_resolution())
-        display_manager.display_image(img)
+        display_manager.submit(img)
         device_config.update_value("startup", False, write=True)
 
     try:
@@ -110,6 +148,8 @@ if __name__ == '__main__':
             except:
                 pass  # Ignore if we can't get the IP
             
-        serve(app, host="0.0.0.0", port=PORT, threads=1)
+        serve(app, host="0.0.0.0", port=PORT, threads=WEB_SERVER_THREADS)
     finally:
-        refresh_task.stop()
\ No newline at end of file
+        refresh_task.stop()
+        display_manager.stop()
+        shutdown_render_server()
\ No newline at end of file
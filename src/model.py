@@ -5,6 +5,22 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+def get_next_wall_time(current_dt, hour, minute):
+    """Returns the first datetime after current_dt at the wall clock time hour:minute in current_dt's timezone.
+
+    The wall time is localized on its own date, so a deadline across a DST change gets that date's UTC offset."""
+    tz = current_dt.tzinfo
+    for days in range(3):
+        naive = datetime.combine(current_dt.date() + timedelta(days=days), datetime.min.time()).replace(hour=hour, minute=minute)
+        if hasattr(tz, "localize"):
+            # pytz zones need localize, normalize moves wall times inside a DST gap past it
+            candidate = tz.normalize(tz.localize(naive))
+        else:
+            candidate = naive.replace(tzinfo=tz)
+        if candidate > current_dt:
+            return candidate
+    return None
+
 class RefreshInfo:
     """Keeps track of refresh metadata.
 
@@ -15,9 +31,10 @@ class RefreshInfo:
         plugin_id (str): Plugin id of the refresh.
         playlist (str): Playlist name if refresh_type is 'Playlist'.
         plugin_instance (str): Plugin instance name if refresh_type is 'Playlist'.
+        frame_hash (str): Hash of the final frame last sent to the panel, set once the push finished.
     """
 
-    def __init__(self, refresh_type, plugin_id, refresh_time, image_hash, playlist=None, plugin_instance=None):
+    def __init__(self, refresh_type, plugin_id, refresh_time, image_hash, playlist=None, plugin_instance=None, frame_hash=None):
         """Initialize RefreshInfo instance."""
         self.refresh_time = refresh_time
         self.image_hash = image_hash
@@ -25,6 +42,7 @@ class RefreshInfo:
         self.plugin_id = plugin_id
         self.playlist = playlist
         self.plugin_instance = plugin_instance
+        self.frame_hash = frame_hash
 
     def get_refresh_datetime(self):
         """Returns the refresh time as a datetime object or None if not set."""
@@ -44,6 +62,8 @@ class RefreshInfo:
             refresh_dict["playlist"] = self.playlist
         if self.plugin_instance:
             refresh_dict["plugin_instance"] = self.plugin_instance
+        if self.frame_hash:
+            refresh_dict["frame_hash"] = self.frame_hash
         return refresh_dict
 
     @classmethod
@@ -54,7 +74,8 @@ class RefreshInfo:
             refresh_type=data.get("refresh_type"),
             plugin_id=data.get("plugin_id"),
             playlist=data.get("playlist"),
-            plugin_instance=data.get("plugin_instance")
+            plugin_instance=data.get("plugin_instance"),
+            frame_hash=data.get("frame_hash")
         )
 
 class PlaylistManager:
@@ -231,6 +252,27 @@ class Playlist:
         
         return self.plugins[self.current_plugin_index]
 
+    def peek_next_plugin(self):
+        """Returns the plugin instance that get_next_plugin() will return next, without advancing the playlist."""
+        if not self.plugins:
+            return None
+        if self.current_plugin_index is None:
+            return self.plugins[0]
+        return self.plugins[(self.current_plugin_index + 1) % len(self.plugins)]
+
+    def get_next_transition_dt(self, current_dt):
+        """Returns the next datetime after current_dt at which the playlist becomes active or inactive.
+
+        Returns None for playlists whose active state never changes (all day or empty windows)."""
+        if self.start_time == self.end_time or self.get_time_range_minutes() >= 24 * 60:
+            return None
+
+        transitions = []
+        for boundary in (self.start_time, self.end_time):
+            hour, minute = (0, 0) if boundary == "24:00" else map(int, boundary.split(":"))
+            transitions.append(get_next_wall_time(current_dt, hour, minute))
+        return min(transitions)
+
     def get_priority(self):
         """Determine priority of a playlist, based on the time range"""
         return self.get_time_range_minutes()
@@ -328,6 +370,30 @@ class PluginInstance:
 
         return False
 
+    def get_next_refresh_dt(self, current_time):
+        """Returns the datetime at which the plugin is next due for a refresh based on its refresh settings.
+
+        Plugins that have never been refreshed are due immediately. Returns None if the refresh settings
+        contain no usable rule."""
+        latest_refresh_dt = self.get_latest_refresh_dt()
+        if not latest_refresh_dt:
+            return current_time
+
+        deadlines = []
+        interval = self.refresh.get("interval")
+        if interval:
+            deadlines.append(latest_refresh_dt + timedelta(seconds=interval))
+
+        scheduled_time_str = self.refresh.get("scheduled")
+        if scheduled_time_str:
+            scheduled_time = datetime.strptime(scheduled_time_str, "%H:%M").time()
+            # the stored refresh time only has a fixed offset, the schedule follows the current timezone
+            if latest_refresh_dt.tzinfo and current_time.tzinfo:
+                latest_refresh_dt = latest_refresh_dt.astimezone(current_time.tzinfo)
+            deadlines.append(get_next_wall_time(latest_refresh_dt, scheduled_time.hour, scheduled_time.minute))
+
+        return min(deadlines) if deadlines else None
+
     def get_image_path(self):
         """Formats the image path for this plugin instance."""
         return f"{self.plugin_id}_{self.name.replace(' ', '_')}.png"
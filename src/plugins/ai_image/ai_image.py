@@ -1,9 +1,7 @@
 from plugins.base_plugin.base_plugin import BasePlugin
 from openai import OpenAI
-from PIL import Image
-from io import BytesIO
+from utils.image_utils import load_image, download_image
 import base64
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -81,12 +79,11 @@ class AIImage(BasePlugin):
         response = ai_client.images.generate(**args)
         if model in ["dall-e-3", "dall-e-2"]:
             image_url = response.data[0].url
-            response = requests.get(image_url)
-            img = Image.open(BytesIO(response.content))
+            img = download_image(image_url)
         elif model == "gpt-image-1":
             image_base64 = response.data[0].b64_json
             image_bytes = base64.b64decode(image_base64)
-            img = Image.open(BytesIO(image_bytes))
+            img = load_image(image_bytes)
         return img
 
     @staticmethod
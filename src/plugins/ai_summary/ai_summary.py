@@ -7,7 +7,7 @@ from utils.image_utils import resize_image
 from io import BytesIO
 from datetime import datetime, timedelta
 import time
-import requests
+from utils.http_client import get_http_client
 import logging
 import textwrap
 import os
@@ -70,7 +70,7 @@ class AISummary(BasePlugin):
     
     @staticmethod
     def fetch_rss_last_2_days(url):
-        feed = feedparser.parse(url)
+        feed = get_http_client().get_parsed(url, lambda response: feedparser.parse(response.content))
 
         # get channel metadata 
         channel_title = feed.feed.get("title", "")
@@ -6,9 +6,7 @@ For the API key, set `NASA_SECRET={API_KEY}` in your .env file.
 """
 
 from plugins.base_plugin.base_plugin import BasePlugin
-from PIL import Image
-from io import BytesIO
-import requests
+from utils.image_utils import download_image
 import logging
 from random import randint
 from datetime import datetime, timedelta
@@ -44,7 +42,7 @@ class Apod(BasePlugin):
         elif settings.get("customDate"):
             params["date"] = settings["customDate"]
 
-        response = requests.get("https://api.nasa.gov/planetary/apod", params=params)
+        response = self.http.get("https://api.nasa.gov/planetary/apod", params=params)
 
         if response.status_code != 200:
             logger.error(f"NASA API error: {response.text}")
@@ -57,9 +55,12 @@ class Apod(BasePlugin):
 
         image_url = data.get("hdurl") or data.get("url")
 
+        dimensions = device_config.get_resolution()
+        if device_config.get_config("orientation") == "vertical":
+            dimensions = dimensions[::-1]
+
         try:
-            img_data = requests.get(image_url)
-            image = Image.open(BytesIO(img_data.content))
+            image = download_image(image_url, dimensions)
         except Exception as e:
             logger.error(f"Failed to load APOD image: {str(e)}")
             raise RuntimeError("Failed to load APOD image.")
@@ -1,9 +1,15 @@
 import logging
 import os
+import time
 from utils.app_utils import resolve_path, get_fonts
 from utils.image_utils import take_screenshot_html
+from utils.render_cache import get_render_cache
+from utils.http_client import get_http_client
+from utils.data_store import get_data_store
+from refresh_jobs import RefreshJob, report_stage
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
 import asyncio
 import base64
 
@@ -47,6 +53,68 @@ class BasePlugin:
                 autoescape=select_autoescape(['html', 'xml'])
             )
 
+    @property
+    def http(self):
+        """Shared HTTP client with keep-alive connections, default timeouts, retries and caching, see HttpClient.
+
+        Cached responses stay fresh for the plugin's TTL override from the 'http_cache_ttl' config if set.
+        """
+        return get_http_client().for_plugin(self.config.get("id"))
+
+    def fetch_data(self, key, fetch, max_age, max_stale=None, with_fetched_at=False):
+        """
+        Returns the data fetched by fetch(), served from the shared data store while it is fresh.
+
+        Data older than max_age but younger than max_stale seconds is returned without waiting
+        while it is fetched again in the background, see DataStore. The returned data must not be
+        modified.
+
+        Args:
+            key (str): Identifies the data among the plugin's sources, include every parameter of the fetch.
+            fetch (callable): Fetches the data without arguments, JSON serializable data is persisted.
+            max_age (float): Seconds the data is fresh.
+            max_stale (float, optional): Seconds stale data may be shown while it is revalidated.
+            with_fetched_at (bool): Whether to return a tuple of the data and the epoch time it was fetched.
+        """
+        data_store = get_data_store()
+        if not data_store:
+            data = fetch()
+            return (data, time.time()) if with_fetched_at else data
+        return data_store.get(f"{self.config.get('id')}:{key}", fetch, max_age, max_stale, with_fetched_at)
+
+    def fetch_concurrently(self, fetches, timeout, max_workers=None):
+        """
+        Runs independent fetches concurrently, waiting for all of them up to a shared deadline.
+
+        Fetches still running at the deadline are left to finish in the background, their results
+        still end up in the data store or HTTP cache for the next refresh.
+
+        Args:
+            fetches (dict): Callables without arguments by name.
+            timeout (float): Seconds to wait for all fetches together.
+            max_workers (int, optional): Fetches running at once, defaults to all of them.
+
+        Returns:
+            tuple: Dicts of the results and of the exceptions by name, unfinished fetches
+                map to a TimeoutError.
+        """
+        executor = ThreadPoolExecutor(max_workers=min(len(fetches), max_workers or len(fetches)), thread_name_prefix=f"{self.config.get('id')}-fetch")
+        try:
+            futures = {name: executor.submit(fetch) for name, fetch in fetches.items()}
+            wait(futures.values(), timeout=timeout)
+        finally:
+            executor.shutdown(wait=False)
+
+        results, errors = {}, {}
+        for name, future in futures.items():
+            if not future.done():
+                errors[name] = TimeoutError(f"{name} did not finish within {timeout}s")
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+            else:
+                results[name] = future.result()
+        return results, errors
+
     def generate_image(self, settings, device_config):
         raise NotImplementedError("generate_image must be implemented by subclasses")
 
@@ -70,6 +138,7 @@ class BasePlugin:
         return template_params
 
     def render_image(self, dimensions, html_file, css_file=None, template_params={}):
+        report_stage(RefreshJob.RENDERING)
         # load the base plugin and current plugin css files
         css_files = [os.path.join(BASE_PLUGIN_RENDER_DIR, "plugin.css")]
         if css_file:
@@ -86,4 +155,17 @@ class BasePlugin:
         template = self.env.get_template(html_file)
         rendered_html = template.render(template_params)
 
-        return take_screenshot_html(rendered_html, dimensions)
+        # skip the browser entirely if this exact page has been rendered before
+        render_cache = get_render_cache()
+        cache_key = None
+        if render_cache:
+            cache_key = render_cache.fingerprint(rendered_html, dimensions)
+            image = render_cache.get(cache_key)
+            if image is not None:
+                logger.info(f"Using cached render for {html_file}")
+                return image
+
+        image = take_screenshot_html(rendered_html, dimensions)
+        if image and cache_key:
+            render_cache.put(cache_key, image)
+        return image
@@ -2,18 +2,27 @@ import os
 from utils.app_utils import resolve_path, get_font
 from plugins.base_plugin.base_plugin import BasePlugin
 from plugins.calendar.constants import LOCALE_MAP, FONT_SIZES
+from plugins.calendar.ics_cache import IcsCache
 from PIL import Image, ImageColor, ImageDraw, ImageFont
-import icalendar
-import recurring_ical_events
 from io import BytesIO
 import logging
-import requests
 from datetime import datetime, timedelta
 import pytz
 
 logger = logging.getLogger(__name__)
 
+# Connect and read timeouts of every feed request, in seconds
+FEED_TIMEOUT = (5, 20)
+# Seconds all feeds may take together, feeds still loading fall back to their cached events
+FEEDS_DEADLINE = 45
+MAX_CONCURRENT_FEEDS = 4
+
 class Calendar(BasePlugin):
+    def __init__(self, config, **dependencies):
+        super().__init__(config, **dependencies)
+        # parsed feeds and expanded occurrences, shared by all calendar instances
+        self.ics_cache = IcsCache()
+
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
         template_params['style_settings'] = True
@@ -71,28 +80,63 @@ class Calendar(BasePlugin):
         return image
     
     def fetch_ics_events(self, calendar_urls, colors, tz, start_range, end_range):
-        parsed_events = []
+        """
+        Fetches and expands the feeds concurrently, a failing feed does not fail the others.
 
-        for calendar_url, color in zip(calendar_urls, colors):
-            cal = self.fetch_calendar(calendar_url)
-            events = recurring_ical_events.of(cal).between(start_range, end_range)
-            contrast_color = self.get_contrast_color(color)
+        A feed that fails or misses FEEDS_DEADLINE shows its last cached events, marked as stale.
 
-            for event in events:
-                start, end, all_day = self.parse_data_points(event, tz)
-                parsed_event = {
-                    "title": str(event.get("summary")),
-                    "start": start,
-                    "backgroundColor": color,
-                    "textColor": contrast_color,
-                    "allDay": all_day
-                }
-                if end:
-                    parsed_event['end'] = end
+        A feed without cached events is left out, unless no feed could be loaded at all.
 
+        Raises:
+            RuntimeError: If every feed failed without cached events to fall back to.
+        """
+        fetches = {
+            index: (lambda url=calendar_url: self.fetch_feed_events(url, tz, start_range, end_range))
+            for index, calendar_url in enumerate(calendar_urls)
+        }
+        results, errors = self.fetch_concurrently(fetches, FEEDS_DEADLINE, max_workers=MAX_CONCURRENT_FEEDS)
+
+        parsed_events, failed = [], []
+        for index, (calendar_url, color) in enumerate(zip(calendar_urls, colors)):
+            if index in errors:
+                logger.warning(f"Failed to fetch iCalendar url {calendar_url}: {errors[index]}")
+                events = self.ics_cache.get_cached_events(calendar_url, start_range, end_range,
+                                                          lambda event: self.parse_event(event, tz), variant=tz.zone)
+                if events is None:
+                    failed.append(errors[index])
+                    continue
+                stale = True
+            else:
+                events, stale = results[index]
+
+            contrast_color = self.get_contrast_color(color)
+            for event in events:
+                parsed_event = {**event, "backgroundColor": color, "textColor": contrast_color}
+                if stale:
+                    parsed_event["classNames"] = ["stale"]
                 parsed_events.append(parsed_event)
 
+        if failed and len(failed) == len(calendar_urls):
+            raise RuntimeError(f"Failed to fetch iCalendar url: {str(failed[0])}")
         return parsed_events
+
+    def fetch_feed_events(self, calendar_url, tz, start_range, end_range):
+        """Returns the events of one feed and whether they are stale because the feed could not be reached."""
+        response = self.fetch_calendar(calendar_url)
+        events = self.ics_cache.get_events(calendar_url, response, start_range, end_range,
+                                           lambda event: self.parse_event(event, tz), variant=tz.zone)
+        return events, getattr(response, "stale", False)
+
+    def parse_event(self, event, tz):
+        start, end, all_day = self.parse_data_points(event, tz)
+        parsed_event = {
+            "title": str(event.get("summary")),
+            "start": start,
+            "allDay": all_day
+        }
+        if end:
+            parsed_event['end'] = end
+        return parsed_event
     
     def get_view_range(self, view, current_dt, settings):
         start = datetime(current_dt.year, current_dt.month, current_dt.day)
@@ -139,9 +183,9 @@ class Calendar(BasePlugin):
 
     def fetch_calendar(self, calendar_url):
         try:
-            response = requests.get(calendar_url)
+            response = self.http.get(calendar_url, timeout=FEED_TIMEOUT)
             response.raise_for_status()
-            return icalendar.Calendar.from_ical(response.text)
+            return response
         except Exception as e:
             raise RuntimeError(f"Failed to fetch iCalendar url: {str(e)}")
 
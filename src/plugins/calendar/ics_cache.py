@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import icalendar
+import recurring_ical_events
+
+logger = logging.getLogger(__name__)
+
+# Days of expanded occurrences kept per feed, a month view needs about 50
+MAX_CACHED_DAYS = 120
+# Parsed feeds kept in memory
+MAX_CACHED_FEEDS = 16
+
+
+class IcsCache:
+    """Parsed ICS feeds and their expanded occurrences, memoized per day.
+
+    A feed is parsed again only when its body changes, detected by the digest the HTTP cache keeps
+    for it. Recurrences are expanded for the days a view needs that have not been expanded before,
+    so sliding the view by a day expands a single day, and an unchanged feed viewed over the same
+    range is not expanded at all.
+
+    Attributes:
+        max_days (int): Days of occurrences kept per feed, least recently used are dropped first.
+        stats (dict): Parse and expansion counters.
+    """
+
+    def __init__(self, max_days=MAX_CACHED_DAYS, max_feeds=MAX_CACHED_FEEDS):
+        self.max_days = max_days
+        self.max_feeds = max_feeds
+        self.stats = {"parses": 0, "expansions": 0, "expanded_days": 0, "hits": 0}
+
+        self.lock = threading.Lock()
+        self.feeds = OrderedDict()
+        self.feed_locks = {}
+        # events last returned per feed, readable while the feed is being parsed or expanded
+        self.last_events = {}
+
+    def get_events(self, url, response, start, end, parse_event, variant=""):
+        """
+        Returns the events of the feed overlapping the days from start to end.
+
+        Args:
+            url (str): Feed url.
+            response (requests.Response): Latest response of the feed.
+            start (datetime): Start of the view, rounded down to the day.
+            end (datetime): Exclusive end of the view, rounded up to the day.
+            parse_event (callable): Turns an occurrence into an event dict with 'start' and optional
+                'end' ISO 8601 strings.
+            variant (str): Anything parse_event depends on besides the occurrence, e.g. the timezone.
+
+        Returns:
+            list: Event dicts, each occurrence once.
+        """
+        key = (url, variant)
+        with self.lock:
+            feed_lock = self.feed_locks.setdefault(key, threading.Lock())
+
+        with feed_lock:
+            events = self._get_events(self._get_entry(key, response), start, end, parse_event)
+        with self.lock:
+            self.last_events[key] = events
+        return events
+
+    def get_cached_events(self, url, start, end, parse_event, variant=""):
+        """
+        Returns the events of the last parsed version of the feed, see get_events.
+
+        If the feed is being parsed or expanded right now, e.g. by a fetch that missed its deadline,
+        the events it last returned that overlap the days from start to end are used instead.
+
+        Returns:
+            list: Event dicts, or None if no events of the feed were returned before.
+        """
+        key = (url, variant)
+        with self.lock:
+            entry = self.feeds.get(key)
+            feed_lock = self.feed_locks.get(key)
+            last_events = self.last_events.get(key)
+        if entry is not None and feed_lock.acquire(blocking=False):
+            try:
+                return self._get_events(entry, start, end, parse_event)
+            finally:
+                feed_lock.release()
+        if last_events is None:
+            return None
+        days = _get_days(start, end)
+        return [event for event in last_events if _overlaps(_get_event_days(event), days[0], days[-1])]
+
+    def get_stats(self):
+        with self.lock:
+            return {**self.stats, "feeds": len(self.feeds)}
+
+    def _get_events(self, entry, start, end, parse_event):
+        """Collects the events of the days from start to end, expanding the days not expanded yet. Called with the feed lock held."""
+        days = _get_days(start, end)
+        missing = [day for day in days if day not in entry["days"]]
+        for first, last in _split_runs(missing):
+            self._expand(entry, first, last, parse_event)
+        if not missing:
+            with self.lock:
+                self.stats["hits"] += 1
+
+        events, seen = [], set()
+        for day in days:
+            entry["days"].move_to_end(day)
+            for event_key, event in entry["days"][day]:
+                if event_key not in seen:
+                    seen.add(event_key)
+                    events.append(event)
+        while len(entry["days"]) > max(self.max_days, len(days)):
+            entry["days"].popitem(last=False)
+        return events
+
+    def _get_entry(self, key, response):
+        """Returns the cached feed, parsing the response if the feed is new or changed."""
+        digest = getattr(response, "cache_digest", None) or hashlib.sha256(response.content).hexdigest()
+        with self.lock:
+            entry = self.feeds.get(key)
+            if entry is not None:
+                self.feeds.move_to_end(key)
+        if entry is not None and entry["digest"] == digest:
+            return entry
+
+        logger.debug(f"Parsing changed calendar {key[0]}")
+        entry = {"digest": digest, "calendar": icalendar.Calendar.from_ical(response.content), "days": OrderedDict()}
+        with self.lock:
+            self.stats["parses"] += 1
+            self.feeds[key] = entry
+            self.feeds.move_to_end(key)
+            while len(self.feeds) > self.max_feeds:
+                evicted, _ = self.feeds.popitem(last=False)
+                self.last_events.pop(evicted, None)
+        return entry
+
+    def _expand(self, entry, first, last, parse_event):
+        """Expands the occurrences from day first to day last and files them under every day they overlap."""
+        # the days are only marked as expanded once all their occurrences were parsed
+        expanded = {day: [] for day in _date_range(first, last)}
+        occurrences = recurring_ical_events.of(entry["calendar"]).between(
+            datetime.combine(first, datetime.min.time()), datetime.combine(last + timedelta(days=1), datetime.min.time()))
+
+        for occurrence in occurrences:
+            event = parse_event(occurrence)
+            event_key = (str(occurrence.get("uid")), event["start"])
+            event_first, event_last = _get_event_days(event)
+            # occurrences the library matched in another timezone still belong to this range
+            event_first = min(max(event_first, first), last)
+            event_last = max(min(event_last, last), event_first)
+            for day in _date_range(event_first, event_last):
+                expanded[day].append((event_key, event))
+        entry["days"].update(expanded)
+
+        with self.lock:
+            self.stats["expansions"] += 1
+            self.stats["expanded_days"] += (last - first).days + 1
+
+
+def _get_days(start, end):
+    """Returns the dates from start's day up to the day containing the last instant before end."""
+    return list(_date_range(start.date(), (end - timedelta(microseconds=1)).date()))
+
+
+def _get_event_days(event):
+    """Returns the first and the last date an event dict overlaps."""
+    event_first = datetime.fromisoformat(event["start"]).date()
+    event_last = event_first
+    if event.get("end"):
+        event_last = max(event_first, (datetime.fromisoformat(event["end"]) - timedelta(microseconds=1)).date())
+    return event_first, event_last
+
+
+def _overlaps(event_days, first, last):
+    return event_days[0] <= last and event_days[1] >= first
+
+
+def _date_range(first, last):
+    for offset in range((last - first).days + 1):
+        yield first + timedelta(days=offset)
+
+
+def _split_runs(days):
+    """Groups sorted dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
@@ -1,10 +1,9 @@
 from plugins.base_plugin.base_plugin import BasePlugin
 from PIL import Image, ImageDraw, ImageFont
 
-import requests
-
 from .comic_parser import COMICS, get_panel
 from utils.app_utils import get_font
+from utils.image_utils import download_image
 
 class Comic(BasePlugin):
     def generate_settings_template(self):
@@ -20,7 +19,7 @@ class Comic(BasePlugin):
         is_caption = settings.get("titleCaption") == "true"
         caption_font_size = settings.get("fontSize")
 
-        comic_panel = get_panel(comic)
+        comic_panel = get_panel(comic, self.http)
 
         dimensions = device_config.get_resolution()
         if device_config.get_config("orientation") == "vertical":
@@ -30,10 +29,7 @@ class Comic(BasePlugin):
         return self._compose_image(comic_panel, is_caption, caption_font_size, width, height)
 
     def _compose_image(self, comic_panel, is_caption, caption_font_size, width, height):
-        response = requests.get(comic_panel["image_url"], stream=True)
-        response.raise_for_status()
-
-        with Image.open(response.raw) as img:
+        with download_image(comic_panel["image_url"], (width, height)) as img:
             background = Image.new("RGB", (width, height), "white")
             font = get_font("Jost", font_size=int(caption_font_size))
             draw = ImageDraw.Draw(background)
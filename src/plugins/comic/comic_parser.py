@@ -2,6 +2,8 @@ import feedparser
 import html
 import re
 
+from utils.http_client import get_http_client
+
 
 COMICS = {
     "XKCD": {
@@ -63,8 +65,9 @@ COMICS = {
 }
 
 
-def get_panel(comic_name):
-    feed = feedparser.parse(COMICS[comic_name]["feed"])
+def get_panel(comic_name, http=None):
+    http = http or get_http_client()
+    feed = http.get_parsed(COMICS[comic_name]["feed"], lambda response: feedparser.parse(response.content))
     try:
         element = COMICS[comic_name]["element"](feed)
     except IndexError:
@@ -1,4 +1,4 @@
-import requests
+from utils.http_client import get_http_client
 import logging
 from datetime import datetime, date, timedelta
 
@@ -63,7 +63,7 @@ def fetch_contributions(username, api_key):
     url = "https://api.github.com/graphql"
     headers = {"Authorization": f"Bearer {api_key}"}
     variables = {"username": username}
-    resp = requests.post(url, json={"query": GRAPHQL_QUERY, "variables": variables}, headers=headers)
+    resp = get_http_client().post(url, json={"query": GRAPHQL_QUERY, "variables": variables}, headers=headers)
     resp.raise_for_status()
     return resp.json()
 
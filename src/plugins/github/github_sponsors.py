@@ -1,4 +1,4 @@
-import requests
+from utils.http_client import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -69,7 +69,7 @@ def fetch_sponsorships(username, api_key):
     headers = {"Authorization": f"Bearer {api_key}"}
     variables = {"username": username}
 
-    resp = requests.post(url, json={"query": GRAPHQL_QUERY, "variables": variables}, headers=headers)
+    resp = get_http_client().post(url, json={"query": GRAPHQL_QUERY, "variables": variables}, headers=headers)
     resp.raise_for_status()
     data = resp.json()
 
@@ -1,5 +1,5 @@
 import logging
-import requests
+from utils.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +16,7 @@ def stars_generate_image(plugin_instance, settings, device_config):
         raise RuntimeError("GitHub repository is required.")
 
     try:
-        stars = fetch_stars(github_repository)
+        stars = fetch_stars(github_repository, plugin_instance.http)
     except Exception as e:
         logger.error(f"GitHub graphql request failed: {str(e)}")
         raise RuntimeError(f"GitHub request failure, please check logs")
@@ -34,12 +34,12 @@ def stars_generate_image(plugin_instance, settings, device_config):
         template_params
     )
 
-def fetch_stars(github_repository):
+def fetch_stars(github_repository, http=None):
     global data
     url = f"https://api.github.com/repos/{github_repository}"
     headers = {"Accept": "application/json"}
 
-    response = requests.get(url, headers=headers)
+    response = (http or get_http_client()).get(url, headers=headers)
     if response.status_code == 200:
         data = response.json()
     else:
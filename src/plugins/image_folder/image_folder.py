@@ -2,24 +2,30 @@ from plugins.base_plugin.base_plugin import BasePlugin
 from PIL import Image, ImageOps, ImageColor
 import logging
 import os
-import random
+import threading
+import uuid
 
-from utils.image_utils import pad_image_blur
+from utils.app_utils import get_cache_dir
+from utils.image_utils import pad_image_blur, load_image
+from plugins.image_folder.image_index import ImageIndex
 
 logger = logging.getLogger(__name__)
 
-def list_files_in_folder(folder_path):
-    """Return a list of image file paths in the given folder, excluding hidden files."""
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heif', '.heic')
-    image_files = []
-    for root, dirs, files in os.walk(folder_path):
-        for f in files:
-            if f.lower().endswith(image_extensions) and not f.startswith('.'):
-                image_files.append(os.path.join(root, f))
+class ImageFolder(BasePlugin):
+    def __init__(self, config, **dependencies):
+        super().__init__(config, **dependencies)
+        # image indexes by folder, shared by all image folder instances
+        self.indexes = {}
+        self.indexes_lock = threading.Lock()
 
-    return image_files
+    def get_index(self, folder_path):
+        """Returns the index of the folder, loading its persisted index on first use."""
+        with self.indexes_lock:
+            index = self.indexes.get(folder_path)
+            if index is None:
+                index = self.indexes[folder_path] = ImageIndex(folder_path, get_cache_dir("image_folder"))
+            return index
 
-class ImageFolder(BasePlugin):
     def generate_image(self, settings, device_config):
         folder_path = settings.get('folder_path')
         if not folder_path:
@@ -37,17 +43,22 @@ class ImageFolder(BasePlugin):
 
         logger.info(f"Grabbing a random image from: {folder_path}")
 
-        image_files = list_files_in_folder(folder_path)
-        if not image_files:
-            raise RuntimeError(f"No image files found in folder: {folder_path}")
+        index = self.get_index(folder_path)
+        index.refresh()
 
-        image_url = random.choice(image_files)
-        logger.info(f"Random image selected {image_url}")
+        if settings.get('shuffle') == "true":
+            # each instance walks its own shuffled order, the cursor and order id are kept in its settings
+            order_id = settings.setdefault('shuffle_id', uuid.uuid4().hex)
+            image_url, settings['image_index'] = index.get_next(settings.get('image_index', 0), order_id)
+        else:
+            image_url = index.get_random()
+        if not image_url:
+            raise RuntimeError(f"No image files found in folder: {folder_path}")
+        logger.info(f"Image selected {image_url}")
 
         img = None
         try:
-            img = Image.open(image_url)
-            img = ImageOps.exif_transpose(img)  # Correct orientation using EXIF
+            img = load_image(image_url, dimensions, exif_transpose=True)  # Correct orientation using EXIF
 
             if settings.get('padImage') == "true":
                 if settings.get('backgroundOption', 'blur') == "blur":
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heif', '.heic')
+# Seconds between checks of the folder for added or removed images
+RESCAN_INTERVAL = 900
+# Directories modified this close to a scan are listed again, their mtime may not reflect the last change yet
+MTIME_GRANULARITY = 2
+# Shuffled orders kept per folder, one per plugin instance showing it, least recently used are dropped first
+MAX_SHUFFLE_ORDERS = 8
+INDEX_VERSION = 2
+
+
+def list_images_in_dir(dir_path):
+    """Returns the image files and the subdirectories of a directory, excluding hidden files."""
+    files, subdirs = [], []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # like os.walk, symlinked directories are not followed
+                if not entry.is_symlink():
+                    subdirs.append(entry.name)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and not entry.name.startswith('.'):
+                files.append(entry.name)
+    return sorted(files), sorted(subdirs)
+
+
+class ImageIndex:
+    """Persistent index of the images below a folder.
+
+    Every directory is stored with its mtime, its images and its subdirectories. A rescan stats each
+    directory and lists only those whose mtime changed, as adding, removing or renaming an entry
+    updates the mtime of its directory. An unchanged tree of any size is rescanned with one stat per
+    directory and no listing.
+
+    Shuffled selection walks a persisted permutation of the images with a cursor kept by the caller,
+    so every image is shown once before any is repeated. Every caller, e.g. a plugin instance, gets
+    its own permutation by order id, so one caller starting a new cycle does not disturb the others.
+    Images added meanwhile are appended to every permutation and removed ones are skipped, keeping
+    the cursors valid.
+
+    Attributes:
+        folder_path (str): Absolute path of the indexed folder.
+        index_path (str): JSON file the index is persisted to, None to keep it in memory only.
+        rescan_interval (float): Seconds a scan is trusted before the folder is checked again.
+        stats (dict): Scan counters.
+    """
+
+    def __init__(self, folder_path, index_dir=None, rescan_interval=RESCAN_INTERVAL):
+        self.folder_path = os.path.abspath(folder_path)
+        self.index_path = None
+        if index_dir:
+            digest = hashlib.sha256(self.folder_path.encode("utf-8")).hexdigest()
+            self.index_path = os.path.join(index_dir, f"{digest}.json")
+        self.rescan_interval = rescan_interval
+        self.stats = {"scans": 0, "listed_dirs": 0, "reused_dirs": 0}
+
+        self.lock = threading.Lock()
+        self.scanned_at = 0
+        self.dirs = {}
+        self.files = []
+        self.orders = {}
+        self._load()
+
+    def refresh(self, force=False):
+        """
+        Rescans the folder if the last scan is older than rescan_interval.
+
+        Returns:
+            bool: True if images were added or removed.
+        """
+        with self.lock:
+            if not force and time.time() - self.scanned_at < self.rescan_interval:
+                return False
+            return self._scan()
+
+    def get_random(self):
+        """Returns the path of a random image, or None if the folder has no images."""
+        with self.lock:
+            if not self.files:
+                return None
+            return os.path.join(self.folder_path, random.choice(self.files))
+
+    def get_next(self, cursor, order_id=""):
+        """
+        Returns the next image of the shuffled order.
+
+        Once every image was returned, the images are shuffled again without starting with the last
+        one returned.
+
+        Args:
+            cursor (int): Position returned by the previous call, 0 to start.
+            order_id (str): Identifies the caller's own shuffled order.
+
+        Returns:
+            tuple: Path of the image, or None if the folder has no images, and the cursor for the next call.
+        """
+        with self.lock:
+            order = self.orders.pop(order_id, None)
+            if order is None:
+                # a new order starts from its beginning, whatever cursor the caller kept
+                order, cursor = [], 0
+            # the most recently used order is kept last
+            self.orders[order_id] = order
+
+            cursor = max(cursor or 0, 0)
+            for position in range(cursor, len(order)):
+                if order[position] is not None:
+                    return os.path.join(self.folder_path, order[position]), position + 1
+
+            if not self.files:
+                return None, 0
+            last = next((path for path in reversed(order[:cursor]) if path is not None), None)
+            order = self.orders[order_id] = list(self.files)
+            random.shuffle(order)
+            if len(order) > 1 and order[0] == last:
+                order[0], order[-1] = order[-1], order[0]
+            while len(self.orders) > MAX_SHUFFLE_ORDERS:
+                del self.orders[next(iter(self.orders))]
+            self._save()
+            return os.path.join(self.folder_path, order[0]), 1
+
+    def get_stats(self):
+        with self.lock:
+            return {**self.stats, "images": len(self.files), "dirs": len(self.dirs)}
+
+    def __len__(self):
+        return len(self.files)
+
+    def _scan(self):
+        """Updates the index from the directories whose mtime changed. Called with the lock held."""
+        started = time.time()
+        dirs, listed = {}, 0
+        pending = [""]
+        while pending:
+            relative_dir = pending.pop()
+            dir_path = os.path.join(self.folder_path, relative_dir)
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"Failed to read image directory {dir_path}: {e}")
+                continue
+
+            cached = self.dirs.get(relative_dir)
+            if cached is not None and cached[0] == mtime:
+                files, subdirs = cached[1], cached[2]
+            else:
+                try:
+                    files, subdirs = list_images_in_dir(dir_path)
+                except OSError as e:
+                    logger.warning(f"Failed to list image directory {dir_path}: {e}")
+                    continue
+                listed += 1
+                if mtime >= (started - MTIME_GRANULARITY) * 1e9:
+                    mtime = None
+
+            dirs[relative_dir] = [mtime, files, subdirs]
+            pending.extend(os.path.join(relative_dir, subdir) for subdir in reversed(subdirs))
+
+        files = [os.path.join(relative_dir, f) for relative_dir, entry in dirs.items() for f in entry[1]]
+        current, previous = set(files), set(self.files)
+        added = [path for path in files if path not in previous]
+        removed = previous - current
+
+        for order in self.orders.values():
+            if removed:
+                order[:] = [None if path in removed else path for path in order]
+            if added:
+                random.shuffle(added)
+                order.extend(added)
+
+        self.stats["scans"] += 1
+        self.stats["listed_dirs"] += listed
+        self.stats["reused_dirs"] += len(dirs) - listed
+        logger.info(f"Indexed {len(files)} images in {self.folder_path}, listed {listed} of {len(dirs)} "
+                    f"directories in {time.time() - started:.2f}s")
+
+        self.dirs, self.files, self.scanned_at = dirs, files, started
+        self._save()
+        return bool(added or removed)
+
+    def _load(self):
+        """Loads the persisted index of the folder, starting empty if there is none."""
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load image index {self.index_path}: {e}")
+            return
+        if index.get("version") != INDEX_VERSION or index.get("folder") != self.folder_path:
+            return
+
+        self.scanned_at = index["scanned_at"]
+        self.dirs = index["dirs"]
+        self.orders = index["orders"]
+        self.files = [os.path.join(relative_dir, f) for relative_dir, entry in self.dirs.items() for f in entry[1]]
+
+    def _save(self):
+        if not self.index_path:
+            return
+        index = {"version": INDEX_VERSION, "folder": self.folder_path, "scanned_at": self.scanned_at,
+                 "dirs": self.dirs, "orders": self.orders}
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist image index {self.index_path}: {e}")
@@ -3,18 +3,18 @@ from PIL import Image, ImageOps, ImageColor
 import logging
 import random
 
-from utils.image_utils import pad_image_blur
+from utils.image_utils import pad_image_blur, load_image
 
 logger = logging.getLogger(__name__)
 
 
 class ImageUpload(BasePlugin):
-    def open_image(self, img_index: int, image_locations: list) -> Image:
+    def open_image(self, img_index: int, image_locations: list, dimensions: tuple[int, int] = None) -> Image:
         if not image_locations:
             raise RuntimeError("No images provided.")
-        # Open the image using Pillow
+        # Decode the image close to the display size
         try:
-            image = Image.open(image_locations[img_index])
+            image = load_image(image_locations[img_index], dimensions)
         except Exception as e:
             logger.error(f"Failed to read image file: {str(e)}")
             raise RuntimeError("Failed to read image file.")
@@ -30,22 +30,22 @@ class ImageUpload(BasePlugin):
             # Prevent Index out of range issues when file list has changed
             img_index = 0
 
+        orientation = device_config.get_config("orientation")
+        dimensions = device_config.get_resolution()
+        if orientation == "vertical":
+            dimensions = dimensions[::-1]
+
         if settings.get('randomize') == "true":
             img_index = random.randrange(0, len(image_locations))
-            image = self.open_image(img_index, image_locations)
+            image = self.open_image(img_index, image_locations, dimensions)
         else:
-            image = self.open_image(img_index, image_locations)
+            image = self.open_image(img_index, image_locations, dimensions)
             img_index = (img_index + 1) % len(image_locations)
 
         # Write the new index back ot the device json
         settings['image_index'] = img_index
-        orientation = device_config.get_config("orientation")
 
         if settings.get('padImage') == "true":
-            dimensions = device_config.get_resolution()
-            if orientation == "vertical":
-                dimensions = dimensions[::-1]
-
             if settings.get('backgroundOption') == "blur":
                 return pad_image_blur(image, dimensions)
             else:
@@ -1,7 +1,6 @@
 from plugins.base_plugin.base_plugin import BasePlugin
 from PIL import Image
-from io import BytesIO
-import requests
+from utils.image_utils import download_image, DEFAULT_DOWNLOAD_TIMEOUT
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +8,7 @@ logger = logging.getLogger(__name__)
 def grab_image(image_url, dimensions, timeout_ms=40000):
     """Grab an image from a URL and resize it to the specified dimensions."""
     try:
-        response = requests.get(image_url, timeout=timeout_ms / 1000)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content))
+        img = download_image(image_url, dimensions, timeout=(DEFAULT_DOWNLOAD_TIMEOUT[0], timeout_ms / 1000))
         img = img.resize(dimensions, Image.LANCZOS)
         return img
     except Exception as e:
@@ -3,7 +3,7 @@ from utils.app_utils import resolve_path
 from PIL import Image
 from utils.image_utils import resize_image
 from datetime import datetime
-import requests
+from utils.http_client import get_http_client
 import logging
 import random
 
@@ -99,7 +99,7 @@ class Movierecs(BasePlugin):
     @staticmethod
     def fetch_movie_data(title, api_key):
         url = f"http://www.omdbapi.com/?apikey={api_key}&t={title}&plot=full"
-        resp = requests.get(url)
+        resp = get_http_client().get(url)
 
         if resp.status_code != 200:
             logger.error(f"OMDB error for: '{title}', skipping")
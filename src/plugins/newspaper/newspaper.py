@@ -22,10 +22,14 @@ class Newspaper(BasePlugin):
         # check the next day, then today, then prior day
         days = [today + timedelta(days=diff) for diff in [1,0,-1,-2]]
 
+        dimensions = device_config.get_resolution()
+        if device_config.get_config("orientation") == "horizontal":
+            dimensions = dimensions[::-1]
+
         image = None
         for date in days:
             image_url = FREEDOM_FORUM_URL.format(date.day, newspaper_slug)
-            image = get_image(image_url)
+            image = get_image(image_url, dimensions)
             if image:
                 logging.info(f"Found {newspaper_slug} front cover for {date.strftime('%Y-%m-%d')}")
                 break
@@ -34,10 +38,6 @@ class Newspaper(BasePlugin):
             # expand height if newspaper is wider than resolution
             img_width, img_height = image.size
 
-            dimensions = device_config.get_resolution()
-            if device_config.get_config("orientation") == "horizontal":
-                dimensions = dimensions[::-1]
-
             desired_width, desired_height = dimensions
 
             img_ratio = img_width / img_height
@@ -2,7 +2,6 @@ from plugins.base_plugin.base_plugin import BasePlugin
 from PIL import Image
 from io import BytesIO
 import feedparser
-import requests
 import logging
 import html
 
@@ -46,11 +45,9 @@ class Rss(BasePlugin):
         return image
     
     def parse_rss_feed(self, url, timeout=10):
-        resp = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
-        resp.raise_for_status()
-        
-        # Parse the feed content
-        feed = feedparser.parse(resp.content)
+        # parsed again only when the feed changed
+        feed = self.http.get_parsed(url, lambda resp: feedparser.parse(resp.content),
+                                    timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
         items = []
 
         for entry in feed.entries:
@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HOUR_SECONDS = 3600
+
+
+def parse_local_times(times, utc_offset_seconds):
+    """
+    Parses Open-Meteo ISO 8601 local times into epoch seconds in one vectorized pass.
+
+    Args:
+        times (list): Times like '2024-05-01T13:00' in the local time of the forecast location.
+        utc_offset_seconds (int): UTC offset of the forecast location, as returned with the data.
+
+    Returns:
+        numpy.ndarray: int64 epoch seconds, empty if the times cannot be parsed.
+    """
+    try:
+        local = np.array(times, dtype="datetime64[s]")
+    except ValueError as e:
+        logger.warning(f"Could not parse Open-Meteo times: {e}")
+        return np.empty(0, dtype=np.int64)
+    return local.astype(np.int64) - int(utc_offset_seconds)
+
+
+def parse_local_time(time_str, utc_offset_seconds, tz):
+    """Parses a single Open-Meteo local time into an aware datetime in tz."""
+    local_tz = timezone(timedelta(seconds=int(utc_offset_seconds)))
+    return datetime.fromisoformat(time_str).replace(tzinfo=local_tz).astimezone(tz)
+
+
+class HourlySeries:
+    """Hourly Open-Meteo series aligned to one parsed time index.
+
+    The 'time' array of the response is parsed once, the current hour and any later hour are then
+    found with a binary search instead of parsing every time string per data point.
+
+    Attributes:
+        hourly (dict): The 'hourly' object of the response, series by name.
+        utc_offset_seconds (int): UTC offset of the local times of the response.
+        epochs (numpy.ndarray): Start of every hour in epoch seconds.
+    """
+
+    def __init__(self, hourly, utc_offset_seconds=0):
+        self.hourly = hourly or {}
+        self.utc_offset_seconds = int(utc_offset_seconds)
+        self.epochs = parse_local_times(self.hourly.get("time", []), utc_offset_seconds)
+
+    @classmethod
+    def from_response(cls, response, tz=None):
+        """Builds the series of an Open-Meteo response, using tz's current offset if the response has none."""
+        offset = response.get("utc_offset_seconds")
+        if offset is None:
+            offset = datetime.now(tz).utcoffset().total_seconds() if tz else 0
+        return cls(response.get("hourly", {}), offset)
+
+    def get_index(self, timestamp):
+        """Returns the index of the hour containing the epoch timestamp, or None if it is not covered."""
+        index = int(np.searchsorted(self.epochs, timestamp, side="right")) - 1
+        if index < 0 or timestamp - self.epochs[index] >= HOUR_SECONDS:
+            return None
+        return index
+
+    def get_value(self, name, index):
+        """Returns the value of the series at the index, or None if it is missing."""
+        values = self.hourly.get(name, [])
+        if index is None or index >= len(values):
+            return None
+        return values[index]
+
+    def get_datetime(self, index, tz):
+        """Returns the start of the hour at the index as an aware datetime in tz."""
+        return datetime.fromtimestamp(int(self.epochs[index]), tz)
+
+    def __len__(self):
+        return len(self.epochs)
@@ -1,12 +1,13 @@
 from plugins.base_plugin.base_plugin import BasePlugin
+from .hourly_series import HourlySeries, parse_local_time
 from PIL import Image
 import os
-import requests
 import logging
 from datetime import datetime, timezone, date
 from astral import moon
 import pytz
 from io import BytesIO
+from functools import lru_cache
 import math
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,12 @@ def get_moon_phase_name(phase_age: float) -> str:
             return phase_name  
     return "newmoon"
 
+@lru_cache(maxsize=16)
+def get_timezone(name):
+    """Returns the pytz timezone for the name, looked up once per name."""
+    logger.info(f"Using timezone from weather data: {name}")
+    return pytz.timezone(name)
+
 UNITS = {
     "standard": {
         "temperature": "K",
@@ -57,6 +64,14 @@ OPEN_METEO_UNIT_PARAMS = {
     "imperial": "temperature_unit=fahrenheit&wind_speed_unit=mph&precipitation_unit=inch"
 }
 
+# Seconds fetched data is fresh, and shown while it is refreshed in the background
+WEATHER_MAX_AGE = 10 * 60
+WEATHER_MAX_STALE = 3 * 60 * 60
+# Decimal places of the coordinates the location name is cached for, about 100 meters
+LOCATION_PRECISION = 3
+# Seconds the concurrent weather, air quality and location requests may take together
+FETCH_DEADLINE = 45
+
 class Weather(BasePlugin):
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
@@ -90,10 +105,20 @@ class Weather(BasePlugin):
                 api_key = device_config.load_env_key("OPEN_WEATHER_MAP_SECRET")
                 if not api_key:
                     raise RuntimeError("Open Weather Map API Key not configured.")
-                weather_data = self.get_weather_data(api_key, units, lat, long)
-                aqi_data = self.get_air_quality(api_key, lat, long)
+                fetches = {
+                    "weather": lambda: self.fetch_data(f"openweathermap:{lat},{long},{units}",
+                                                       lambda: self.get_weather_data(api_key, units, lat, long),
+                                                       WEATHER_MAX_AGE, WEATHER_MAX_STALE, with_fetched_at=True),
+                    "air quality": lambda: self.fetch_data(f"openweathermap_aqi:{lat},{long}",
+                                                           lambda: self.get_air_quality(api_key, lat, long),
+                                                           WEATHER_MAX_AGE, WEATHER_MAX_STALE)
+                }
                 if settings.get('titleSelection', 'location') == 'location':
-                    title = self.get_location(api_key, lat, long)
+                    fetches["location"] = lambda: self.get_cached_location(api_key, lat, long)
+                results = self.fetch_weather(fetches)
+                (weather_data, fetched_at), aqi_data = results["weather"], results.get("air quality")
+                if "location" in fetches:
+                    title = results.get("location", title)
                 if settings.get('weatherTimeZone', 'locationTimeZone') == 'locationTimeZone':
                     logger.info("Using location timezone for OpenWeatherMap data.")
                     wtz = self.parse_timezone(weather_data)
@@ -103,8 +128,15 @@ class Weather(BasePlugin):
                     template_params = self.parse_weather_data(weather_data, aqi_data, tz, units, time_format)
             elif weather_provider == "OpenMeteo":
                 forecast_days = 7
-                weather_data = self.get_open_meteo_data(lat, long, units, forecast_days + 1)
-                aqi_data = self.get_open_meteo_air_quality(lat, long)
+                results = self.fetch_weather({
+                    "weather": lambda: self.fetch_data(f"openmeteo:{lat},{long},{units},{forecast_days}",
+                                                       lambda: self.get_open_meteo_data(lat, long, units, forecast_days + 1),
+                                                       WEATHER_MAX_AGE, WEATHER_MAX_STALE, with_fetched_at=True),
+                    "air quality": lambda: self.fetch_data(f"openmeteo_aqi:{lat},{long}",
+                                                           lambda: self.get_open_meteo_air_quality(lat, long),
+                                                           WEATHER_MAX_AGE, WEATHER_MAX_STALE)
+                })
+                (weather_data, fetched_at), aqi_data = results["weather"], results.get("air quality", {})
                 template_params = self.parse_open_meteo_data(weather_data, aqi_data, tz, units, time_format)
             else:
                 raise RuntimeError(f"Unknown weather provider: {weather_provider}")
@@ -120,13 +152,14 @@ class Weather(BasePlugin):
 
         template_params["plugin_settings"] = settings
 
-        # Add last refresh time
-        now = datetime.now(tz)
+        # Add last refresh time, the time the weather data was fetched, which is older while the provider is unreachable
+        fetched_dt = datetime.fromtimestamp(fetched_at, tz)
         if time_format == "24h":
-            last_refresh_time = now.strftime("%Y-%m-%d %H:%M")
+            last_refresh_time = fetched_dt.strftime("%Y-%m-%d %H:%M")
         else:
-            last_refresh_time = now.strftime("%Y-%m-%d %I:%M %p")
+            last_refresh_time = fetched_dt.strftime("%Y-%m-%d %I:%M %p")
         template_params["last_refresh_time"] = last_refresh_time
+        template_params["data_stale"] = datetime.now(tz).timestamp() - fetched_at > WEATHER_MAX_AGE
 
         image = self.render_image(dimensions, "weather.html", "weather.css", template_params)
 
@@ -134,6 +167,23 @@ class Weather(BasePlugin):
             raise RuntimeError("Failed to take screenshot, please check logs.")
         return image
 
+    def fetch_weather(self, fetches):
+        """
+        Runs the provider requests concurrently within FETCH_DEADLINE.
+
+        Only the weather data is required, the image is rendered without air quality or location
+        if those requests fail.
+
+        Returns:
+            dict: Results of the successful requests by name.
+        """
+        results, errors = self.fetch_concurrently(fetches, FETCH_DEADLINE)
+        for name, error in errors.items():
+            logger.warning(f"Failed to retrieve {name} data: {error}")
+        if "weather" in errors:
+            raise errors["weather"]
+        return results
+
     def parse_weather_data(self, weather_data, aqi_data, tz, units, time_format):
         current = weather_data.get("current")
         dt = datetime.fromtimestamp(current.get('dt'), tz=timezone.utc).astimezone(tz)
@@ -169,10 +219,14 @@ class Weather(BasePlugin):
             "time_format": time_format
         }
 
+        # the hourly times are parsed once per response, every data point looks up its hour in them
+        hours = HourlySeries.from_response(weather_data, tz)
+        aqi_hours = HourlySeries.from_response(aqi_data, tz)
+
         data['forecast'] = self.parse_open_meteo_forecast(weather_data.get('daily', {}), tz)
-        data['data_points'] = self.parse_open_meteo_data_points(weather_data, aqi_data, tz, units, time_format)
+        data['data_points'] = self.parse_open_meteo_data_points(weather_data, hours, aqi_hours, tz, units, time_format)
         
-        data['hourly_forecast'] = self.parse_open_meteo_hourly(weather_data.get('hourly', {}), tz, time_format)
+        data['hourly_forecast'] = self.parse_open_meteo_hourly(hours, tz, time_format)
         return data
 
     def map_weather_code_to_icon(self, weather_code, hour):
@@ -334,40 +388,21 @@ class Weather(BasePlugin):
             hourly.append(hour_forecast)
         return hourly
 
-    def parse_open_meteo_hourly(self, hourly_data, tz, time_format):
+    def parse_open_meteo_hourly(self, hours, tz, time_format):
+        """Parses the next 24 hours, starting with the current one, from the aligned hourly series."""
+        start_index = hours.get_index(datetime.now(tz).timestamp()) or 0
+
         hourly = []
-        times = hourly_data.get('time', [])
-        temperatures = hourly_data.get('temperature_2m', [])
-        precipitation_probabilities = hourly_data.get('precipitation_probability', [])
-        rain = hourly_data.get('precipitation', [])
-        current_time_in_tz = datetime.now(tz)
-        start_index = 0
-        for i, time_str in enumerate(times):
-            try:
-                dt_hourly = datetime.fromisoformat(time_str).astimezone(tz)
-                if dt_hourly.date() == current_time_in_tz.date() and dt_hourly.hour >= current_time_in_tz.hour:
-                    start_index = i
-                    break
-                if dt_hourly.date() > current_time_in_tz.date():
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} in hourly data.")
-                continue
-
-        sliced_times = times[start_index:]
-        sliced_temperatures = temperatures[start_index:]
-        sliced_precipitation_probabilities = precipitation_probabilities[start_index:]
-        sliced_rain = rain[start_index:]
-
-        for i in range(min(24, len(sliced_times))):
-            dt = datetime.fromisoformat(sliced_times[i]).astimezone(tz)
-            hour_forecast = {
-                "time": self.format_time(dt, time_format, True),
-                "temperature": int(sliced_temperatures[i]) if i < len(sliced_temperatures) else 0,
-                "precipitation": (sliced_precipitation_probabilities[i] / 100) if i < len(sliced_precipitation_probabilities) else 0,
-                "rain": (sliced_rain[i]) if i < len(sliced_rain) else 0
-            }
-            hourly.append(hour_forecast)
+        for i in range(start_index, min(start_index + 24, len(hours))):
+            temperature = hours.get_value('temperature_2m', i)
+            precipitation_probability = hours.get_value('precipitation_probability', i)
+            rain = hours.get_value('precipitation', i)
+            hourly.append({
+                "time": self.format_time(hours.get_datetime(i, tz), time_format, True),
+                "temperature": int(temperature) if temperature is not None else 0,
+                "precipitation": precipitation_probability / 100 if precipitation_probability is not None else 0,
+                "rain": rain if rain is not None else 0
+            })
         return hourly
 
     def parse_data_points(self, weather, air_quality, tz, units, time_format):
@@ -434,29 +469,29 @@ class Weather(BasePlugin):
             "icon": self.get_plugin_dir('icons/visibility.png')
         })
 
-        aqi = air_quality.get('list', [])[0].get("main", {}).get("aqi")
-        data_points.append({
-            "label": "Air Quality",
-            "measurement": aqi,
-            "unit": ["Good", "Fair", "Moderate", "Poor", "Very Poor"][int(aqi)-1],
-            "icon": self.get_plugin_dir('icons/aqi.png')
-        })
+        if air_quality:
+            aqi = air_quality.get('list', [])[0].get("main", {}).get("aqi")
+            data_points.append({
+                "label": "Air Quality",
+                "measurement": aqi,
+                "unit": ["Good", "Fair", "Moderate", "Poor", "Very Poor"][int(aqi)-1],
+                "icon": self.get_plugin_dir('icons/aqi.png')
+            })
 
         return data_points
 
-    def parse_open_meteo_data_points(self, weather_data, aqi_data, tz, units, time_format):
-        """Parses current data points from Open-Meteo API response."""
+    def parse_open_meteo_data_points(self, weather_data, hours, aqi_hours, tz, units, time_format):
+        """Parses current data points from Open-Meteo API response and its aligned hourly series."""
         data_points = []
         daily_data = weather_data.get('daily', {})
         current_data = weather_data.get('current_weather', {})
-        hourly_data = weather_data.get('hourly', {})
 
         current_time = datetime.now(tz)
 
         # Sunrise
         sunrise_times = daily_data.get('sunrise', [])
         if sunrise_times:
-            sunrise_dt = datetime.fromisoformat(sunrise_times[0]).astimezone(tz)
+            sunrise_dt = parse_local_time(sunrise_times[0], hours.utc_offset_seconds, tz)
             data_points.append({
                 "label": "Sunrise",
                 "measurement": self.format_time(sunrise_dt, time_format, include_am_pm=False),
@@ -469,7 +504,7 @@ class Weather(BasePlugin):
         # Sunset
         sunset_times = daily_data.get('sunset', [])
         if sunset_times:
-            sunset_dt = datetime.fromisoformat(sunset_times[0]).astimezone(tz)
+            sunset_dt = parse_local_time(sunset_times[0], hours.utc_offset_seconds, tz)
             data_points.append({
                 "label": "Sunset",
                 "measurement": self.format_time(sunset_dt, time_format, include_am_pm=False),
@@ -487,75 +522,38 @@ class Weather(BasePlugin):
             "icon": self.get_plugin_dir('icons/wind.png')
         })
 
-        # Humidity
-        current_humidity = "N/A"
-        humidity_hourly_times = hourly_data.get('time', [])
-        humidity_values = hourly_data.get('relative_humidity_2m', [])
-        for i, time_str in enumerate(humidity_hourly_times):
-            try:
-                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
-                    current_humidity = int(humidity_values[i])
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} for humidity.")
-                continue
+        # Humidity, pressure and visibility of the current hour
+        now = current_time.timestamp()
+        current_hour = hours.get_index(now)
+        humidity = hours.get_value('relative_humidity_2m', current_hour)
         data_points.append({
-            "label": "Humidity", "measurement": current_humidity, "unit": '%',
+            "label": "Humidity", "measurement": int(humidity) if humidity is not None else "N/A", "unit": '%',
             "icon": self.get_plugin_dir('icons/humidity.png')
         })
 
-        # Pressure
-        current_pressure = "N/A"
-        pressure_hourly_times = hourly_data.get('time', [])
-        pressure_values = hourly_data.get('surface_pressure', [])
-        for i, time_str in enumerate(pressure_hourly_times):
-            try:
-                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
-                    current_pressure = int(pressure_values[i])
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} for pressure.")
-                continue
+        pressure = hours.get_value('surface_pressure', current_hour)
         data_points.append({
-            "label": "Pressure", "measurement": current_pressure, "unit": 'hPa',
+            "label": "Pressure", "measurement": int(pressure) if pressure is not None else "N/A", "unit": 'hPa',
             "icon": self.get_plugin_dir('icons/pressure.png')
         })
 
         # UV Index
-        uv_index_hourly_times = aqi_data.get('hourly', {}).get('time', [])
-        uv_index_values = aqi_data.get('hourly', {}).get('uv_index', [])
-        current_uv_index = "N/A"
-        for i, time_str in enumerate(uv_index_hourly_times):
-            try:
-                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
-                    current_uv_index = uv_index_values[i]
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} for UV Index.")
-                continue
+        current_aqi_hour = aqi_hours.get_index(now)
+        uv_index = aqi_hours.get_value('uv_index', current_aqi_hour)
         data_points.append({
-            "label": "UV Index", "measurement": current_uv_index, "unit": '',
+            "label": "UV Index", "measurement": uv_index if uv_index is not None else "N/A", "unit": '',
             "icon": self.get_plugin_dir('icons/uvi.png')
         })
 
         # Visibility
         current_visibility = "N/A"
-        visibility_hourly_times = hourly_data.get('time', [])
-        visibility_values = hourly_data.get('visibility', [])
-        for i, time_str in enumerate(visibility_hourly_times):
-            try:
-                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
-                    visibility = visibility_values[i]
-                    if units == "imperial":
-                        current_visibility = int(round(visibility, 0))
-                        unit_label = "ft"
-                    else:
-                        current_visibility = round(visibility / 1000, 1)
-                        unit_label = "km"
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} for visibility.")
-                continue
+        unit_label = "ft" if units == "imperial" else "km"
+        visibility = hours.get_value('visibility', current_hour)
+        if visibility is not None:
+            if units == "imperial":
+                current_visibility = int(round(visibility, 0))
+            else:
+                current_visibility = round(visibility / 1000, 1)
 
         visibility_str = f">{current_visibility}" if isinstance(current_visibility, (int, float)) and (
             (units == "imperial" and current_visibility >= 32808) or 
@@ -568,20 +566,11 @@ class Weather(BasePlugin):
         })
 
         # Air Quality
-        aqi_hourly_times = aqi_data.get('hourly', {}).get('time', [])
-        aqi_values = aqi_data.get('hourly', {}).get('european_aqi', [])
-        current_aqi = "N/A"
-        for i, time_str in enumerate(aqi_hourly_times):
-            try:
-                if datetime.fromisoformat(time_str).astimezone(tz).hour == current_time.hour:
-                    current_aqi = round(aqi_values[i], 1)
-                    break
-            except ValueError:
-                logger.warning(f"Could not parse time string {time_str} for AQI.")
-                continue
+        aqi = aqi_hours.get_value('european_aqi', current_aqi_hour)
+        current_aqi = round(aqi, 1) if aqi is not None else "N/A"
         scale = ""
-        if current_aqi:
-            scale = ["Good","Fair","Moderate","Poor","Very Poor","Ext Poor"][min(current_aqi//20,5)]
+        if isinstance(current_aqi, (int, float)):
+            scale = ["Good","Fair","Moderate","Poor","Very Poor","Ext Poor"][min(int(current_aqi)//20,5)]
         data_points.append({
             "label": "Air Quality", "measurement": current_aqi,
             "unit": scale, "icon": self.get_plugin_dir('icons/aqi.png')
@@ -591,7 +580,7 @@ class Weather(BasePlugin):
 
     def get_weather_data(self, api_key, units, lat, long):
         url = WEATHER_URL.format(lat=lat, long=long, units=units, api_key=api_key)
-        response = requests.get(url)
+        response = self.http.get(url)
         if not 200 <= response.status_code < 300:
             logging.error(f"Failed to retrieve weather data: {response.content}")
             raise RuntimeError("Failed to retrieve weather data.")
@@ -600,7 +589,7 @@ class Weather(BasePlugin):
 
     def get_air_quality(self, api_key, lat, long):
         url = AIR_QUALITY_URL.format(lat=lat, long=long, api_key=api_key)
-        response = requests.get(url)
+        response = self.http.get(url)
 
         if not 200 <= response.status_code < 300:
             logging.error(f"Failed to get air quality data: {response.content}")
@@ -610,7 +599,7 @@ class Weather(BasePlugin):
 
     def get_location(self, api_key, lat, long):
         url = GEOCODING_URL.format(lat=lat, long=long, api_key=api_key)
-        response = requests.get(url)
+        response = self.http.get(url)
 
         if not 200 <= response.status_code < 300:
             logging.error(f"Failed to get location: {response.content}")
@@ -621,10 +610,20 @@ class Weather(BasePlugin):
 
         return location_str
 
+    def get_cached_location(self, api_key, lat, long):
+        """
+        Returns the location name from the persistent data store, fetched once per rounded coordinates.
+
+        The name never expires, POST /api/data/invalidate with the prefix 'weather:location:' to fetch
+        the names again.
+        """
+        key = f"location:{round(float(lat), LOCATION_PRECISION)},{round(float(long), LOCATION_PRECISION)}"
+        return self.fetch_data(key, lambda: self.get_location(api_key, lat, long), max_age=None)
+
     def get_open_meteo_data(self, lat, long, units, forecast_days):
         unit_params = OPEN_METEO_UNIT_PARAMS[units]
         url = OPEN_METEO_FORECAST_URL.format(lat=lat, long=long, forecast_days=forecast_days) + f"&{unit_params}"
-        response = requests.get(url)
+        response = self.http.get(url)
         
         if not 200 <= response.status_code < 300:
             logging.error(f"Failed to retrieve Open-Meteo weather data: {response.content}")
@@ -634,7 +633,7 @@ class Weather(BasePlugin):
 
     def get_open_meteo_air_quality(self, lat, long):
         url = OPEN_METEO_AIR_QUALITY_URL.format(lat=lat, long=long)
-        response = requests.get(url)
+        response = self.http.get(url)
         if not 200 <= response.status_code < 300:
             logging.error(f"Failed to retrieve Open-Meteo air quality data: {response.content}")
             raise RuntimeError("Failed to retrieve Open-Meteo air quality data.")
@@ -656,8 +655,7 @@ class Weather(BasePlugin):
     def parse_timezone(self, weatherdata):
         """Parse timezone from weather data"""
         if 'timezone' in weatherdata:
-            logger.info(f"Using timezone from weather data: {weatherdata['timezone']}")
-            return pytz.timezone(weatherdata['timezone'])
+            return get_timezone(weatherdata['timezone'])
         else:
             logger.error("Failed to retrieve Timezone from weather data")
             raise RuntimeError("Timezone not found in weather data.")
@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# Number of finished jobs kept around for status requests
+MAX_FINISHED_JOBS = 50
+
+_current = threading.local()
+
+
+class RefreshJob:
+    """A manual refresh requested through the web UI, tracked through its stages.
+
+    Attributes:
+        job_id (str): Unique job identifier returned to the client.
+        refresh_action (RefreshAction): The refresh to perform.
+        stage (str): Current stage ['queued', 'fetching', 'rendering', 'hashing', 'displaying', 'done', 'failed'].
+        stages (list): Every stage entered so far with the time it was entered and the seconds since submission.
+        error (str): Error message if the job failed.
+        message (str): Human readable outcome once the job is finished.
+    """
+
+    QUEUED = "queued"
+    FETCHING = "fetching"
+    RENDERING = "rendering"
+    HASHING = "hashing"
+    DISPLAYING = "displaying"
+    DONE = "done"
+    FAILED = "failed"
+
+    FINISHED_STAGES = (DONE, FAILED)
+
+    def __init__(self, refresh_action, registry):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.refresh_action = refresh_action
+        self.registry = registry
+        self.stage = None
+        self.stages = []
+        self.error = None
+        self.message = None
+        self.start = time.monotonic()
+        self.set_stage(RefreshJob.QUEUED)
+
+    def set_stage(self, stage, error=None, message=None):
+        """Moves the job to the given stage and wakes up anybody waiting on it."""
+        with self.registry.condition:
+            if self.is_finished() or stage == self.stage:
+                return
+            self.stage = stage
+            self.error = error
+            self.message = message
+            self.stages.append({
+                "stage": stage,
+                "time": datetime.now().astimezone().isoformat(),
+                "elapsed_seconds": round(time.monotonic() - self.start, 2)
+            })
+            self.registry.version += 1
+            self.registry.condition.notify_all()
+
+    def fail(self, error):
+        self.set_stage(RefreshJob.FAILED, error=str(error))
+
+    def finish(self, message=None):
+        self.set_stage(RefreshJob.DONE, message=message)
+
+    def is_finished(self):
+        return self.stage in RefreshJob.FINISHED_STAGES
+
+    def wait(self, timeout=None):
+        """Blocks until the job is finished. Returns False if the timeout expired first."""
+        with self.registry.condition:
+            return self.registry.condition.wait_for(self.is_finished, timeout)
+
+    def to_dict(self):
+        with self.registry.condition:
+            return {
+                "job_id": self.job_id,
+                "plugin_id": self.refresh_action.get_plugin_id(),
+                "stage": self.stage,
+                "stages": list(self.stages),
+                "error": self.error,
+                "message": self.message
+            }
+
+
+class RefreshJobRegistry:
+    """Keeps track of submitted refresh jobs so their progress can be queried and streamed."""
+
+    def __init__(self, max_finished_jobs=MAX_FINISHED_JOBS):
+        self.max_finished_jobs = max_finished_jobs
+        self.condition = threading.Condition()
+        self.jobs = OrderedDict()
+        # bumped on every stage change, lets streams wait for any change
+        self.version = 0
+
+    def create(self, refresh_action):
+        job = RefreshJob(refresh_action, self)
+        with self.condition:
+            self.jobs[job.job_id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def wait_for_change(self, version, timeout):
+        """Waits until any job changes stage after the given version, returns the latest version."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished()]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job_id]
+
+
+def set_current_job(job):
+    """Sets the job the current thread is working on, so deeper layers can report progress."""
+    _current.job = job
+
+
+def report_stage(stage):
+    """Reports progress of the job the current thread is working on, if any."""
+    job = getattr(_current, "job", None)
+    if job:
+        job.set_stage(stage)
@@ -1,17 +1,30 @@
 import threading
 import time
 import os
+import copy
+import json
+import hashlib
 import logging
 import psutil
 import pytz
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from plugins.plugin_registry import get_plugin_instance
 from utils.image_utils import compute_image_hash
 from model import RefreshInfo, PlaylistManager
+from scheduler import RefreshScheduler
+from refresh_jobs import RefreshJob, RefreshJobRegistry, set_current_job, report_stage
+from collections import deque
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for a single sleep, guards against wall clock jumps (NTP sync, DST changes)
+MAX_SLEEP_SECONDS = 60 * 60
+# Seconds before the cycle boundary at which the next playlist plugin is rendered
+DEFAULT_PRERENDER_LEAD_SECONDS = 60
+# Upper bound for waiting on a pre-render that is still in progress at the cycle boundary
+PRERENDER_JOIN_TIMEOUT = 60
+
 class RefreshTask:
     """Handles the logic for refreshing the display using a backgroud thread."""
 
@@ -23,11 +36,18 @@ class RefreshTask:
         self.lock = threading.Lock()
         self.condition = threading.Condition(self.lock)
         self.running = False
-        self.manual_update_request = ()
-
-        self.refresh_event = threading.Event()
-        self.refresh_event.set()
-        self.refresh_result = {}
+        self.manual_update_queue = deque()
+        self.jobs = RefreshJobRegistry()
+        self.scheduler = RefreshScheduler()
+
+        # state of the speculative render of the next playlist plugin, guarded by its own lock so the
+        # render thread never has to wait for the refresh loop
+        self.prerender_lock = threading.Lock()
+        self.prerender_thread = None
+        self.prerender_target = None
+        self.prerendered = None
+        self.prerender_generation = 0
+        self.prerender_stats = {"started": 0, "used": 0, "discarded": 0, "failed": 0}
 
     def start(self):
         """Starts the background thread for refreshing the display."""
@@ -49,23 +69,24 @@ class RefreshTask:
     def _run(self):
         """Background task that manages the periodic refresh of the display.
 
-        This function runs in a loop, sleeping for a configured duration (`plugin_cycle_interval_seconds`) or until
-        manually triggered via `manual_update()`. Detrmines the next plugin to refresh based on active playlists and 
-        updates the display accordingly.
+        This function runs in a loop, sleeping until the next deadline in the refresh schedule or until
+        manually triggered via `manual_update()`. Deadlines come from the plugin cycle interval, the start
+        and end of every playlist window and the refresh settings of the plugin instance on display.
 
         Workflow:
-        1. Waits for the configured sleep duration or until notified of a manual update.
-        2. Checks if a manual update has been requested:
-        - If so, refreshes the specified plugin immediately.
-        3. Otherwise, determines the next plugin to refresh based on the active playlist and generates an image.
-        4. Compares the image hash with the last displayed image hash.
-        - If the image has changed, updates the display.
-        - If the image is the same, skips the refresh.
-        5. Updates the refresh metadata in the device configuration.
+        1. Waits until the earliest scheduled deadline or until notified of a manual update.
+        2. Checks if manual updates have been queued:
+        - If so, refreshes the plugin of the oldest queued job immediately, reporting its progress on the job.
+        3. Otherwise, handles the deadlines that are due:
+        - Cycle interval elapsed or active playlist changed: refreshes the next plugin of the active playlist.
+        - Refresh of the displayed plugin instance due: refreshes that instance in place.
+        4. Hands the image to the display worker, the e-ink refresh runs without blocking this loop.
+        - The worker skips the refresh if the final, quantized frame matches what the panel already shows.
+        5. Updates the refresh metadata in the device configuration and re-plans the handled deadlines.
         6. Repeats the process until `stop()` is called.
 
-        Handles any exceptions that occur during the refresh process and ensures the refresh event is set 
-        to indicate completion.
+        Handles any exceptions that occur during the refresh process and marks the manual update job,
+        if any, as failed.
 
         Exceptions:
         - Captures and logs any unexpected errors during execution to prevent the thread from exiting.
@@ -73,13 +94,11 @@ class RefreshTask:
         while True:
             try:
                 with self.condition:
-                    sleep_time = self.device_config.get_config("plugin_cycle_interval_seconds", default=60*60)
-
-                    # Wait for sleep_time or until notified
-                    self.condition.wait(timeout=sleep_time)
-                    self.refresh_result = {}
-                    self.refresh_event.clear()
+                    if not self.manual_update_queue:
+                        sleep_time = self._get_sleep_time(self._get_current_datetime())
 
+                        # Wait until the next deadline or until notified
+                        self.condition.wait(timeout=sleep_time)
                     # Exit if `stop()` is called
                     if not self.running:
                         break
@@ -89,79 +108,332 @@ class RefreshTask:
                     current_dt = self._get_current_datetime()
 
                     refresh_action = None
-                    if self.manual_update_request:
-                        # handle immediate update request
-                        logger.info("Manual update requested")
-                        refresh_action = self.manual_update_request
-                        self.manual_update_request = ()
+                    job = None
+                    due = []
+                    # whether the displayed plugin changes, which restarts the cycle interval
+                    new_cycle = False
+                    if self.manual_update_queue:
+                        # handle queued update requests in order
+                        job = self.manual_update_queue.popleft()
+                        logger.info(f"Manual update requested. | job_id: {job.job_id}")
+                        refresh_action = job.refresh_action
+                        new_cycle = True
                     else:
+                        due = self.scheduler.pop_due(current_dt)
+                        if not due:
+                            # woken up early, e.g. by a config change, nothing to do yet
+                            continue
+
+                        due_kinds = {entry.kind for entry in due}
+                        if RefreshScheduler.PRERENDER in due_kinds:
+                            due_kinds.discard(RefreshScheduler.PRERENDER)
+                            # a cycle that is already due renders the plugin itself
+                            if RefreshScheduler.CYCLE not in due_kinds:
+                                prerender = next(entry for entry in due if entry.kind == RefreshScheduler.PRERENDER)
+                                self._start_prerender(playlist_manager, prerender.details["cycle_deadline"])
+                            if not due_kinds:
+                                continue
 
-                        if self.device_config.get_config("log_system_stats"):
+                        logger.info(f"Running scheduled refresh check. | current_time: {current_dt.strftime('%Y-%m-%d %H:%M:%S')} | due: {sorted(due_kinds)}")
+
+                        if self.device_config.get_config("log_system_stats") and RefreshScheduler.CYCLE in due_kinds:
                             self.log_system_stats()
 
                         # handle refresh based on playlists
-                        logger.info(f"Running interval refresh check. | current_time: {current_dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                        playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh, current_dt)
-                        if plugin_instance:
-                            refresh_action = PlaylistRefresh(playlist, plugin_instance)
-
+                        if RefreshScheduler.CYCLE in due_kinds or (
+                                RefreshScheduler.PLAYLIST in due_kinds and self._active_playlist_changed(playlist_manager, current_dt)):
+                            new_cycle = True
+                            playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh, current_dt)
+                            if plugin_instance:
+                                prerendered = self._take_prerendered(playlist, plugin_instance)
+                                refresh_action = PlaylistRefresh(playlist, plugin_instance, prerendered=prerendered)
+                        elif RefreshScheduler.PLUGIN in due_kinds:
+                            playlist, plugin_instance = self._find_displayed_plugin(playlist_manager, latest_refresh)
+                            if plugin_instance:
+                                logger.info(f"Refresh of displayed plugin instance due. | plugin_instance: {plugin_instance.name}")
+                                refresh_action = PlaylistRefresh(playlist, plugin_instance)
+
+                # refresh outside of the condition so manual updates can be queued while rendering
+                try:
                     if refresh_action:
+                        set_current_job(job)
+                        report_stage(RefreshJob.FETCHING)
                         plugin_config = self.device_config.get_plugin(refresh_action.get_plugin_id())
                         if plugin_config is None:
                             logger.error(f"Plugin config not found for '{refresh_action.get_plugin_id()}'.")
+                            if job:
+                                job.fail(f"Plugin '{refresh_action.get_plugin_id()}' not found")
                             continue
                         plugin = get_plugin_instance(plugin_config)
                         image = refresh_action.execute(plugin, self.device_config, current_dt)
+                        report_stage(RefreshJob.HASHING)
                         image_hash = compute_image_hash(image)
 
                         refresh_info = refresh_action.get_refresh_info()
                         refresh_info.update({"refresh_time": current_dt.isoformat(), "image_hash": image_hash})
-                        # check if image is the same as current image
-                        if image_hash != latest_refresh.image_hash:
-                            logger.info(f"Updating display. | refresh_info: {refresh_info}")
-                            self.display_manager.display_image(image, image_settings=plugin.config.get("image_settings", []))
-                        else:
-                            logger.info(f"Image already displayed, skipping refresh. | refresh_info: {refresh_info}")
-
-                        # update latest refresh data in the device config
-                        self.device_config.refresh_info = RefreshInfo(**refresh_info)
+                        # update latest refresh data in the device config, the panel keeps showing
+                        # the previous frame until the display worker pushed the new one
+                        self.device_config.set_refresh_info(RefreshInfo(**refresh_info))
+
+                        # the display worker skips the panel refresh if the panel would show the same frame
+                        logger.info(f"Updating display. | refresh_info: {refresh_info}")
+                        report_stage(RefreshJob.DISPLAYING)
+                        self.display_manager.submit(image, image_settings=plugin.config.get("image_settings", []),
+                                                    on_done=self._finish_job_on_display(job))
                         self.device_config.write_config()
-
-            except Exception as e:
+                except Exception as e:
+                    if job:
+                        job.fail(e)
+                    raise
+                finally:
+                    set_current_job(None)
+                    self._replan(due, new_cycle, current_dt)
+
+            except Exception:
                 logger.exception('Exception during refresh')
-                self.refresh_result["exception"] = e  # Capture exception
-            finally:
-                self.refresh_event.set()
 
     def manual_update(self, refresh_action):
-        """Manually triggers an update for the specified plugin id and plugin settings by notifying the background process."""
-        if self.running:
-            with self.condition:
-                self.manual_update_request = refresh_action
-                self.refresh_result = {}
-                self.refresh_event.clear()
+        """Queues an update for the specified refresh action and returns its job without waiting for it.
 
-                self.condition.notify_all()  # Wake the thread to process manual update
+        Jobs are handled in the order they were queued. Returns None if the refresh task is not running."""
+        if not self.running:
+            logger.warning("Background refresh task is not running, unable to do a manual update")
+            return None
 
-            self.refresh_event.wait()
-            if self.refresh_result.get("exception"):
-                raise self.refresh_result.get("exception")
-        else:
-            logger.warn("Background refresh task is not running, unable to do a manual update")
+        job = self.jobs.create(refresh_action)
+        with self.condition:
+            self.manual_update_queue.append(job)
+            self.condition.notify_all()  # Wake the thread to process manual update
+        logger.info(f"Queued manual update. | job_id: {job.job_id} | plugin_id: {refresh_action.get_plugin_id()}")
+        return job
+
+    def get_job(self, job_id):
+        """Returns the manual update job with the given id, or None."""
+        return self.jobs.get(job_id)
 
     def signal_config_change(self):
         """Notify the background thread that config has changed (e.g., interval updated)."""
         if self.running:
             with self.condition:
+                latest_refresh_dt = self.device_config.get_refresh_info().get_refresh_datetime()
+                self._schedule_cycle(latest_refresh_dt or self._get_current_datetime())
                 self.condition.notify_all()
 
+    def signal_playlist_change(self, playlist_name):
+        """Notify the background thread that a playlist was created, updated, renamed or deleted."""
+        if self.running:
+            with self.condition:
+                current_dt = self._get_current_datetime()
+                self._discard_prerender()
+                self._schedule_playlist(playlist_name, current_dt)
+                self._schedule_displayed_plugin(current_dt)
+                self.condition.notify_all()
+
+    def get_schedule(self):
+        """Returns the upcoming refresh deadlines, earliest first."""
+        return self.scheduler.get_queue()
+
+    def get_prerender_stats(self):
+        """Returns counters for the speculative pre-render of the next playlist plugin."""
+        with self.prerender_lock:
+            return dict(self.prerender_stats)
+
+    def _finish_job_on_display(self, job):
+        """Returns a display callback that finishes the job once its image was handled by the display."""
+        if not job:
+            return None
+
+        def on_done(status, error):
+            if status == "failed":
+                job.fail(error)
+            elif status == "superseded":
+                job.finish("Superseded by a newer image")
+            elif status == "skipped":
+                job.finish("Image already displayed")
+            else:
+                job.finish("Display updated")
+        return on_done
+
+    def _plan_schedule(self, current_dt):
+        """Builds the refresh schedule from scratch based on the current config."""
+        latest_refresh_dt = self.device_config.get_refresh_info().get_refresh_datetime()
+        self._schedule_cycle(latest_refresh_dt or current_dt)
+        for playlist in self.device_config.get_playlist_manager().playlists:
+            self._schedule_playlist(playlist.name, current_dt)
+        self._schedule_displayed_plugin(current_dt)
+
+    def _replan(self, due, new_cycle, current_dt):
+        """Re-plans the deadlines that were handled or affected by the latest refresh."""
+        if new_cycle or any(entry.kind == RefreshScheduler.CYCLE for entry in due):
+            self._schedule_cycle(current_dt)
+        for entry in due:
+            if entry.kind == RefreshScheduler.PLAYLIST:
+                self._schedule_playlist(entry.details["playlist"], current_dt)
+        self._schedule_displayed_plugin(current_dt)
+
+    def _schedule_cycle(self, cycle_start_dt):
+        """Schedules the next plugin cycle one interval after cycle_start_dt.
+
+        Any image pre-rendered for the previous boundary is dropped, it would be stale by the new one."""
+        self._discard_prerender()
+        plugin_cycle_interval = self.device_config.get_config("plugin_cycle_interval_seconds", default=3600)
+        deadline = cycle_start_dt + timedelta(seconds=plugin_cycle_interval)
+        self.scheduler.schedule((RefreshScheduler.CYCLE,), deadline, RefreshScheduler.CYCLE)
+
+        # render the next plugin ahead of the boundary so only the display update is left at the deadline
+        lead_seconds = self.device_config.get_config("prerender_lead_seconds", default=DEFAULT_PRERENDER_LEAD_SECONDS)
+        prerender_deadline = None
+        if lead_seconds and 0 < lead_seconds < plugin_cycle_interval:
+            prerender_deadline = deadline - timedelta(seconds=lead_seconds)
+        self.scheduler.schedule((RefreshScheduler.PRERENDER,), prerender_deadline, RefreshScheduler.PRERENDER,
+                                cycle_deadline=deadline)
+
+    def _schedule_playlist(self, playlist_name, current_dt):
+        """Schedules the next window boundary of the playlist, or cancels it if the playlist no longer exists."""
+        playlist = self.device_config.get_playlist_manager().get_playlist(playlist_name)
+        deadline = playlist.get_next_transition_dt(current_dt) if playlist else None
+        self.scheduler.schedule((RefreshScheduler.PLAYLIST, playlist_name), deadline,
+                                RefreshScheduler.PLAYLIST, playlist=playlist_name)
+
+    def _schedule_displayed_plugin(self, current_dt):
+        """Schedules the next refresh of the plugin instance currently on display.
+
+        Plugin instances that are not on display are refreshed when their turn in the playlist comes,
+        so only the displayed one needs a deadline of its own."""
+        playlist_manager = self.device_config.get_playlist_manager()
+        playlist, plugin_instance = self._find_displayed_plugin(playlist_manager, self.device_config.get_refresh_info())
+        deadline = None
+        if plugin_instance:
+            deadline = plugin_instance.get_next_refresh_dt(current_dt)
+            # refreshes that are already overdue are handled by the refresh that just ran
+            if deadline is not None and deadline <= current_dt:
+                deadline = None
+        details = {"playlist": playlist.name, "plugin_instance": plugin_instance.name} if plugin_instance else {}
+        self.scheduler.schedule((RefreshScheduler.PLUGIN,), deadline, RefreshScheduler.PLUGIN, **details)
+
+    def _get_sleep_time(self, current_dt):
+        """Returns the number of seconds until the next scheduled deadline."""
+        if not len(self.scheduler):
+            self._plan_schedule(current_dt)
+        next_deadline = self.scheduler.next_deadline()
+        if next_deadline is None:
+            return MAX_SLEEP_SECONDS
+        return min(max((next_deadline - current_dt).total_seconds(), 0), MAX_SLEEP_SECONDS)
+
+    def _active_playlist_changed(self, playlist_manager, current_dt):
+        """Checks whether the playlist that should be active differs from the one currently active."""
+        playlist = playlist_manager.determine_active_playlist(current_dt)
+        return (playlist.name if playlist else None) != playlist_manager.active_playlist
+
+    def _find_displayed_plugin(self, playlist_manager, latest_refresh_info):
+        """Returns the playlist and plugin instance of the latest playlist refresh, if it is still in the active playlist."""
+        if latest_refresh_info.refresh_type != "Playlist" or latest_refresh_info.playlist != playlist_manager.active_playlist:
+            return None, None
+        playlist = playlist_manager.get_playlist(latest_refresh_info.playlist)
+        if not playlist:
+            return None, None
+        plugin_instance = playlist.find_plugin(latest_refresh_info.plugin_id, latest_refresh_info.plugin_instance)
+        return (playlist, plugin_instance) if plugin_instance else (None, None)
+
+    def _start_prerender(self, playlist_manager, cycle_dt):
+        """Predicts the plugin instance shown at cycle_dt and starts rendering it in the background."""
+        playlist = playlist_manager.determine_active_playlist(cycle_dt)
+        plugin_instance = playlist.peek_next_plugin() if playlist else None
+        if not plugin_instance:
+            return
+        # plugin instances that are not due reuse their latest image, nothing to render ahead of time
+        if not plugin_instance.should_refresh(cycle_dt):
+            logger.debug(f"Next plugin instance not due for a refresh, skipping pre-render. | plugin_instance: {plugin_instance.name}")
+            return
+        plugin_config = self.device_config.get_plugin(plugin_instance.plugin_id)
+        if plugin_config is None:
+            return
+
+        target = (playlist.name, plugin_instance.plugin_id, plugin_instance.name)
+        fingerprint = self._get_prerender_fingerprint(plugin_instance)
+        settings = copy.deepcopy(plugin_instance.settings)
+        with self.prerender_lock:
+            if self.prerender_thread and self.prerender_thread.is_alive():
+                return
+            self._discard_prerender_locked()
+            self.prerender_target = target
+            self.prerender_stats["started"] += 1
+            generation = self.prerender_generation
+            self.prerender_thread = threading.Thread(
+                target=self._prerender, args=(plugin_config, settings, target, fingerprint, generation), daemon=True)
+            self.prerender_thread.start()
+        logger.info(f"Pre-rendering next plugin instance. | playlist: {playlist.name} | plugin_instance: {plugin_instance.name} | cycle_time: {cycle_dt.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    def _prerender(self, plugin_config, settings, target, fingerprint, generation):
+        """Renders a plugin instance in the background and keeps the image for the upcoming cycle boundary."""
+        try:
+            start = time.monotonic()
+            plugin = get_plugin_instance(plugin_config)
+            rendered_dt = self._get_current_datetime()
+            image = plugin.generate_image(settings, self.device_config)
+            logger.info(f"Pre-render finished in {time.monotonic() - start:.1f}s. | plugin_instance: {target[2]}")
+        except Exception:
+            logger.exception(f"Pre-render failed. | plugin_instance: {target[2]}")
+            with self.prerender_lock:
+                self.prerender_stats["failed"] += 1
+            return
+
+        with self.prerender_lock:
+            # settings changed while rendering
+            if generation != self.prerender_generation:
+                self.prerender_stats["discarded"] += 1
+                return
+            self.prerendered = PrerenderedImage(target, fingerprint, image, rendered_dt, settings)
+
+    def _take_prerendered(self, playlist, plugin_instance):
+        """Returns the pre-rendered image for the plugin instance if it is still valid, waiting for a render in progress."""
+        target = (playlist.name, plugin_instance.plugin_id, plugin_instance.name)
+        with self.prerender_lock:
+            thread = self.prerender_thread if self.prerender_target == target else None
+        if thread:
+            thread.join(timeout=PRERENDER_JOIN_TIMEOUT)
+
+        with self.prerender_lock:
+            prerendered, self.prerendered = self.prerendered, None
+            self.prerender_target = None
+            if not prerendered:
+                return None
+            if prerendered.target != target or prerendered.fingerprint != self._get_prerender_fingerprint(plugin_instance):
+                logger.info(f"Discarding pre-rendered image, prediction or settings changed. | plugin_instance: {prerendered.target[2]}")
+                self.prerender_stats["discarded"] += 1
+                return None
+            self.prerender_stats["used"] += 1
+            return prerendered
+
+    def _discard_prerender(self):
+        with self.prerender_lock:
+            self._discard_prerender_locked()
+
+    def _discard_prerender_locked(self):
+        # bumping the generation drops the result of a render that is still in progress
+        self.prerender_generation += 1
+        self.prerender_target = None
+        if self.prerendered:
+            self.prerendered = None
+            self.prerender_stats["discarded"] += 1
+
+    def _get_prerender_fingerprint(self, plugin_instance):
+        """Hashes everything a rendered image depends on: the instance settings and the device settings."""
+        device_settings = {key: value for key, value in self.device_config.get_config().items()
+                           if key not in ("playlist_config", "refresh_info")}
+        payload = json.dumps([plugin_instance.settings, device_settings], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def _get_current_datetime(self):
         """Retrieves the current datetime based on the device's configured timezone."""
         tz_str = self.device_config.get_config("timezone", default="UTC")
         return datetime.now(pytz.timezone(tz_str))
 
     def _determine_next_plugin(self, playlist_manager, latest_refresh_info, current_dt):
-        """Determines the next plugin to refresh based on the active playlist, plugin cycle interval, and current time."""
+        """Determines the next plugin to refresh based on the active playlist and current time.
+
+        Timing is owned by the refresh schedule, this is only called once a cycle deadline is due or the
+        active playlist changed."""
         playlist = playlist_manager.determine_active_playlist(current_dt)
         if not playlist:
             playlist_manager.active_playlist = None
@@ -173,15 +445,6 @@ class RefreshTask:
             logger.info(f"Active playlist '{playlist.name}' has no plugins.")
             return None, None
 
-        latest_refresh_dt = latest_refresh_info.get_refresh_datetime()
-        plugin_cycle_interval = self.device_config.get_config("plugin_cycle_interval_seconds", default=3600)
-        should_refresh = PlaylistManager.should_refresh(latest_refresh_dt, plugin_cycle_interval, current_dt)
-
-        if not should_refresh:
-            latest_refresh_str = latest_refresh_dt.strftime('%Y-%m-%d %H:%M:%S') if latest_refresh_dt else "None"
-            logger.info(f"Not time to update display. | latest_update: {latest_refresh_str} | plugin_cycle_interval: {plugin_cycle_interval}")
-            return None, None
-
         plugin = playlist.get_next_plugin()
         logger.info(f"Determined next plugin. | active_playlist: {playlist.name} | plugin_instance: {plugin.name}")
 
@@ -247,12 +510,14 @@ class PlaylistRefresh(RefreshAction):
     Attributes:
         playlist: The playlist object associated with the refresh.
         plugin_instance: The plugin instance to refresh.
+        prerendered (PrerenderedImage): Image of the plugin instance rendered ahead of time, used instead of rendering.
     """
 
-    def __init__(self, playlist, plugin_instance, force=False):
+    def __init__(self, playlist, plugin_instance, force=False, prerendered=None):
         self.playlist = playlist
         self.plugin_instance = plugin_instance
         self.force = force
+        self.prerendered = prerendered
 
     def get_refresh_info(self):
         """Return refresh metadata as a dictionary."""
@@ -272,8 +537,15 @@ class PlaylistRefresh(RefreshAction):
         # Determine the file path for the plugin's image
         plugin_image_path = os.path.join(device_config.plugin_image_dir, self.plugin_instance.get_image_path())
 
+        if self.prerendered:
+            logger.info(f"Using pre-rendered image. | plugin_instance: '{self.plugin_instance.name}' | rendered_at: {self.prerendered.rendered_dt.strftime('%Y-%m-%d %H:%M:%S')}")
+            image = self.prerendered.image
+            image.save(plugin_image_path)
+            # keep what the plugin changed in its settings while rendering, e.g. an image cursor
+            self.plugin_instance.settings = self.prerendered.settings
+            self.plugin_instance.latest_refresh_time = self.prerendered.rendered_dt.isoformat()
         # Check if a refresh is needed based on the plugin instance's criteria
-        if self.plugin_instance.should_refresh(current_dt) or self.force:
+        elif self.plugin_instance.should_refresh(current_dt) or self.force:
             logger.info(f"Refreshing plugin instance. | plugin_instance: '{self.plugin_instance.name}'") 
             # Generate a new image
             image = plugin.generate_image(self.plugin_instance.settings, device_config)
@@ -285,4 +557,24 @@ class PlaylistRefresh(RefreshAction):
             with Image.open(plugin_image_path) as img:
                 image = img.copy()
 
-        return image
\ No newline at end of file
+        return image
+
+
+class PrerenderedImage:
+    """Image of a playlist plugin instance rendered ahead of its cycle boundary.
+
+    Attributes:
+        target (tuple): Playlist name, plugin id and instance name the image was rendered for.
+        fingerprint (str): Hash of the settings the image was rendered with.
+        image (PIL.Image): The rendered image.
+        rendered_dt (datetime): Time the render started.
+        settings (dict): Copy of the instance settings the image was rendered with, including the
+            changes the plugin made while rendering.
+    """
+
+    def __init__(self, target, fingerprint, image, rendered_dt, settings):
+        self.target = target
+        self.fingerprint = fingerprint
+        self.image = image
+        self.rendered_dt = rendered_dt
+        self.settings = settings
@@ -0,0 +1,112 @@
+import heapq
+import itertools
+import threading
+
+
+class ScheduledDeadline:
+    """A single upcoming deadline in the refresh schedule.
+
+    Attributes:
+        key (tuple): Unique key identifying what the deadline belongs to.
+        deadline (datetime): Timezone-aware time at which the deadline is due.
+        kind (str): Deadline type ['cycle', 'playlist', 'plugin', 'prerender'].
+        details (dict): Extra information about the deadline, e.g. the playlist name.
+    """
+
+    def __init__(self, key, deadline, kind, details=None):
+        self.key = key
+        self.deadline = deadline
+        self.kind = kind
+        self.details = details or {}
+        self.cancelled = False
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "deadline": self.deadline.isoformat(),
+            **self.details
+        }
+
+
+class RefreshScheduler:
+    """Priority queue of upcoming refresh deadlines ordered by due time.
+
+    Every deadline is stored under a key, scheduling a key that already exists replaces
+    its previous deadline. Replaced and cancelled deadlines are marked and dropped lazily
+    once they reach the top of the heap, so every update costs O(log n).
+    """
+
+    CYCLE = "cycle"
+    PLAYLIST = "playlist"
+    PLUGIN = "plugin"
+    PRERENDER = "prerender"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def schedule(self, key, deadline, kind, **details):
+        """Adds or replaces the deadline for the given key. A deadline of None cancels the key."""
+        with self.lock:
+            self._cancel(key)
+            if deadline is None:
+                return None
+            entry = ScheduledDeadline(key, deadline, kind, details)
+            self.entries[key] = entry
+            heapq.heappush(self.heap, (deadline.timestamp(), next(self.counter), entry))
+            return entry
+
+    def cancel(self, key):
+        """Removes the deadline for the given key if it is scheduled."""
+        with self.lock:
+            self._cancel(key)
+
+    def cancel_matching(self, predicate):
+        """Removes every deadline whose key matches the predicate."""
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                self._cancel(key)
+
+    def get(self, key):
+        """Returns the scheduled deadline for the key, or None."""
+        with self.lock:
+            return self.entries.get(key)
+
+    def next_deadline(self):
+        """Returns the earliest scheduled deadline, or None if nothing is scheduled."""
+        with self.lock:
+            self._discard_cancelled()
+            return self.heap[0][2].deadline if self.heap else None
+
+    def pop_due(self, current_dt):
+        """Removes and returns every deadline that is due at current_dt, earliest first."""
+        due = []
+        with self.lock:
+            self._discard_cancelled()
+            while self.heap and self.heap[0][0] <= current_dt.timestamp():
+                entry = heapq.heappop(self.heap)[2]
+                if not entry.cancelled:
+                    del self.entries[entry.key]
+                    due.append(entry)
+                self._discard_cancelled()
+        return due
+
+    def get_queue(self):
+        """Returns the upcoming deadlines, earliest first, for inspection."""
+        with self.lock:
+            entries = sorted(self.entries.values(), key=lambda entry: entry.deadline.timestamp())
+            return [entry.to_dict() for entry in entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cancel(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            entry.cancelled = True
+
+    def _discard_cancelled(self):
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
@@ -0,0 +1,54 @@
+// Follows a queued display update job until it is finished. Stage changes are streamed
+// from the server, if the stream is not available the job status is polled instead.
+// Resolves with the final job status.
+function waitForRefreshJob(jobId, onStage) {
+    const jobUrl = `/api/jobs/${jobId}`;
+
+    return new Promise((resolve) => {
+        const isFinished = (job) => job.stage === 'done' || job.stage === 'failed';
+
+        const poll = async () => {
+            try {
+                const response = await fetch(jobUrl);
+                const job = await response.json();
+                if (!response.ok) {
+                    resolve({ stage: 'failed', error: job.error });
+                    return;
+                }
+                if (onStage) onStage(job);
+                if (isFinished(job)) {
+                    resolve(job);
+                    return;
+                }
+            } catch (error) {
+                console.error('Error:', error);
+            }
+            setTimeout(poll, 1000);
+        };
+
+        if (!window.EventSource) {
+            poll();
+            return;
+        }
+
+        const events = new EventSource(`${jobUrl}/events`);
+        events.addEventListener('stage', (event) => {
+            const job = JSON.parse(event.data);
+            if (onStage) onStage(job);
+            if (isFinished(job)) {
+                events.close();
+                resolve(job);
+            }
+        });
+        events.onerror = () => {
+            events.close();
+            poll();
+        };
+    });
+}
+
+function formatRefreshJobStage(job) {
+    const stage = job.stages[job.stages.length - 1];
+    const label = job.stage.charAt(0).toUpperCase() + job.stage.slice(1);
+    return stage ? `${label} (${stage.elapsed_seconds}s)` : label;
+}
@@ -4,7 +4,8 @@ import socket
 import subprocess
 
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFont
+from utils.image_utils import load_image
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,12 @@ def resolve_path(file_path):
     src_path = Path(src_dir)
     return str(src_path / file_path)
 
+def get_cache_dir(name):
+    """Returns the path to a named cache directory under src/cache, creating it if needed."""
+    cache_dir = resolve_path(os.path.join("cache", name))
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
 def get_ip_address():
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
         s.connect(("8.8.8.8", 80))
@@ -169,9 +176,8 @@ def handle_request_files(request_files, form_data={}):
         # Open the image and apply EXIF transformation before saving
         if extension in {'jpg', 'jpeg'}:
             try:
-                with Image.open(file) as img:
-                    img = ImageOps.exif_transpose(img)
-                    img.save(file_path)
+                img = load_image(file, exif_transpose=True)
+                img.save(file_path)
             except Exception as e:
                 logger.warn(f"EXIF processing error for {file_name}: {e}")
                 file.save(file_path)
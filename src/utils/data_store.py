@@ -0,0 +1,292 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Background fetches running at once
+DEFAULT_WORKERS = 2
+# Snapshots on disk not read for this long are removed at startup, in seconds
+MAX_SNAPSHOT_AGE = 7 * 24 * 60 * 60
+# Upper bound of the refresher's sleep, picks up newly read sources
+REFRESHER_MAX_SLEEP = 60
+
+
+class DataStore:
+    """Stale-while-revalidate store of the data plugins fetch.
+
+    A plugin reads a source by key, together with the function fetching it and a freshness window.
+    Fresh snapshots are returned as is. Snapshots past `max_age` but within `max_stale` are returned
+    right away as well, while a background worker fetches the source again. Only a missing or too
+    old snapshot makes the caller wait for the fetch, concurrent callers of the same source wait
+    for the same fetch.
+
+    Sources read since their last fetch are kept warm: the refresher thread fetches them again as
+    soon as they expire, so the next render finds fresh data. JSON serializable snapshots are
+    persisted, so the first render after a restart does not wait on the network either.
+
+    Attributes:
+        cache_dir (str): Directory holding persisted snapshots, or None to keep them in memory only.
+        keep_warm (bool): Whether expired sources are refreshed before they are read again.
+        stats (dict): Hit, miss and fetch counters.
+    """
+
+    def __init__(self, cache_dir=None, workers=DEFAULT_WORKERS, keep_warm=True):
+        self.cache_dir = cache_dir
+        self.keep_warm = keep_warm
+        self.stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "invalidated": 0}
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.snapshots = {}
+        self.sources = {}
+        self.refreshing = set()
+        self.flights = SingleFlight()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data-refresh")
+        self.refresher = None
+        self.stopped = False
+        if cache_dir:
+            self._remove_expired_snapshots()
+
+    def get(self, key, fetch, max_age, max_stale=None, with_fetched_at=False):
+        """
+        Returns the data of the source, fetching it only if there is no usable snapshot.
+
+        Args:
+            key (str): Identifies the source, e.g. the plugin id and the request parameters.
+            fetch (callable): Fetches the data without arguments.
+            max_age (float): Seconds a snapshot is fresh, None for data that never changes and is
+                only fetched again after invalidate.
+            max_stale (float, optional): Seconds a snapshot is served while it is being revalidated,
+                defaults to max_age, i.e. no stale reads.
+            with_fetched_at (bool): Whether to return the time the data was fetched as well.
+
+        Returns:
+            The snapshot data, shared with other readers, so callers must not modify it. With
+            with_fetched_at a tuple of the data and its fetch time in epoch seconds.
+
+        Raises:
+            Exception: Whatever fetch raises if there was no usable snapshot.
+        """
+        max_age = math.inf if max_age is None else max_age
+        max_stale = max(max_stale or 0, max_age)
+        with self.lock:
+            self.sources[key] = {"fetch": fetch, "max_age": max_age, "read": True}
+            snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            snapshot = self._load_snapshot(key)
+        elif self.cache_dir:
+            self._touch_snapshot(key)
+
+        age = time.time() - snapshot["fetched_at"] if snapshot else None
+        with self.lock:
+            if snapshot is not None and age < max_age:
+                self.stats["fresh_hits"] += 1
+                self._start_refresher()
+                return _unpack(snapshot, with_fetched_at)
+            if snapshot is not None and age < max_stale:
+                self.stats["stale_hits"] += 1
+                logger.info(f"Serving {int(age)}s old data for {key} while revalidating")
+                self._revalidate(key)
+                return _unpack(snapshot, with_fetched_at)
+            self.stats["misses"] += 1
+
+        snapshot = self.flights.do(key, lambda: self._fetch(key, fetch))
+        with self.lock:
+            self._start_refresher()
+        return _unpack(snapshot, with_fetched_at)
+
+    def get_stats(self):
+        dedup_hits = self.flights.get_stats()["dedup_hits"]
+        with self.lock:
+            reads = self.stats["fresh_hits"] + self.stats["stale_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "dedup_hits": dedup_hits,
+                "instant_rate": round((reads - self.stats["misses"]) / reads, 3) if reads else None,
+                "sources": len(self.sources),
+                "refreshing": len(self.refreshing)
+            }
+
+    def invalidate(self, prefix=""):
+        """
+        Drops the snapshots whose key starts with prefix, so they are fetched again on the next read.
+
+        Returns:
+            int: Number of dropped snapshots.
+        """
+        with self.lock:
+            keys = {key for key in self.snapshots if key.startswith(prefix)}
+            for key in keys:
+                del self.snapshots[key]
+        if self.cache_dir:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        with open(entry.path, encoding="utf-8") as f:
+                            key = json.load(f).get("key", "")
+                    except (OSError, ValueError):
+                        continue
+                    if key.startswith(prefix):
+                        os.remove(entry.path)
+                        keys.add(key)
+        with self.lock:
+            self.stats["invalidated"] += len(keys)
+        logger.info(f"Invalidated {len(keys)} data snapshots with prefix '{prefix}'")
+        return len(keys)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            self.wakeup.notify_all()
+        self.executor.shutdown(wait=False)
+
+    def _fetch(self, key, fetch):
+        """Fetches the source in the calling thread and returns the stored snapshot."""
+        try:
+            data = fetch()
+        except Exception:
+            with self.lock:
+                self.stats["errors"] += 1
+            raise
+        return self._store(key, data)
+
+    def _revalidate(self, key):
+        """Queues a background fetch of the source unless one is running. Called with the lock held."""
+        if key in self.refreshing or self.stopped:
+            return
+        self.refreshing.add(key)
+        self.sources[key]["read"] = False
+        self.executor.submit(self._refresh, key, self.sources[key]["fetch"])
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+            with self.lock:
+                self.stats["refreshes"] += 1
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+                self.wakeup.notify_all()
+
+    def _store(self, key, data):
+        snapshot = {"key": key, "fetched_at": time.time(), "data": data}
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.wakeup.notify_all()
+        if not self.cache_dir:
+            return snapshot
+
+        path = self._snapshot_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except (TypeError, ValueError):
+            logger.debug(f"Data of {key} is not JSON serializable, keeping it in memory only")
+            os.remove(tmp_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist data snapshot {key}: {e}")
+        return snapshot
+
+    def _load_snapshot(self, key):
+        """Loads the persisted snapshot of the source into memory, returns None if there is none."""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._snapshot_path(key), encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read data snapshot {key}: {e}")
+            return None
+        if snapshot.get("key") != key:
+            return None
+        with self.lock:
+            return self.snapshots.setdefault(key, snapshot)
+
+    def _start_refresher(self):
+        """Starts the thread keeping read sources warm. Called with the lock held."""
+        if self.keep_warm and self.refresher is None and not self.stopped:
+            self.refresher = threading.Thread(target=self._run_refresher, name="data-refresher", daemon=True)
+            self.refresher.start()
+
+    def _run_refresher(self):
+        """Fetches every source read since its last fetch again once its snapshot expires."""
+        with self.lock:
+            while not self.stopped:
+                now = time.time()
+                sleep = REFRESHER_MAX_SLEEP
+                for key, source in self.sources.items():
+                    snapshot = self.snapshots.get(key)
+                    if not source["read"] or snapshot is None or key in self.refreshing:
+                        continue
+                    expires_in = snapshot["fetched_at"] + source["max_age"] - now
+                    if expires_in <= 0:
+                        logger.debug(f"Refreshing expired data of {key}")
+                        self._revalidate(key)
+                    else:
+                        sleep = min(sleep, expires_in)
+                self.wakeup.wait(sleep)
+
+    def _snapshot_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _touch_snapshot(self, key):
+        """Marks the persisted snapshot as used, unused snapshots are removed after MAX_SNAPSHOT_AGE."""
+        try:
+            os.utime(self._snapshot_path(key))
+        except OSError:
+            pass
+
+    def _remove_expired_snapshots(self):
+        cutoff = time.time() - MAX_SNAPSHOT_AGE
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+
+
+_data_store = None
+_data_store_enabled = True
+_data_store_settings = {}
+_data_store_lock = threading.Lock()
+
+
+def _unpack(snapshot, with_fetched_at):
+    return (snapshot["data"], snapshot["fetched_at"]) if with_fetched_at else snapshot["data"]
+
+
+def configure_data_store(enabled=True, cache_dir=None, workers=DEFAULT_WORKERS):
+    """Enables or disables the data store, snapshots are persisted in cache_dir if given."""
+    global _data_store, _data_store_enabled, _data_store_settings
+    with _data_store_lock:
+        _data_store_enabled = enabled
+        _data_store_settings = {"cache_dir": cache_dir, "workers": workers}
+        if _data_store is not None:
+            _data_store.stop()
+        _data_store = None
+
+
+def get_data_store():
+    """Returns the shared data store, or None if it has been disabled."""
+    global _data_store
+    with _data_store_lock:
+        if not _data_store_enabled:
+            return None
+        if _data_store is None:
+            _data_store = DataStore(**_data_store_settings)
+        return _data_store
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISK_BYTES = 20 * 1024 * 1024
+# Seconds past expiry a stale entry is still served while the origin is unreachable or failing
+DEFAULT_STALE_IF_ERROR = 24 * 60 * 60
+# Request headers that select a different representation, part of the cache key
+KEY_HEADERS = ("Accept", "Accept-Language", "Authorization")
+# Response headers refreshed from a 304, RFC 7234 section 4.3.4
+REFRESHED_HEADERS = ("Age", "Cache-Control", "Date", "ETag", "Expires", "Last-Modified")
+# Response headers describing the transfer, not the decoded body that is stored
+TRANSFER_HEADERS = ("Content-Encoding", "Content-Length", "Transfer-Encoding")
+MAX_AGE_PATTERN = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+class HttpCache:
+    """On-disk cache of GET responses, with the freshness and validation rules of RFC 7234.
+
+    Every entry is a metadata file (url, status, headers, store time and the digest of the body)
+    next to the raw body. Entries are fresh for their max-age, s-maxage or Expires lifetime, or for
+    the TTL override of the request. Stale entries carrying an ETag or Last-Modified validator are
+    revalidated with a conditional request, and a 304 answer refreshes them without a new download.
+    Entries are evicted least recently used first once `max_disk_bytes` is exceeded.
+
+    Attributes:
+        cache_dir (str): Directory holding the cached responses.
+        max_disk_bytes (int): Size budget of the cache.
+        stale_if_error (int): Seconds past expiry a stale entry may be served when a request fails.
+        stats (dict): Hit, revalidation and miss counters.
+    """
+
+    def __init__(self, cache_dir, max_disk_bytes=DEFAULT_MAX_DISK_BYTES, stale_if_error=DEFAULT_STALE_IF_ERROR):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.stale_if_error = stale_if_error
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "stale_served": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.disk = self._load_disk_index()
+        self.disk_bytes = sum(self.disk.values())
+
+    def get_key(self, url, headers=None):
+        """Returns the cache key for a GET of the full url (including the query) with the given request headers."""
+        headers = CaseInsensitiveDict(headers or {})
+        digest = hashlib.sha256(url.encode("utf-8"))
+        for name in KEY_HEADERS:
+            digest.update(f"\n{name}:{headers.get(name, '')}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the metadata of the entry for the key, or None if there is none."""
+        with self.lock:
+            if key not in self.disk:
+                return None
+            try:
+                with open(self._entry_path(key, "json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to read HTTP cache entry {key}: {e}")
+                self._forget_disk_entry(key)
+                return None
+            os.utime(self._entry_path(key, "json"))
+            self.disk.move_to_end(key)
+            return meta
+
+    def get_response(self, key, meta, outcome):
+        """
+        Builds a response from the cached entry.
+
+        Args:
+            outcome (str): 'fresh_hits', 'revalidated' or 'stale_served', counted in the stats.
+
+        Returns:
+            requests.Response: The cached response with from_cache set, and stale set if it is served
+                because the origin failed, or None if the body is gone.
+        """
+        try:
+            with open(self._entry_path(key, "body"), "rb") as f:
+                body = f.read()
+        except OSError as e:
+            logger.warning(f"Failed to read HTTP cache body {key}: {e}")
+            with self.lock:
+                self._forget_disk_entry(key)
+            return None
+
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.reason = meta.get("reason")
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.url = meta["url"]
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        response.stale = outcome == "stale_served"
+        response.cache_digest = meta["digest"]
+        with self.lock:
+            self.stats[outcome] += 1
+        logger.debug(f"HTTP cache {outcome} for {meta['url']}")
+        return response
+
+    def put(self, key, response):
+        """
+        Stores a 200 response under the key unless it forbids storing. The response body is read.
+
+        Returns:
+            dict: Metadata of the stored entry, or None if the response was not stored.
+        """
+        if response.status_code != 200 or "no-store" in response.headers.get("Cache-Control", "").lower():
+            return None
+
+        body = response.content
+        headers = CaseInsensitiveDict(response.headers)
+        for name in TRANSFER_HEADERS:
+            headers.pop(name, None)
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict(headers),
+            "stored_at": time.time(),
+            "digest": hashlib.sha256(body).hexdigest()
+        }
+        with self.lock:
+            try:
+                self._write(key, "body", body)
+                self._write(key, "json", json.dumps(meta).encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"Failed to write HTTP cache entry {key}: {e}")
+                self._forget_disk_entry(key)
+                return None
+
+            self._forget_disk_entry(key, remove_files=False)
+            self.disk[key] = self._get_entry_size(key)
+            self.disk_bytes += self.disk[key]
+            self.stats["stores"] += 1
+            while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                oldest = next(iter(self.disk))
+                self._forget_disk_entry(oldest)
+                self.stats["evictions"] += 1
+        response.from_cache = False
+        response.cache_digest = meta["digest"]
+        return meta
+
+    def refresh(self, key, meta, not_modified):
+        """Updates the stored headers and the store time of the entry from a 304 response and returns the metadata."""
+        headers = CaseInsensitiveDict(meta["headers"])
+        headers.pop("Age", None)
+        for name in REFRESHED_HEADERS:
+            if name in not_modified.headers:
+                headers[name] = not_modified.headers[name]
+        meta["headers"] = dict(headers)
+        meta["stored_at"] = time.time()
+        with self.lock:
+            try:
+                self._write(key, "json", json.dumps(meta).encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"Failed to update HTTP cache entry {key}: {e}")
+        return meta
+
+    def is_fresh(self, meta, ttl=None):
+        """Returns True if the entry may be used without contacting the origin."""
+        return self.get_age(meta) < self.get_lifetime(meta, ttl)
+
+    def can_serve_stale(self, meta, ttl=None):
+        """Returns True if the stale entry may be used because a request failed."""
+        return self.get_age(meta) < self.get_lifetime(meta, ttl) + self.stale_if_error
+
+    def get_lifetime(self, meta, ttl=None):
+        """
+        Returns the freshness lifetime of the entry in seconds.
+
+        A TTL override takes precedence, then s-maxage, max-age and Expires. Responses with no-cache
+        or without explicit freshness information have to be revalidated before every use.
+        """
+        if ttl is not None:
+            return ttl
+        headers = CaseInsensitiveDict(meta["headers"])
+        cache_control = headers.get("Cache-Control", "")
+        if "no-cache" in cache_control.lower():
+            return 0
+        max_ages = dict((name.lower(), int(value)) for name, value in MAX_AGE_PATTERN.findall(cache_control))
+        if max_ages:
+            return max_ages.get("s-maxage", max_ages.get("max-age"))
+        expires, date = _parse_http_date(headers.get("Expires")), _parse_http_date(headers.get("Date"))
+        if expires is not None:
+            return max(0, expires - (date if date is not None else meta["stored_at"]))
+        return 0
+
+    def get_age(self, meta):
+        """Returns the age of the entry in seconds, including the Age reported by the origin."""
+        age_header = CaseInsensitiveDict(meta["headers"]).get("Age", "")
+        initial_age = int(age_header) if age_header.isdigit() else 0
+        return initial_age + max(0, time.time() - meta["stored_at"])
+
+    def get_validators(self, meta):
+        """Returns the conditional request headers for revalidating the entry."""
+        headers = CaseInsensitiveDict(meta["headers"])
+        validators = {}
+        if headers.get("ETag"):
+            validators["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = headers["Last-Modified"]
+        return validators
+
+    def record_miss(self):
+        with self.lock:
+            self.stats["misses"] += 1
+
+    def clear(self):
+        """Removes every cached entry."""
+        with self.lock:
+            for key in list(self.disk):
+                self._forget_disk_entry(key)
+
+    def get_stats(self):
+        with self.lock:
+            hits = self.stats["fresh_hits"] + self.stats["revalidated"] + self.stats["stale_served"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk_bytes
+            }
+
+    def _write(self, key, kind, data):
+        path = self._entry_path(key, kind)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _get_entry_size(self, key):
+        size = 0
+        for kind in ("json", "body"):
+            try:
+                size += os.path.getsize(self._entry_path(key, kind))
+            except OSError:
+                pass
+        return size
+
+    def _forget_disk_entry(self, key, remove_files=True):
+        size = self.disk.pop(key, None)
+        if size is not None:
+            self.disk_bytes -= size
+        if remove_files:
+            for kind in ("json", "body"):
+                try:
+                    os.remove(self._entry_path(key, kind))
+                except FileNotFoundError:
+                    pass
+
+    def _entry_path(self, key, kind):
+        return os.path.join(self.cache_dir, f"{key}.{kind}")
+
+    def _load_disk_index(self):
+        """Indexes existing entries on disk, least recently used first."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    key = entry.name[:-len(".json")]
+                    entries.append((entry.stat().st_mtime, key, self._get_entry_size(key)))
+        return OrderedDict((key, size) for _, key, size in sorted(entries))
+
+
+def _parse_http_date(value):
+    """Returns the HTTP date as a timestamp, or None if it is missing or invalid."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,349 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .http_cache import HttpCache, DEFAULT_MAX_DISK_BYTES, DEFAULT_STALE_IF_ERROR, KEY_HEADERS
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Connect and read timeouts in seconds, used unless a request passes its own
+DEFAULT_TIMEOUT = (5, 30)
+# Retries of idempotent requests after connection errors, timeouts and RETRY_STATUSES
+DEFAULT_RETRIES = 2
+# Base and cap of the jittered exponential backoff between retries, in seconds
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 10
+# Requests in flight per host, further requests to the host wait for a free slot
+DEFAULT_MAX_PER_HOST = 4
+# Keep-alive connections kept per host
+POOL_SIZE = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Parse results kept by get_parsed, reused while the response body is unchanged
+PARSED_CACHE_SIZE = 16
+# Seconds a finished GET response is shared with identical requests, e.g. of another plugin instance
+DEFAULT_DEDUP_WINDOW = 5
+COALESCED_METHODS = {"GET", "HEAD"}
+
+
+class HttpClient:
+    """Shared HTTP client for plugins, a pooled session with timeouts, retries and per-host limits.
+
+    Connections are kept alive in one requests.Session, so repeated refreshes skip the DNS, TCP and
+    TLS handshakes. Every request gets DEFAULT_TIMEOUT unless it passes its own, idempotent requests
+    are retried with jittered exponential backoff, and the requests in flight per host are limited.
+    GET requests go through the HTTP cache when one is given, see HttpCache. Identical GET and HEAD
+    requests in flight at the same time or within `dedup_window` seconds share one response.
+
+    Attributes:
+        timeout: Default connect and read timeouts.
+        retries (int): Default number of retries of idempotent requests.
+        backoff (float): Base of the backoff between retries in seconds.
+        max_per_host (int): Requests in flight per host.
+        cache (HttpCache): Cache of GET responses, or None.
+        plugin_ttls (dict): Cache TTL overrides in seconds by plugin id, see for_plugin.
+        flights (SingleFlight): Coalesces identical requests.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_per_host=DEFAULT_MAX_PER_HOST,
+                 cache=None, plugin_ttls=None, dedup_window=DEFAULT_DEDUP_WINDOW):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_per_host = max_per_host
+        self.cache = cache
+        self.plugin_ttls = plugin_ttls or {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.host_slots = {}
+        self.host_stats = {}
+        self.parsed = OrderedDict()
+        self.flights = SingleFlight(dedup_window)
+        self.parse_flights = SingleFlight()
+
+    def for_plugin(self, plugin_id):
+        """Returns a view of the client applying the cache TTL override configured for the plugin."""
+        return PluginHttpClient(self, self.plugin_ttls.get(plugin_id))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, timeout=None, retries=None, cache_ttl=None, coalesce=True, **kwargs):
+        """
+        Sends a request through the shared session and returns the response, like requests.request.
+
+        Error statuses are returned like requests does, callers check them. A response still carrying
+        a RETRY_STATUSES status after the last retry is returned as well. Responses answered from the
+        cache have from_cache set to True. Coalesced responses are shared between the callers, who
+        must not modify them.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            timeout: Connect and read timeouts, defaults to the client's.
+            retries (int, optional): Retries for this request, defaults to the client's for
+                idempotent methods and to none for the others.
+            cache_ttl (int, optional): Seconds a cached response stays fresh, overriding the
+                freshness the origin declares.
+            coalesce (bool): Whether an identical request in flight or just finished may answer this
+                one, disable it for endpoints returning a different response every time.
+            **kwargs: Further arguments for requests, e.g. params, headers, json or stream.
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed to get a response
+                and no cached response may be served instead.
+        """
+        method = method.upper()
+        if coalesce and method in COALESCED_METHODS and not kwargs.get("stream") and "data" not in kwargs and "json" not in kwargs:
+            key = self._get_request_key(method, url, kwargs.get("params"), kwargs.get("headers"))
+            return self.flights.do(key, lambda: self._request(method, url, timeout, retries, cache_ttl, **kwargs))
+        return self._request(method, url, timeout, retries, cache_ttl, **kwargs)
+
+    def get_parsed(self, url, parse, **kwargs):
+        """
+        GETs the url and returns parse(response), reusing the last result while the body is unchanged.
+
+        Cache hits and 304 answers return the same body, so feeds and calendars are parsed only when
+        they actually change. Callers must not modify the returned result.
+
+        Raises:
+            requests.exceptions.HTTPError: If the response has an error status.
+        """
+        memo_key = (self._get_request_key("GET", url, kwargs.get("params"), kwargs.get("headers")),
+                    getattr(parse, "__qualname__", repr(parse)))
+        return self.parse_flights.do(memo_key, lambda: self._get_parsed(memo_key, url, parse, **kwargs))
+
+    def _get_parsed(self, memo_key, url, parse, **kwargs):
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        digest = getattr(response, "cache_digest", None) or hashlib.sha256(response.content).hexdigest()
+        with self.lock:
+            memo = self.parsed.get(memo_key)
+            if memo is not None and memo[0] == digest:
+                self.parsed.move_to_end(memo_key)
+                return memo[1]
+
+        result = parse(response)
+        with self.lock:
+            self.parsed[memo_key] = (digest, result)
+            self.parsed.move_to_end(memo_key)
+            while len(self.parsed) > PARSED_CACHE_SIZE:
+                self.parsed.popitem(last=False)
+        return result
+
+    def _request(self, method, url, timeout, retries, cache_ttl, **kwargs):
+        if method == "GET" and self.cache is not None and not kwargs.get("stream"):
+            response = self._cached_get(url, timeout, retries, cache_ttl, **kwargs)
+        else:
+            response = self._send(method, url, timeout, retries, **kwargs)
+        if not kwargs.get("stream"):
+            # load the body while the request owns the response, it may be shared afterwards
+            response.content
+        return response
+
+    def _get_request_key(self, method, url, params=None, headers=None):
+        """Returns the normalized identity of a request: method, url with sorted query and the headers selecting the representation."""
+        full_url = requests.Request(method, url, params=params).prepare().url
+        parts = urlsplit(full_url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        headers = CaseInsensitiveDict(headers or {})
+        return (method, urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, "")),
+                tuple(headers.get(name) for name in KEY_HEADERS))
+
+    def _cached_get(self, url, timeout, retries, cache_ttl, **kwargs):
+        """GET through the cache: fresh entries are returned as is, stale ones are revalidated."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        full_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+        key = self.cache.get_key(full_url, headers)
+        meta = self.cache.get(key)
+        if meta is not None:
+            if self.cache.is_fresh(meta, cache_ttl):
+                response = self.cache.get_response(key, meta, "fresh_hits")
+                if response is not None:
+                    return response
+            headers.update(self.cache.get_validators(meta))
+
+        try:
+            response = self._send("GET", url, timeout, retries, headers=headers, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            stale = self._get_stale(key, meta, cache_ttl)
+            if stale is None:
+                raise
+            logger.warning(f"Request to {url} failed: {e}, serving the cached response")
+            return stale
+
+        if response.status_code == 304 and meta is not None:
+            meta = self.cache.refresh(key, meta, response)
+            cached = self.cache.get_response(key, meta, "revalidated")
+            if cached is not None:
+                return cached
+            # the body vanished from disk, fetch it again without validators
+            for name in self.cache.get_validators(meta):
+                headers.pop(name, None)
+            response = self._send("GET", url, timeout, retries, headers=headers, **kwargs)
+        elif response.status_code >= 500:
+            stale = self._get_stale(key, meta, cache_ttl)
+            if stale is not None:
+                logger.warning(f"Request to {url} returned {response.status_code}, serving the cached response")
+                response.close()
+                return stale
+
+        if response.status_code == 200:
+            self.cache.put(key, response)
+        self.cache.record_miss()
+        return response
+
+    def _get_stale(self, key, meta, cache_ttl):
+        if meta is None or not self.cache.can_serve_stale(meta, cache_ttl):
+            return None
+        return self.cache.get_response(key, meta, "stale_served")
+
+    def _send(self, method, url, timeout=None, retries=None, **kwargs):
+        host = urlsplit(url).netloc
+        if retries is None:
+            retries = self.retries if method in RETRY_METHODS else 0
+        timeout = timeout or self.timeout
+
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                with self._get_host_slot(host):
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(host, time.monotonic() - start, error=e, retried=attempt > 0)
+                if attempt >= retries:
+                    raise
+                delay = self._get_backoff(attempt)
+                logger.warning(f"Request to {host} failed: {e}, retrying in {delay:.1f}s")
+            else:
+                self._record(host, time.monotonic() - start, status=response.status_code, retried=attempt > 0)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = self._get_backoff(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"Request to {host} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def get_stats(self):
+        """Returns request counters and latencies per host."""
+        with self.lock:
+            return {host: {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "retries": stats["retries"],
+                "average_seconds": round(stats["total_seconds"] / stats["requests"], 3),
+                "max_seconds": round(stats["max_seconds"], 3),
+                "last_status": stats["last_status"],
+                "last_error": stats["last_error"]
+            } for host, stats in self.host_stats.items()}
+
+    def get_dedup_stats(self):
+        """Returns the counters of coalesced requests and parses."""
+        return {"requests": self.flights.get_stats(), "parses": self.parse_flights.get_stats()}
+
+    def get_cache_stats(self):
+        """Returns the HTTP cache counters, or None if caching is disabled."""
+        return self.cache.get_stats() if self.cache is not None else None
+
+    def close(self):
+        self.session.close()
+
+    def _get_host_slot(self, host):
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _get_backoff(self, attempt, retry_after=None):
+        """Full jitter exponential backoff, a numeric Retry-After header takes precedence up to MAX_BACKOFF."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return random.uniform(0, min(self.backoff * 2 ** attempt, MAX_BACKOFF))
+
+    def _record(self, host, duration, status=None, error=None, retried=False):
+        with self.lock:
+            stats = self.host_stats.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "last_status": None, "last_error": None
+            })
+            stats["requests"] += 1
+            stats["retries"] += retried
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["last_status"] = status
+            if error is not None or (status is not None and status >= 400):
+                stats["errors"] += 1
+                stats["last_error"] = str(error) if error is not None else f"HTTP {status}"
+
+
+class PluginHttpClient:
+    """View of the shared HTTP client for one plugin, requests default to the plugin's cache TTL."""
+
+    def __init__(self, client, cache_ttl=None):
+        self.client = client
+        self.cache_ttl = cache_ttl
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("cache_ttl", self.cache_ttl)
+        return self.client.request(method, url, **kwargs)
+
+    def get_parsed(self, url, parse, **kwargs):
+        kwargs.setdefault("cache_ttl", self.cache_ttl)
+        return self.client.get_parsed(url, parse, **kwargs)
+
+
+_http_client = None
+_http_client_settings = {}
+_http_cache_settings = None
+_http_client_lock = threading.Lock()
+
+
+def configure_http_client(timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, max_per_host=DEFAULT_MAX_PER_HOST,
+                          cache_dir=None, cache_max_bytes=DEFAULT_MAX_DISK_BYTES, stale_if_error=DEFAULT_STALE_IF_ERROR,
+                          plugin_ttls=None, dedup_window=DEFAULT_DEDUP_WINDOW):
+    """Sets the defaults of the shared HTTP client, replacing the current client. GET responses are cached in cache_dir if given."""
+    global _http_client, _http_client_settings, _http_cache_settings
+    with _http_client_lock:
+        _http_client_settings = {"timeout": tuple(timeout) if isinstance(timeout, list) else timeout,
+                                 "retries": retries, "max_per_host": max_per_host, "plugin_ttls": plugin_ttls,
+                                 "dedup_window": dedup_window}
+        _http_cache_settings = {"cache_dir": cache_dir, "max_disk_bytes": cache_max_bytes,
+                                "stale_if_error": stale_if_error} if cache_dir else None
+        _http_client = None
+
+
+def get_http_client():
+    """Returns the shared HTTP client."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            cache = HttpCache(**_http_cache_settings) if _http_cache_settings else None
+            _http_client = HttpClient(cache=cache, **_http_client_settings)
+        return _http_client
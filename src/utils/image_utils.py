@@ -1,23 +1,183 @@
 import requests
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+import numpy as np
+from PIL import Image, ImageOps, ImageFilter
 from io import BytesIO
 import os
 import logging
 import hashlib
 import tempfile
 import subprocess
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from utils.render_server import get_render_server
+from utils.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
-def get_image(image_url):
-    response = requests.get(image_url)
+# ITU-R 601-2 luma weights, as used by PIL's L conversion
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114])
+
+# Colours each panel can show, keyed by the palette index its driver expects for the colour
+PANEL_PALETTES = {
+    "inky_bw": {0: (255, 255, 255), 1: (0, 0, 0)},
+    "inky_red": {0: (255, 255, 255), 1: (0, 0, 0), 2: (255, 0, 0)},
+    "inky_yellow": {0: (255, 255, 255), 1: (0, 0, 0), 2: (255, 255, 0)},
+    "inky_7colour": {0: (0, 0, 0), 1: (255, 255, 255), 2: (0, 255, 0), 3: (0, 0, 255), 4: (255, 0, 0),
+                     5: (255, 255, 0), 6: (255, 140, 0)},
+    # Spectra 6 panels (Inky Impression E673/E640, Waveshare epd*e) skip index 4
+    "spectra6": {0: (0, 0, 0), 1: (255, 255, 255), 2: (255, 255, 0), 3: (255, 0, 0), 5: (0, 0, 255), 6: (0, 255, 0)},
+    "waveshare_bw": {0: (0, 0, 0), 1: (255, 255, 255)},
+    "waveshare_bwr": {0: (0, 0, 0), 1: (255, 255, 255), 2: (255, 0, 0)},
+    "waveshare_4colour": {0: (0, 0, 0), 1: (255, 255, 255), 2: (255, 255, 0), 3: (255, 0, 0)},
+    "waveshare_7colour": {0: (0, 0, 0), 1: (255, 255, 255), 2: (0, 255, 0), 3: (0, 0, 255), 4: (255, 0, 0),
+                          5: (255, 255, 0), 6: (255, 128, 0)},
+}
+DITHER_MODES = ["floyd-steinberg", "ordered", "none"]
+# Amplitude of the Bayer threshold map added before mapping to the palette in ordered mode
+ORDERED_DITHER_SPREAD = 64
+# Number of quantized frames kept in memory
+QUANTIZE_CACHE_SIZE = 4
+# Largest number of pixels load_image decodes, about 200 MB as RGBA
+DEFAULT_MAX_IMAGE_PIXELS = 50_000_000
+# Largest encoded image download_image accepts
+DEFAULT_MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+# Connect and read timeouts of image downloads, in seconds
+DEFAULT_DOWNLOAD_TIMEOUT = (10, 30)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Downloads are kept in memory up to this size and spill to a temporary file beyond
+DOWNLOAD_SPOOL_BYTES = 1024 * 1024
+# The pixel budget is checked from the image header once it arrived within this many bytes, else after the download
+HEADER_SNIFF_BYTES = 256 * 1024
+# Sources are decoded to at least this many times the target size, so the final resample can still antialias
+REDUCING_GAP = 2.0
+EXIF_ORIENTATION = 0x0112
+
+_max_image_pixels = DEFAULT_MAX_IMAGE_PIXELS
+_max_download_bytes = DEFAULT_MAX_DOWNLOAD_BYTES
+
+def get_image(image_url, target_size=None):
     img = None
-    if 200 <= response.status_code < 300 or response.status_code == 304:
-        img = Image.open(BytesIO(response.content))
-    else:
-        logger.error(f"Received non-200 response from {image_url}: status_code: {response.status_code}")
+    try:
+        img = download_image(image_url, target_size)
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"Received non-200 response from {image_url}: status_code: {e.response.status_code}")
+    return img
+
+def configure_image_loading(max_pixels=DEFAULT_MAX_IMAGE_PIXELS, max_download_bytes=DEFAULT_MAX_DOWNLOAD_BYTES):
+    """Sets the decompression pixel budget of load_image and the size limit of download_image."""
+    global _max_image_pixels, _max_download_bytes
+    _max_image_pixels = int(max_pixels)
+    _max_download_bytes = int(max_download_bytes)
+
+def load_image(source, target_size=None, exif_transpose=False):
+    """Decodes an image, as close to target_size as the format allows.
+
+    JPEGs are decoded with draft() at a reduced DCT scale, other formats are decoded in full and
+    shrunk with reduce(). Either way the result still covers at least REDUCING_GAP times target_size,
+    the caller's final resample produces the exact size.
+
+    Args:
+        source: File path, file object or bytes of the encoded image.
+        target_size (tuple, optional): Size the image is displayed at, None decodes at full size.
+        exif_transpose (bool): Apply the EXIF orientation to the decoded image.
+
+    Raises:
+        ValueError: If the decoded image would exceed the pixel budget set by configure_image_loading.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    img = Image.open(source)
+    orientation, min_size = _prepare_decode(img, target_size, exif_transpose)
+    img.load()
+
+    if min_size:
+        factor = min(img.width // min_size[0], img.height // min_size[1])
+        if factor >= 2:
+            if img.mode not in ("L", "LA", "RGB", "RGBA"):
+                img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+            img = img.reduce(factor)
+    if orientation != 1:
+        img = ImageOps.exif_transpose(img)
     return img
 
+def download_image(url, target_size=None, timeout=DEFAULT_DOWNLOAD_TIMEOUT, session=None, **kwargs):
+    """Streams an image from the URL and decodes it with load_image.
+
+    The body is read in chunks into a spooled temporary file, so the encoded image is only held in
+    memory while it is small. The download is aborted as soon as it exceeds the size limit, or once the
+    image header shows that the decoded image would exceed the pixel budget.
+
+    Args:
+        url (str): Image URL.
+        target_size (tuple, optional): Size the image is displayed at, see load_image.
+        timeout: Connect and read timeouts in seconds, as accepted by requests.
+        session (optional): requests.Session or HttpClient to download with, defaults to the shared HTTP client.
+        **kwargs: Further arguments for the request, e.g. headers.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or returns an error status.
+        ValueError: If the download exceeds the size limit or the image exceeds the pixel budget.
+    """
+    start = time.monotonic()
+    with (session or get_http_client()).get(url, stream=True, timeout=timeout, **kwargs) as response:
+        response.raise_for_status()
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if content_length > _max_download_bytes:
+            raise ValueError(f"Image of {content_length} bytes exceeds the download limit of {_max_download_bytes} bytes")
+
+        with tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES) as spool:
+            received = 0
+            header_checked = False
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                received += len(chunk)
+                if received > _max_download_bytes:
+                    raise ValueError(f"Image download from {url} exceeds the limit of {_max_download_bytes} bytes")
+                spool.write(chunk)
+                if not header_checked:
+                    header_checked = received > HEADER_SNIFF_BYTES or _check_image_header(spool, target_size)
+
+            spool.seek(0)
+            img = load_image(spool, target_size)
+
+    logger.info(f"Downloaded {received} bytes from {url} in {time.monotonic() - start:.2f}s, decoded to {img.width}x{img.height}")
+    return img
+
+def _check_image_header(spool, target_size):
+    """Checks the pixel budget as soon as the image header has arrived, returns True once it has."""
+    position = spool.tell()
+    try:
+        spool.seek(0)
+        img = Image.open(spool)
+    except Exception:
+        # header incomplete so far
+        return False
+    finally:
+        spool.seek(position)
+    _prepare_decode(img, target_size, exif_transpose=False)
+    return True
+
+def _prepare_decode(img, target_size, exif_transpose):
+    """Picks the decode scale of an opened, not yet decoded image and checks the pixel budget.
+
+    Returns the EXIF orientation and the size the decoded image has to cover, or None.
+    """
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1) if exif_transpose else 1
+
+    min_size = None
+    if target_size:
+        # the stored image is rotated by 90 degrees for these orientations
+        target_width, target_height = target_size[::-1] if orientation in (5, 6, 7, 8) else target_size
+        min_size = (int(target_width * REDUCING_GAP), int(target_height * REDUCING_GAP))
+        if img.format == "JPEG":
+            img.draft(img.mode, min_size)
+
+    width, height = img.size
+    if width * height > _max_image_pixels:
+        raise ValueError(f"Image of {width}x{height} pixels exceeds the decoding budget of {_max_image_pixels} pixels")
+    return orientation, min_size
+
 def change_orientation(image, orientation, inverted=False):
     if orientation == 'horizontal':
         angle = 0
@@ -29,20 +189,16 @@ def change_orientation(image, orientation, inverted=False):
 
     return image.rotate(angle, expand=1)
 
-def resize_image(image, desired_size, image_settings=[]):
-    img_width, img_height = image.size
-    desired_width, desired_height = desired_size
-    desired_width, desired_height = int(desired_width), int(desired_height)
+def get_crop_box(image_size, desired_size, keep_width=False):
+    """Returns the (left, top, right, bottom) box that crops image_size to the aspect ratio of desired_size."""
+    img_width, img_height = image_size
+    desired_width, desired_height = int(desired_size[0]), int(desired_size[1])
 
     img_ratio = img_width / img_height
     desired_ratio = desired_width / desired_height
 
-    keep_width = "keep-width" in image_settings
-
     x_offset, y_offset = 0,0
     new_width, new_height = img_width,img_height
-    # Step 1: Determine crop dimensions
-    desired_ratio = desired_width / desired_height
     if img_ratio > desired_ratio:
         # Image is wider than desired aspect ratio
         new_width = int(img_height * desired_ratio)
@@ -54,34 +210,222 @@ def resize_image(image, desired_size, image_settings=[]):
         if not keep_width:
             y_offset = (img_height - new_height) // 2
 
+    return (x_offset, y_offset, x_offset + new_width, y_offset + new_height)
+
+def resize_image(image, desired_size, image_settings=[]):
+    desired_width, desired_height = int(desired_size[0]), int(desired_size[1])
+
+    # Step 1: Determine crop dimensions
+    crop_box = get_crop_box(image.size, desired_size, "keep-width" in image_settings)
+
     # Step 2: Crop the image
-    image = image.crop((x_offset, y_offset, x_offset + new_width, y_offset + new_height))
+    image = image.crop(crop_box)
 
     # Step 3: Resize to the exact desired dimensions (if necessary)
     return image.resize((desired_width, desired_height), Image.LANCZOS)
 
-def apply_image_enhancement(img, image_settings={}):
+def prepare_display_image(image, desired_size, orientation="horizontal", inverted=False, image_settings=[], enhancement_settings={}):
+    """Fused equivalent of change_orientation, resize_image, the optional 180 degree rotation and
+    apply_image_enhancement, as applied before every push to the display.
+
+    The crop is computed in the rotated frame and mapped back onto the source image, so the source is
+    cropped and resampled in a single resize. Orientation and inversion are combined into one lossless
+    transpose of the already downscaled image, and the enhancements run in one pass over a single buffer.
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    desired_width, desired_height = int(desired_size[0]), int(desired_size[1])
+    width, height = image.size
+    keep_width = "keep-width" in image_settings
 
-    # Apply Brightness
-    img = ImageEnhance.Brightness(img).enhance(image_settings.get("brightness", 1.0))
+    if orientation == "vertical":
+        # crop in the frame rotated 90 degrees counter-clockwise, mapped back onto the source
+        left, top, right, bottom = get_crop_box((height, width), desired_size, keep_width)
+        box = (width - bottom, left, width - top, right)
+        resized = image.resize((desired_height, desired_width), Image.LANCZOS, box=box)
+        angle = 270 if inverted else 90
+    else:
+        box = get_crop_box((width, height), desired_size, keep_width)
+        resized = image.resize((desired_width, desired_height), Image.LANCZOS, box=box)
+        angle = 180 if inverted else 0
 
-    # Apply Contrast
-    img = ImageEnhance.Contrast(img).enhance(image_settings.get("contrast", 1.0))
+    transpose = {90: Image.Transpose.ROTATE_90, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_270}
+    if angle:
+        resized = resized.transpose(transpose[angle])
 
-    # Apply Saturation (Color)
-    img = ImageEnhance.Color(img).enhance(image_settings.get("saturation", 1.0))
+    return apply_image_enhancement(resized, enhancement_settings)
 
-    # Apply Sharpness
-    img = ImageEnhance.Sharpness(img).enhance(image_settings.get("sharpness", 1.0))
+def apply_image_enhancement(img, image_settings={}):
+    """Applies brightness, contrast, saturation and sharpness, in that order, like the PIL ImageEnhance classes.
+
+    Brightness and contrast are applied with one cached per-channel lookup table and saturation with
+    one cached colour matrix, see get_enhancement_lut(). Sharpness depends on neighbouring pixels and
+    is applied as one 3x3 kernel. Steps with a factor of 1.0 are skipped.
+    """
+    image_settings = image_settings or {}
+    brightness = float(image_settings.get("brightness", 1.0))
+    contrast = float(image_settings.get("contrast", 1.0))
+    saturation = float(image_settings.get("saturation", 1.0))
+    sharpness = float(image_settings.get("sharpness", 1.0))
+
+    if brightness != 1.0 or contrast != 1.0 or saturation != 1.0:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        pivot = get_contrast_pivot(img, brightness) if contrast != 1.0 else 0
+        lut, matrix = get_enhancement_lut(brightness, contrast, saturation, pivot)
+        if lut:
+            img = img.point(lut)
+        if matrix:
+            img = img.convert("RGB", matrix)
+
+    # Sharpness blends with the image smoothed by PIL's SMOOTH kernel, folded into a single kernel
+    if sharpness != 1.0:
+        rest = 1.0 - sharpness
+        kernel = [rest] * 9
+        kernel[4] = 5 * rest + 13 * sharpness
+        img = img.filter(ImageFilter.Kernel((3, 3), kernel, scale=13))
 
     return img
 
+def get_contrast_pivot(img, brightness=1.0):
+    """Returns the mean grey level of the image after brightness, the level contrast pivots around."""
+    levels = np.clip(np.trunc(np.arange(256) * brightness), 0, 255)
+    histogram = np.asarray(img.histogram(), dtype=np.float64).reshape(3, 256)
+    channel_means = (histogram @ levels) / histogram[0].sum()
+    return int(np.floor(channel_means @ LUMA_WEIGHTS + 0.5))
+
+@lru_cache(maxsize=16)
+def get_enhancement_lut(brightness, contrast, saturation, pivot):
+    """Compiles brightness and contrast around pivot into a per-channel lookup table for Image.point,
+    and saturation into a colour matrix for Image.convert.
+
+    Both are None when their factors are 1.0. Results are cached, they only change when the device
+    image settings are saved or an image has a different contrast pivot.
+    """
+    lut = None
+    if brightness != 1.0 or contrast != 1.0:
+        levels = np.clip(np.trunc(np.arange(256) * brightness), 0, 255)
+        if contrast != 1.0:
+            levels = np.clip(np.trunc(pivot + contrast * (levels - pivot)), 0, 255)
+        lut = levels.astype(np.uint8).tolist() * 3
+
+    # blending every pixel with its own grey level is a linear map of the three channels
+    matrix = None
+    if saturation != 1.0:
+        matrix = []
+        for channel in range(3):
+            row = [(1.0 - saturation) * weight for weight in LUMA_WEIGHTS]
+            row[channel] += saturation
+            matrix.extend(row + [0])
+        matrix = tuple(matrix)
+
+    return lut, matrix
+
+def clear_enhancement_luts():
+    """Drops the cached enhancement lookup tables, e.g. after the device image settings changed."""
+    get_enhancement_lut.cache_clear()
+
+def quantize_image(image, palette_name, dither_mode="floyd-steinberg"):
+    """Maps the image onto the colours of a panel palette and returns a 'P' mode image.
+
+    Palette indices of the result are the indices the panel driver expects, so it can be handed
+    to the driver as is. Results are cached by image hash, palette and dither mode.
+
+    Args:
+        image (PIL.Image): The processed frame.
+        palette_name (str): Key of PANEL_PALETTES.
+        dither_mode (str): One of DITHER_MODES.
+    """
+    if palette_name not in PANEL_PALETTES:
+        raise ValueError(f"Unknown panel palette: {palette_name}")
+    if dither_mode not in DITHER_MODES:
+        raise ValueError(f"Unknown dither mode: {dither_mode}")
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    key = (compute_image_hash(image), palette_name, dither_mode)
+    with _quantize_cache_lock:
+        quantized = _quantize_cache.get(key)
+        if quantized is not None:
+            _quantize_cache.move_to_end(key)
+            return quantized
+
+    if dither_mode == "ordered":
+        image = apply_ordered_dither(image)
+    dither = Image.Dither.FLOYDSTEINBERG if dither_mode == "floyd-steinberg" else Image.Dither.NONE
+    quantized = image.quantize(palette=get_palette_image(palette_name), dither=dither)
+
+    # unused driver indices are padded with the first colour, map them back onto it
+    colors = PANEL_PALETTES[palette_name]
+    gaps = [index for index in range(max(colors) + 1) if index not in colors]
+    if gaps:
+        remap = np.arange(256, dtype=np.uint8)
+        remap[gaps] = min(colors)
+        indices = remap[np.asarray(quantized)]
+        quantized = Image.fromarray(indices, "P")
+        quantized.putpalette(get_palette_image(palette_name).getpalette())
+
+    with _quantize_cache_lock:
+        _quantize_cache[key] = quantized
+        while len(_quantize_cache) > QUANTIZE_CACHE_SIZE:
+            _quantize_cache.popitem(last=False)
+    return quantized
+
+@lru_cache(maxsize=None)
+def get_palette_image(palette_name):
+    """Returns a 'P' mode image holding the panel palette at the driver indices, for Image.quantize."""
+    colors = PANEL_PALETTES[palette_name]
+    fill = colors[min(colors)]
+    palette = []
+    for index in range(max(colors) + 1):
+        palette.extend(colors.get(index, fill))
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(palette)
+    return palette_image
+
+def apply_ordered_dither(image):
+    """Adds an 8x8 Bayer threshold map to the image, mapping the result onto a palette without
+    error diffusion gives a stable, patterned dither."""
+    height, width = image.height, image.width
+    tiles = (height // 8 + 1, width // 8 + 1)
+    thresholds = np.tile(_BAYER_8X8, tiles)[:height, :width, np.newaxis]
+    pixels = np.asarray(image, dtype=np.int16) + thresholds
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+def _bayer_matrix(size):
+    matrix = np.zeros((1, 1), dtype=np.int32)
+    while matrix.shape[0] < size:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return matrix
+
+_BAYER_8X8 = ((_bayer_matrix(8) + 0.5) / 64 - 0.5) * ORDERED_DITHER_SPREAD
+_BAYER_8X8 = _BAYER_8X8.astype(np.int16)
+_quantize_cache = OrderedDict()
+_quantize_cache_lock = threading.Lock()
+
 def compute_image_hash(image):
     """Compute SHA-256 hash of an image."""
     image = image.convert("RGB")
     img_bytes = image.tobytes()
     return hashlib.sha256(img_bytes).hexdigest()
 
+def compute_frame_hash(image):
+    """Compute SHA-256 hash of a display frame as is, including its mode, size and palette."""
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}".encode("utf-8"))
+    if image.mode == "P":
+        digest.update(bytes(image.getpalette()))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def get_frame_difference(frame, previous_frame):
+    """Returns the fraction of pixels that differ between two frames given as numpy arrays."""
+    if previous_frame is None or frame.shape != previous_frame.shape:
+        return 1.0
+    changed = frame != previous_frame
+    if changed.ndim == 3:
+        changed = changed.any(axis=-1)
+    return float(changed.mean())
+
 def take_screenshot_html(html_str, dimensions, timeout_ms=None):
     image = None
     try:
@@ -90,7 +434,16 @@ def take_screenshot_html(html_str, dimensions, timeout_ms=None):
             html_file.write(html_str.encode("utf-8"))
             html_file_path = html_file.name
 
-        image = take_screenshot(html_file_path, dimensions, timeout_ms)
+        # Prefer the persistent render server, the one-shot browser is kept as a fallback
+        render_server = get_render_server()
+        if render_server:
+            try:
+                image = render_server.screenshot(f"file://{html_file_path}", dimensions, timeout_ms)
+            except Exception as e:
+                logger.warning(f"Render server unavailable, falling back to one-shot screenshot: {str(e)}")
+
+        if image is None:
+            image = take_screenshot(html_file_path, dimensions, timeout_ms)
 
         # Remove html file
         os.remove(html_file_path)
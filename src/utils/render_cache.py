@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from PIL import Image
+from utils.app_utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISK_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_MEMORY_ENTRIES = 4
+
+# local files referenced from rendered html or css (href="...", src="...", url(...))
+ASSET_PATTERN = re.compile(r"""(?:href|src)\s*=\s*["']([^"']+)["']|url\(\s*["']?([^"')]+?)["']?\s*\)""")
+# references with any other scheme (http:, data:, ...) are not local files
+URL_SCHEME_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+class RenderCache:
+    """Content addressed cache of screenshots of rendered plugin HTML.
+
+    Entries are keyed by a fingerprint of the fully rendered HTML, the viewport dimensions
+    and the size and modification time of every local asset (stylesheets, fonts, icons)
+    the HTML references. Recently used images are kept in memory, all entries are stored
+    as PNGs on disk and evicted least recently used first once `max_disk_bytes` is exceeded.
+
+    Attributes:
+        cache_dir (str): Directory holding the cached PNGs.
+        max_disk_bytes (int): Size budget for the on-disk tier.
+        max_memory_entries (int): Number of images kept in the in-memory tier.
+        stats (dict): Hit and miss counters.
+    """
+
+    def __init__(self, cache_dir, max_disk_bytes=DEFAULT_MAX_DISK_BYTES, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_entries = max_memory_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.disk = self._load_disk_index()
+        self.disk_bytes = sum(self.disk.values())
+
+    def fingerprint(self, html, dimensions):
+        """Returns the cache key for the given rendered html and viewport dimensions."""
+        digest = hashlib.sha256()
+        digest.update(f"{int(dimensions[0])}x{int(dimensions[1])}".encode("utf-8"))
+        digest.update(html.encode("utf-8"))
+        for asset in sorted(self._find_assets(html)):
+            digest.update(asset.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns a copy of the cached image for the key, or None on a miss."""
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                # keep entries served from memory from being evicted from disk first
+                if key in self.disk:
+                    self.disk.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                logger.debug(f"Render cache memory hit | stats: {self.stats}")
+                return image.copy()
+
+            path = self._entry_path(key)
+            if key in self.disk:
+                try:
+                    with Image.open(path) as img:
+                        image = img.copy()
+                    os.utime(path)
+                    self.disk.move_to_end(key)
+                    self._remember(key, image)
+                    self.stats["disk_hits"] += 1
+                    logger.debug(f"Render cache disk hit | stats: {self.stats}")
+                    return image.copy()
+                except OSError as e:
+                    logger.warning(f"Failed to read render cache entry {key}: {e}")
+                    self._forget_disk_entry(key)
+
+            self.stats["misses"] += 1
+            logger.debug(f"Render cache miss | stats: {self.stats}")
+            return None
+
+    def put(self, key, image):
+        """Stores the image under the key in both tiers."""
+        with self.lock:
+            self._remember(key, image.copy())
+            path = self._entry_path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                image.save(tmp_path, "PNG")
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write render cache entry {key}: {e}")
+                return
+
+            self._forget_disk_entry(key, remove_file=False)
+            self.disk[key] = os.path.getsize(path)
+            self.disk_bytes += self.disk[key]
+            while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                oldest = next(iter(self.disk))
+                self._forget_disk_entry(oldest)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """Removes every cached entry."""
+        with self.lock:
+            self.memory.clear()
+            for key in list(self.disk):
+                self._forget_disk_entry(key)
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "memory_entries": len(self.memory),
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk_bytes
+            }
+
+    def _remember(self, key, image):
+        self.memory[key] = image
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _forget_disk_entry(self, key, remove_file=True):
+        size = self.disk.pop(key, None)
+        if size is not None:
+            self.disk_bytes -= size
+        if remove_file:
+            self.memory.pop(key, None)
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _load_disk_index(self):
+        """Indexes existing entries on disk, least recently used first."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(".png")], stat.st_size))
+        return OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    def _find_assets(self, html):
+        """Returns signatures (path, size, mtime) of the local files the html depends on."""
+        signatures = set()
+        # relative references in a stylesheet are resolved against its directory
+        pending = [(html, None)]
+        seen = set()
+        while pending:
+            content, base_dir = pending.pop()
+            for match in ASSET_PATTERN.finditer(content):
+                path = _resolve_asset_path((match.group(1) or match.group(2)).strip(), base_dir)
+                if not path or path in seen:
+                    continue
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signatures.add(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+
+                # stylesheets can pull in further assets, e.g. background images
+                if path.endswith(".css"):
+                    try:
+                        with open(path, encoding="utf-8") as f:
+                            pending.append((f.read(), os.path.dirname(path)))
+                    except (OSError, UnicodeDecodeError):
+                        pass
+        return signatures
+
+
+def _resolve_asset_path(reference, base_dir):
+    """Returns the local file path of an asset reference, or None if it is not a local file."""
+    if reference.startswith("file://"):
+        reference = reference[len("file://"):]
+    elif URL_SCHEME_PATTERN.match(reference):
+        return None
+    # drop query strings and fragments, e.g. font.woff2?v=2 or font.svg#regular
+    path = unquote(reference.split("?", 1)[0].split("#", 1)[0])
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        if base_dir is None:
+            return None
+        path = os.path.join(base_dir, path)
+    return os.path.normpath(path)
+
+_render_cache = None
+_render_cache_enabled = True
+_render_cache_settings = {}
+_render_cache_lock = threading.Lock()
+
+
+def configure_render_cache(enabled=True, max_disk_bytes=DEFAULT_MAX_DISK_BYTES, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES):
+    """Enables or disables the render cache and sets the size of both tiers."""
+    global _render_cache, _render_cache_enabled, _render_cache_settings
+    with _render_cache_lock:
+        _render_cache_enabled = enabled
+        _render_cache_settings = {"max_disk_bytes": max_disk_bytes, "max_memory_entries": max_memory_entries}
+        _render_cache = None
+
+
+def get_render_cache():
+    """Returns the shared render cache, or None if it has been disabled."""
+    global _render_cache
+    with _render_cache_lock:
+        if not _render_cache_enabled:
+            return None
+        if _render_cache is None:
+            _render_cache = RenderCache(get_cache_dir("render"), **_render_cache_settings)
+        return _render_cache
@@ -0,0 +1,360 @@
+import base64
+import fcntl
+import json
+import logging
+import os
+import subprocess
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_BINARY = "chromium-headless-shell"
+CHROMIUM_FLAGS = [
+    "--headless",
+    "--remote-debugging-pipe",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--use-gl=swiftshader",
+    "--hide-scrollbars",
+    "--in-process-gpu",
+    "--js-flags=--jitless",
+    "--disable-zero-copy",
+    "--disable-gpu-memory-buffer-compositor-resources",
+    "--disable-extensions",
+    "--disable-plugins",
+    "--mute-audio",
+    "--no-sandbox",
+    "--no-first-run",
+]
+
+# Shut the browser down after this many seconds without a render
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+# Recycle the browser process periodically to keep its memory footprint in check
+MAX_RENDERS_PER_PROCESS = 50
+# Upper bound for a single DevTools command or page load
+COMMAND_TIMEOUT = 30
+
+# Chromium reads DevTools commands from fd 3 and writes responses to fd 4
+PIPE_READ_FD = 3
+PIPE_WRITE_FD = 4
+
+
+class RenderServerError(RuntimeError):
+    """Raised when the persistent browser cannot complete a render."""
+
+
+class RenderServer:
+    """Long-lived headless Chromium process driven over the DevTools protocol.
+
+    A single page is created on first use and reused for every subsequent render, so
+    the cost of starting the browser is only paid once per process lifetime. The browser
+    is restarted transparently when it crashes and shut down after `idle_timeout` seconds
+    without a render.
+
+    Attributes:
+        binary (str): Chromium executable to launch.
+        idle_timeout (int): Seconds of inactivity before the browser is shut down.
+        renders (int): Number of renders served by the current browser process.
+        restarts (int): Number of times the browser had to be (re)started.
+    """
+
+    def __init__(self, binary=CHROMIUM_BINARY, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.binary = binary
+        self.idle_timeout = idle_timeout
+        self.renders = 0
+        self.restarts = 0
+
+        # serializes renders and process lifecycle changes
+        self.lock = threading.RLock()
+        self.process = None
+        self.writer = None
+        self.reader_thread = None
+        self.idle_timer = None
+
+        self.pending_lock = threading.Lock()
+        self.pending = {}
+        self.event_waiters = {}
+        self.next_id = 0
+        self.session_id = None
+
+    def screenshot(self, url, dimensions, timeout_ms=None):
+        """Loads the given url in the warm page and returns a PIL image of the viewport."""
+        with self.lock:
+            self._cancel_idle_timer()
+            try:
+                for attempt in range(2):
+                    try:
+                        self._ensure_started()
+                        image = self._capture(url, dimensions, timeout_ms)
+                        self.renders += 1
+                        if self.renders >= MAX_RENDERS_PER_PROCESS:
+                            logger.info("Recycling render server after %d renders", self.renders)
+                            self._stop_process()
+                        return image
+                    except RenderServerError as e:
+                        logger.warning(f"Render server failed (attempt {attempt + 1}): {e}")
+                        self._stop_process()
+                        if attempt:
+                            raise
+            finally:
+                self._schedule_idle_shutdown()
+
+    def shutdown(self):
+        """Stops the browser process if it is running."""
+        with self.lock:
+            self._cancel_idle_timer()
+            self._stop_process()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def _ensure_started(self):
+        if self.is_running():
+            return
+        self._stop_process()
+
+        to_chrome_read, to_chrome_write = os.pipe()
+        from_chrome_read, from_chrome_write = os.pipe()
+
+        def attach_pipes():
+            # move the pipe ends out of the way first so dup2 never clobbers one with the other
+            read_fd = fcntl.fcntl(to_chrome_read, fcntl.F_DUPFD, 10)
+            write_fd = fcntl.fcntl(from_chrome_write, fcntl.F_DUPFD, 10)
+            os.dup2(read_fd, PIPE_READ_FD)
+            os.dup2(write_fd, PIPE_WRITE_FD)
+            os.close(read_fd)
+            os.close(write_fd)
+
+        logger.info("Starting render server")
+        try:
+            # close_fds must stay False so the dup'ed fds 3 and 4 survive; every other
+            # descriptor opened by Python is non-inheritable and is closed on exec
+            self.process = subprocess.Popen(
+                [self.binary, *CHROMIUM_FLAGS, "about:blank"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                close_fds=False,
+                preexec_fn=attach_pipes,
+            )
+        except OSError as e:
+            for fd in (to_chrome_read, to_chrome_write, from_chrome_read, from_chrome_write):
+                os.close(fd)
+            raise RenderServerError(f"Failed to start {self.binary}: {e}")
+        finally:
+            if self.process is not None:
+                os.close(to_chrome_read)
+                os.close(from_chrome_write)
+
+        self.writer = os.fdopen(to_chrome_write, "wb", buffering=0)
+        self.reader_thread = threading.Thread(
+            target=self._read_messages, args=(from_chrome_read,), daemon=True)
+        self.reader_thread.start()
+        self.renders = 0
+        self.restarts += 1
+
+        target = self._send("Target.createTarget", {"url": "about:blank"})
+        attached = self._send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        self.session_id = attached["sessionId"]
+        self._send("Page.enable", session_id=self.session_id)
+
+    def _capture(self, url, dimensions, timeout_ms):
+        width, height = int(dimensions[0]), int(dimensions[1])
+        self._send("Emulation.setDeviceMetricsOverride", {
+            "width": width,
+            "height": height,
+            "deviceScaleFactor": 1,
+            "mobile": False
+        }, session_id=self.session_id)
+
+        load_event = self._expect_event("Page.loadEventFired", self.session_id)
+        navigation = self._send("Page.navigate", {"url": url}, session_id=self.session_id)
+        if navigation.get("errorText"):
+            self._discard_event(load_event)
+            raise RenderServerError(f"Navigation failed: {navigation['errorText']}")
+
+        load_timeout = timeout_ms / 1000 if timeout_ms else COMMAND_TIMEOUT
+        if not load_event.wait(load_timeout):
+            self._discard_event(load_event)
+            if not timeout_ms:
+                raise RenderServerError(f"Timed out loading {url}")
+            # mirror chromium's --timeout flag: stop loading and capture whatever rendered
+            logger.info(f"Page load exceeded {timeout_ms}ms, capturing current state")
+            self._send("Page.stopLoading", session_id=self.session_id)
+
+        result = self._send("Page.captureScreenshot", {
+            "format": "png",
+            "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": 1}
+        }, session_id=self.session_id)
+
+        with Image.open(BytesIO(base64.b64decode(result["data"]))) as img:
+            return img.copy()
+
+    def _send(self, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT):
+        with self.pending_lock:
+            self.next_id += 1
+            message_id = self.next_id
+            done = threading.Event()
+            self.pending[message_id] = [done, None]
+
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+
+        try:
+            self.writer.write(json.dumps(message).encode("utf-8") + b"\0")
+        except (OSError, ValueError) as e:
+            with self.pending_lock:
+                self.pending.pop(message_id, None)
+            raise RenderServerError(f"Lost connection to browser: {e}")
+
+        if not done.wait(timeout):
+            with self.pending_lock:
+                self.pending.pop(message_id, None)
+            raise RenderServerError(f"Timed out waiting for {method}")
+
+        with self.pending_lock:
+            response = self.pending.pop(message_id)[1]
+        if response is None:
+            raise RenderServerError(f"Browser exited while waiting for {method}")
+        if "error" in response:
+            raise RenderServerError(f"{method} failed: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def _expect_event(self, method, session_id):
+        event = threading.Event()
+        with self.pending_lock:
+            self.event_waiters[(method, session_id)] = event
+        return event
+
+    def _discard_event(self, event):
+        with self.pending_lock:
+            for key, waiter in list(self.event_waiters.items()):
+                if waiter is event:
+                    del self.event_waiters[key]
+
+    def _read_messages(self, fd):
+        buffer = b""
+        with os.fdopen(fd, "rb", buffering=0) as reader:
+            while True:
+                try:
+                    chunk = reader.read(65536)
+                except OSError:
+                    chunk = b""
+                if not chunk:
+                    break
+                buffer += chunk
+                *messages, buffer = buffer.split(b"\0")
+                for raw in messages:
+                    self._dispatch(raw)
+
+        # browser went away, release anybody still waiting on a response
+        with self.pending_lock:
+            for waiter in self.pending.values():
+                waiter[0].set()
+            for event in self.event_waiters.values():
+                event.set()
+            self.event_waiters.clear()
+
+    def _dispatch(self, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.debug("Ignoring malformed DevTools message")
+            return
+
+        with self.pending_lock:
+            if "id" in message:
+                waiter = self.pending.get(message["id"])
+                if waiter:
+                    waiter[1] = message
+                    waiter[0].set()
+            else:
+                event = self.event_waiters.pop((message.get("method"), message.get("sessionId")), None)
+                if event:
+                    event.set()
+
+    def _stop_process(self):
+        process, self.process = self.process, None
+        self.session_id = None
+        if self.writer:
+            try:
+                self.writer.close()
+            except OSError:
+                pass
+            self.writer = None
+        if process and process.poll() is None:
+            logger.info("Stopping render server")
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self.reader_thread:
+            self.reader_thread.join(timeout=5)
+            self.reader_thread = None
+
+    def _schedule_idle_shutdown(self):
+        if not self.idle_timeout or not self.is_running():
+            return
+        self.idle_timer = threading.Timer(self.idle_timeout, self._idle_shutdown)
+        self.idle_timer.daemon = True
+        self.idle_timer.start()
+
+    def _cancel_idle_timer(self):
+        if self.idle_timer:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+
+    def _idle_shutdown(self):
+        # skip if a render is in progress, it will reschedule the timer when done
+        if self.lock.acquire(blocking=False):
+            try:
+                logger.info(f"Render server idle for {self.idle_timeout}s, shutting down")
+                self.idle_timer = None
+                self._stop_process()
+            finally:
+                self.lock.release()
+
+
+_render_server = None
+_render_server_enabled = True
+_render_server_lock = threading.Lock()
+
+
+def configure_render_server(enabled=True, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Enables or disables the persistent render server and sets its idle timeout."""
+    global _render_server_enabled
+    with _render_server_lock:
+        _render_server_enabled = enabled
+        if _render_server:
+            _render_server.idle_timeout = idle_timeout
+            if not enabled:
+                _render_server.shutdown()
+        elif enabled:
+            _create_render_server(idle_timeout)
+
+
+def get_render_server():
+    """Returns the shared render server, or None if it has been disabled."""
+    with _render_server_lock:
+        if not _render_server_enabled:
+            return None
+        return _render_server or _create_render_server(DEFAULT_IDLE_TIMEOUT)
+
+
+def shutdown_render_server():
+    """Stops the shared render server's browser process, if any."""
+    with _render_server_lock:
+        if _render_server:
+            _render_server.shutdown()
+
+
+def _create_render_server(idle_timeout):
+    global _render_server
+    _render_server = RenderServer(idle_timeout=idle_timeout)
+    return _render_server
@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """Coalesces identical calls so they share one execution and its result.
+
+    A call whose key is already in flight waits for that execution instead of starting its own.
+    Successful results are also handed to calls with the same key arriving within `window`
+    seconds after the execution finished. A failure is raised in every waiting call and is
+    never reused.
+
+    Attributes:
+        window (float): Seconds a finished result is shared with later calls.
+        stats (dict): Executions and the calls served by another call's execution.
+    """
+
+    def __init__(self, window=0):
+        self.window = window
+        self.stats = {"executions": 0, "in_flight_hits": 0, "recent_hits": 0}
+
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        """
+        Returns fn(), or the result of the identical call in flight or recently finished.
+
+        Raises:
+            Exception: Whatever the shared execution of fn raised.
+        """
+        with self.lock:
+            self._prune()
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = _Call()
+                self.stats["executions"] += 1
+                owner = True
+            else:
+                self.stats["in_flight_hits" if call.finished_at is None else "recent_hits"] += 1
+                owner = False
+
+        if not owner:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                call.finished_at = time.monotonic()
+                if call.error is not None or not self.window:
+                    self.calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def get_stats(self):
+        with self.lock:
+            return {**self.stats, "dedup_hits": self.stats["in_flight_hits"] + self.stats["recent_hits"]}
+
+    def _prune(self):
+        """Drops finished calls older than the window. Called with the lock held."""
+        cutoff = time.monotonic() - self.window
+        for key in [key for key, call in self.calls.items() if call.finished_at is not None and call.finished_at < cutoff]:
+            del self.calls[key]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the application imports its modules relative to src, e.g. `from utils.image_utils import ...`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
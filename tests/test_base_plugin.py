@@ -0,0 +1,39 @@
+import threading
+import time
+
+from plugins.base_plugin.base_plugin import BasePlugin
+
+class TestFetchConcurrently:
+
+    def test_results_errors_and_deadline(self):
+        plugin = BasePlugin({"id": "test"})
+        release = threading.Event()
+
+        def failing():
+            raise RuntimeError("offline")
+
+        def slow():
+            release.wait(5)
+            return "late"
+
+        started = time.monotonic()
+        try:
+            results, errors = plugin.fetch_concurrently({"weather": lambda: "sunny", "air quality": failing, "location": slow}, 0.2)
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+
+        assert elapsed < 1
+        assert results == {"weather": "sunny"}
+        assert isinstance(errors["air quality"], RuntimeError)
+        assert isinstance(errors["location"], TimeoutError)
+        assert set(errors) == {"air quality", "location"}
+
+    def test_fetches_run_concurrently(self):
+        plugin = BasePlugin({"id": "test"})
+        barrier = threading.Barrier(3, timeout=2)
+
+        results, errors = plugin.fetch_concurrently({name: barrier.wait for name in ["a", "b", "c"]}, 5)
+
+        assert not errors
+        assert sorted(results) == ["a", "b", "c"]
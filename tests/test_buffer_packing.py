@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src.display.buffer_packing import pack_pixels, pack_color_planes, get_blank_plane
+
+class TestPackPixels:
+
+    def test_1bit_leftmost_pixel_in_msb(self):
+        indices = np.array([[0, 1, 1, 1, 1, 1, 1, 0]], dtype=np.uint8)
+
+        assert pack_pixels(indices, 1) == bytearray([0b01111110])
+
+    def test_1bit_rows_padded_with_white(self):
+        indices = np.zeros((2, 10), dtype=np.uint8)
+
+        assert pack_pixels(indices, 1) == bytearray([0x00, 0x3F, 0x00, 0x3F])
+
+    def test_2bit(self):
+        indices = np.array([[0, 1, 2, 3, 3, 2, 1, 0]], dtype=np.uint8)
+
+        assert pack_pixels(indices, 2) == bytearray([0b00011011, 0b11100100])
+
+    def test_4bit(self):
+        indices = np.array([[0, 1, 6, 5]], dtype=np.uint8)
+
+        assert pack_pixels(indices, 4) == bytearray([0x01, 0x65])
+
+    def test_unsupported_bits_per_pixel(self):
+        with pytest.raises(ValueError):
+            pack_pixels(np.zeros((1, 8), dtype=np.uint8), 3)
+
+class TestColorPlanes:
+
+    def test_black_and_colour_pixels_clear_their_bits(self):
+        indices = np.array([[0, 1, 2, 1, 1, 1, 1, 2]], dtype=np.uint8)
+
+        black_plane, color_plane = pack_color_planes(indices)
+
+        assert black_plane == bytearray([0b01111111])
+        assert color_plane == bytearray([0b11011110])
+
+    def test_blank_plane_is_white_and_cached(self):
+        assert get_blank_plane(10, 2) == bytes([0xFF] * 4)
+        assert get_blank_plane(10, 2) is get_blank_plane(10, 2)
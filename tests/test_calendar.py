@@ -0,0 +1,77 @@
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+import requests
+
+from plugins.calendar import calendar
+from plugins.calendar.calendar import Calendar
+
+ICS = b"""BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//test//EN
+BEGIN:VEVENT
+UID:%s
+DTSTART:20240501T090000Z
+DTEND:20240501T091500Z
+RRULE:FREQ=DAILY
+SUMMARY:%s
+END:VEVENT
+END:VCALENDAR
+"""
+
+def make_response(title):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = ICS % (title.encode(), title.encode())
+    return response
+
+class TestFetchIcsEvents:
+
+    def setup_method(self):
+        self.calendar = Calendar({"id": "calendar"})
+        self.tz = pytz.timezone("UTC")
+        self.start, self.end = self.calendar.get_view_range("timeGridDay", datetime(2024, 5, 2, 10), {})
+        self.failing = set()
+
+    def fetch_calendar(self, url):
+        if url in self.failing:
+            raise RuntimeError(f"Failed to fetch iCalendar url: {url}")
+        return make_response(url)
+
+    def fetch(self, urls):
+        return self.calendar.fetch_ics_events(urls, ["#ff0000"] * len(urls), self.tz, self.start, self.end)
+
+    def test_failing_and_slow_feeds_fall_back_to_cached_events(self, monkeypatch):
+        monkeypatch.setattr(self.calendar, "fetch_calendar", self.fetch_calendar)
+        monkeypatch.setattr(calendar, "FEEDS_DEADLINE", 0.3)
+        assert [event["title"] for event in self.fetch(["failing", "slow", "healthy"])] == ["failing", "slow", "healthy"]
+
+        self.failing.add("failing")
+        # the slow feed is still being expanded by a fetch that misses the deadline
+        slow_lock = self.calendar.ics_cache.feed_locks[("slow", "UTC")]
+        slow_lock.acquire()
+        try:
+            started = time.monotonic()
+            events = self.fetch(["failing", "slow", "healthy"])
+            elapsed = time.monotonic() - started
+        finally:
+            slow_lock.release()
+
+        assert elapsed < 2
+        assert [(event["title"], event.get("classNames")) for event in events] == [
+            ("failing", ["stale"]), ("slow", ["stale"]), ("healthy", None)]
+
+    def test_failing_feed_without_cached_events_is_left_out(self, monkeypatch):
+        monkeypatch.setattr(self.calendar, "fetch_calendar", self.fetch_calendar)
+        self.failing.add("failing")
+
+        assert [event["title"] for event in self.fetch(["failing", "healthy"])] == ["healthy"]
+
+    def test_all_feeds_failing_raises(self, monkeypatch):
+        monkeypatch.setattr(self.calendar, "fetch_calendar", self.fetch_calendar)
+        self.failing.update({"first", "second"})
+
+        with pytest.raises(RuntimeError, match="first"):
+            self.fetch(["first", "second"])
@@ -0,0 +1,49 @@
+import json
+import threading
+
+import pytest
+
+from config import Config
+from model import RefreshInfo
+
+@pytest.fixture
+def device_config(tmp_path, monkeypatch):
+    config_file = tmp_path / "device.json"
+    config_file.write_text(json.dumps({"name": "InkyPi", "resolution": [800, 480], "refresh_info": {
+        "refresh_time": None, "image_hash": None, "refresh_type": "Manual Update", "plugin_id": "clock"}}))
+    monkeypatch.setattr(Config, "config_file", str(config_file))
+    return Config()
+
+class TestWriteConfig:
+
+    def test_frame_hash_is_kept_when_refresh_info_is_replaced(self, device_config):
+        device_config.update_frame_hash("abc")
+        device_config.set_refresh_info(RefreshInfo("Playlist", "weather", "2025-01-01T00:00:00+00:00", "def"))
+        device_config.write_config()
+
+        assert device_config.get_refresh_info().frame_hash == "abc"
+        with open(Config.config_file) as f:
+            assert json.load(f)["refresh_info"]["frame_hash"] == "abc"
+
+    def test_concurrent_writes_leave_a_complete_file(self, device_config):
+        errors = []
+
+        def write(worker):
+            try:
+                for i in range(20):
+                    device_config.update_value(f"worker_{worker}", i, write=True)
+                    device_config.update_frame_hash(f"{worker}-{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        with open(Config.config_file) as f:
+            written = json.load(f)
+        assert all(written[f"worker_{worker}"] == 19 for worker in range(4))
+        assert written["refresh_info"]["frame_hash"] == device_config.get_refresh_info().frame_hash
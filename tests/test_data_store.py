@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.data_store import DataStore
+
+class Source:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.fetched = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.fetched.set()
+        if self.fail:
+            raise RuntimeError("offline")
+        return {"value": self.calls}
+
+def wait_for_refresh(store, source):
+    source.fetched.wait(2)
+    deadline = time.monotonic() + 2
+    while store.get_stats()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+class TestDataStore:
+
+    def test_fresh_snapshot_is_reused(self):
+        store, source = DataStore(), Source()
+
+        assert store.get("weather", source, max_age=60) == {"value": 1}
+        assert store.get("weather", source, max_age=60) == {"value": 1}
+        assert source.calls == 1
+        assert store.get_stats()["fresh_hits"] == 1
+
+    def test_stale_snapshot_is_served_while_revalidating(self):
+        store, source = DataStore(keep_warm=False), Source()
+        store.get("weather", source, max_age=0.01, max_stale=60)
+        time.sleep(0.02)
+        source.fetched.clear()
+
+        assert store.get("weather", source, max_age=0.01, max_stale=60) == {"value": 1}
+        wait_for_refresh(store, source)
+
+        assert source.calls == 2
+        assert store.get("weather", source, max_age=60) == {"value": 2}
+        assert store.get_stats()["stale_hits"] == 1
+
+    def test_too_old_snapshot_is_fetched(self):
+        store, source = DataStore(keep_warm=False), Source()
+        store.get("weather", source, max_age=0.01)
+        time.sleep(0.02)
+
+        assert store.get("weather", source, max_age=0.01) == {"value": 2}
+        assert store.get_stats()["misses"] == 2
+
+    def test_stale_data_keeps_its_fetch_time(self):
+        store, source = DataStore(keep_warm=False), Source()
+        before = time.time()
+        data, fetched_at = store.get("weather", source, max_age=0.01, max_stale=60, with_fetched_at=True)
+        assert data == {"value": 1} and before <= fetched_at <= time.time()
+        time.sleep(0.02)
+        source.fail = True
+        source.fetched.clear()
+
+        assert store.get("weather", source, max_age=0.01, max_stale=60, with_fetched_at=True) == ({"value": 1}, fetched_at)
+
+    def test_failed_revalidation_keeps_snapshot(self):
+        store, source = DataStore(keep_warm=False), Source()
+        store.get("weather", source, max_age=0.01, max_stale=60)
+        time.sleep(0.02)
+        source.fail = True
+        source.fetched.clear()
+
+        assert store.get("weather", source, max_age=0.01, max_stale=60) == {"value": 1}
+        wait_for_refresh(store, source)
+
+        assert store.get("weather", source, max_age=0.01, max_stale=60) == {"value": 1}
+        assert store.get_stats()["errors"] >= 1
+
+    def test_fetch_error_without_snapshot(self):
+        store, source = DataStore(), Source()
+        source.fail = True
+
+        with pytest.raises(RuntimeError):
+            store.get("weather", source, max_age=60)
+
+    def test_snapshots_survive_restart(self, tmp_path):
+        source = Source()
+        DataStore(str(tmp_path)).get("weather", source, max_age=60)
+
+        restarted = DataStore(str(tmp_path))
+
+        assert restarted.get("weather", source, max_age=60) == {"value": 1}
+        assert source.calls == 1
+
+    def test_unserializable_data_stays_in_memory(self, tmp_path):
+        store = DataStore(str(tmp_path))
+
+        assert store.get("calendar", lambda: {1, 2}, max_age=60) == {1, 2}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_read_sources_are_kept_warm(self):
+        store, source = DataStore(), Source()
+        store.get("weather", source, max_age=0.05, max_stale=60)
+        source.fetched.clear()
+
+        wait_for_refresh(store, source)
+
+        assert source.calls == 2
+        assert store.get_stats()["refreshes"] == 1
+
+    def test_data_without_max_age_never_expires(self, tmp_path):
+        store, source = DataStore(str(tmp_path), keep_warm=False), Source()
+        store.get("weather:location:1.0,2.0", source, max_age=None)
+        store.snapshots["weather:location:1.0,2.0"]["fetched_at"] -= 365 * 24 * 60 * 60
+
+        assert store.get("weather:location:1.0,2.0", source, max_age=None) == {"value": 1}
+        assert source.calls == 1
+
+    def test_invalidate_by_prefix(self, tmp_path):
+        store, location, forecast = DataStore(str(tmp_path), keep_warm=False), Source(), Source()
+        store.get("weather:location:1.0,2.0", location, max_age=None)
+        store.get("weather:forecast", forecast, max_age=60)
+
+        assert store.invalidate("weather:location:") == 1
+
+        restarted = DataStore(str(tmp_path), keep_warm=False)
+        assert restarted.get("weather:location:1.0,2.0", location, max_age=None) == {"value": 2}
+        assert restarted.get("weather:forecast", forecast, max_age=60) == {"value": 1}
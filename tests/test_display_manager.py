@@ -0,0 +1,243 @@
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+from display.display_manager import DisplayManager
+from model import RefreshInfo
+
+class FakeConfig:
+    def __init__(self, tmp_path, **config):
+        self.config = {"display_type": "mock", "output_dir": str(tmp_path / "mock"), **config}
+        self.current_image_file = str(tmp_path / "current_image.png")
+        self.panel_preview_file = str(tmp_path / "panel_preview.png")
+        self.refresh_info = RefreshInfo("Manual Update", "clock", None, None)
+        self.writes = 0
+
+    def get_refresh_info(self):
+        return self.refresh_info
+
+    def write_config(self):
+        self.writes += 1
+
+    def update_frame_hash(self, frame_hash):
+        self.refresh_info.frame_hash = frame_hash
+        self.write_config()
+
+    def get_config(self, key=None, default=None):
+        if key is None:
+            return self.config
+        return self.config.get(key, default)
+
+    def update_value(self, key, value, write=False):
+        self.config[key] = value
+
+    def get_resolution(self):
+        return tuple(self.config.get("resolution", (80, 60)))
+
+def frame(dots=0):
+    image = Image.new("RGB", (80, 60), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(dots):
+        draw.point((i % 80, i // 80), fill="black")
+    return image
+
+def count_pushes(display_manager):
+    pushes = []
+    display_manager.display.display_image = lambda image, image_settings=[]: pushes.append(image)
+    return pushes
+
+class TestPanelPalette:
+
+    def test_auto_uses_the_palette_of_the_panel(self, tmp_path):
+        display_manager = DisplayManager(FakeConfig(tmp_path))
+        assert display_manager.get_panel_palette() is None
+
+        display_manager.display.palette = "spectra6"
+        assert display_manager.get_panel_palette() == "spectra6"
+
+    def test_named_palette_overrides_the_panel(self, tmp_path):
+        display_manager = DisplayManager(FakeConfig(tmp_path, panel_palette="waveshare_bw"))
+        display_manager.display.palette = "spectra6"
+
+        assert display_manager.get_panel_palette() == "waveshare_bw"
+
+    def test_none_and_unknown_palettes_disable_quantization(self, tmp_path):
+        display_manager = DisplayManager(FakeConfig(tmp_path, panel_palette="none"))
+        display_manager.display.palette = "spectra6"
+        assert display_manager.get_panel_palette() is None
+
+        display_manager.device_config.config["panel_palette"] = "cga"
+        assert display_manager.get_panel_palette() is None
+
+class TestRefreshSkipping:
+
+    def test_identical_frame_is_not_pushed_again(self, tmp_path):
+        display_manager = DisplayManager(FakeConfig(tmp_path))
+        pushes = count_pushes(display_manager)
+
+        assert display_manager.display_image(frame(10))
+        assert not display_manager.display_image(frame(10))
+        assert display_manager.display_image(frame(20))
+
+        assert len(pushes) == 2
+        assert display_manager.push_stats["skipped_identical"] == 1
+
+    def test_frame_hash_survives_a_restart(self, tmp_path):
+        config = FakeConfig(tmp_path)
+        DisplayManager(config).display_image(frame(10))
+
+        assert config.refresh_info.frame_hash
+        restored = RefreshInfo.from_dict(config.refresh_info.to_dict())
+        assert restored.frame_hash == config.refresh_info.frame_hash
+
+        config.refresh_info = restored
+        display_manager = DisplayManager(config)
+        pushes = count_pushes(display_manager)
+        assert not display_manager.display_image(frame(10))
+        assert not pushes
+        assert display_manager.push_stats["skipped_identical"] == 1
+
+    def test_change_below_threshold_is_not_pushed(self, tmp_path):
+        # 4800 pixels, 24 of them are 0.5%
+        display_manager = DisplayManager(FakeConfig(tmp_path, refresh_diff_threshold=0.01))
+        pushes = count_pushes(display_manager)
+
+        assert display_manager.display_image(frame(0))
+        assert not display_manager.display_image(frame(24))
+        assert display_manager.display_image(frame(96))
+
+        assert len(pushes) == 2
+        assert display_manager.push_stats["skipped_below_threshold"] == 1
+        assert display_manager.push_stats["skipped_identical"] == 0
+
+    def test_skipped_pushes_are_reported(self, tmp_path):
+        display_manager = DisplayManager(FakeConfig(tmp_path))
+        count_pushes(display_manager)
+        outcomes = []
+
+        display_manager.submit(frame(10), on_done=lambda outcome, error: outcomes.append(outcome))
+        display_manager.submit(frame(10), on_done=lambda outcome, error: outcomes.append(outcome))
+
+        assert outcomes == ["done", "skipped"]
+        assert display_manager.push_stats["pushes"] == 1
+
+class TestStats:
+
+    def test_stats_are_readable_during_a_push(self, tmp_path):
+        # a full refresh of the emulated epd7in5_V2 takes 4s, scaled to 1s
+        config = FakeConfig(tmp_path, display_type="virtual", virtual_model="epd7in5_V2", virtual_time_scale=0.25)
+        display_manager = DisplayManager(config)
+        display_manager.start()
+        try:
+            display_manager.submit(Image.new("RGB", (800, 480), "white"))
+            while not display_manager.display.is_busy():
+                time.sleep(0.01)
+
+            start = time.monotonic()
+            stats = display_manager.get_stats()
+            display_manager.submit(Image.new("RGB", (800, 480), "black"))
+            assert time.monotonic() - start < 0.5
+            assert stats["in_progress"]
+            assert stats["panel"]["refreshes"] == 0
+
+            assert display_manager.wait_until_idle(timeout=10)
+            assert display_manager.get_stats()["panel"]["refreshes"] == 2
+        finally:
+            display_manager.stop()
+
+class BlockingDisplay:
+    """Stub panel whose pushes block until released, recording the colour of each pushed frame."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.pushed = []
+        self.error = None
+
+    def display_image(self, image, image_settings=[]):
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        self.pushed.append(image.getpixel((0, 0)))
+
+    def get_stats(self):
+        return None
+
+def worker_manager(tmp_path):
+    display_manager = DisplayManager(FakeConfig(tmp_path))
+    display_manager.display = BlockingDisplay()
+    return display_manager
+
+class TestDisplayWorker:
+
+    def test_latest_submission_wins(self, tmp_path):
+        display_manager = worker_manager(tmp_path)
+        display = display_manager.display
+        display_manager.start()
+        outcomes = {}
+        try:
+            for color in ["red", "green", "blue"]:
+                display_manager.submit(Image.new("RGB", (80, 60), color),
+                                       on_done=lambda outcome, error, color=color: outcomes.update({color: outcome}))
+                if color == "red":
+                    assert display.started.wait(5)
+
+            assert outcomes == {"green": "superseded"}
+            display.release.set()
+            assert display_manager.wait_until_idle(timeout=5)
+        finally:
+            display_manager.stop()
+
+        assert display.pushed == [(255, 0, 0), (0, 0, 255)]
+        assert outcomes == {"red": "done", "green": "superseded", "blue": "done"}
+        stats = display_manager.get_stats()
+        assert stats["pushes"] == 2
+        assert stats["superseded"] == 1
+
+    def test_failed_push_is_reported(self, tmp_path):
+        display_manager = worker_manager(tmp_path)
+        display_manager.display.error = RuntimeError("busy pin timeout")
+        display_manager.display.release.set()
+        display_manager.start()
+        outcomes = []
+        try:
+            display_manager.submit(frame(10), on_done=lambda outcome, error: outcomes.append((outcome, error)))
+            assert display_manager.wait_until_idle(timeout=5)
+        finally:
+            display_manager.stop()
+
+        assert outcomes == [("failed", "busy pin timeout")]
+        stats = display_manager.get_stats()
+        assert stats["failed"] == 1
+        assert stats["last_push"]["error"] == "busy pin timeout"
+        # the frame was not shown, the next push of the same frame is not skipped
+        assert display_manager.last_frame_hash is None
+
+    def test_pushes_block_without_worker(self, tmp_path):
+        display_manager = worker_manager(tmp_path)
+        display_manager.display.release.set()
+        outcomes = []
+
+        display_manager.submit(frame(10), on_done=lambda outcome, error: outcomes.append(outcome))
+
+        assert outcomes == ["done"]
+        assert len(display_manager.display.pushed) == 1
+        assert display_manager.worker is None
+
+    def test_stop_waits_for_the_push_in_progress(self, tmp_path):
+        display_manager = worker_manager(tmp_path)
+        display = display_manager.display
+        display_manager.start()
+        display_manager.submit(frame(10))
+        assert display.started.wait(5)
+
+        threading.Timer(0.2, display.release.set).start()
+        display_manager.stop(timeout=5)
+
+        assert not display_manager.worker.is_alive()
+        assert len(display.pushed) == 1
+        # once stopped, submissions are pushed by the caller
+        display_manager.submit(frame(20))
+        assert len(display.pushed) == 2
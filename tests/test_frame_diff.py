@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.display.frame_diff import get_dirty_boxes, get_bounding_box, get_boxes_area
+
+def blank_frame(width=200, height=100):
+    return np.full((height, width), 255, dtype=np.uint8)
+
+class TestGetDirtyBoxes:
+
+    def test_unknown_previous_frame(self):
+        assert get_dirty_boxes(blank_frame(), None) is None
+        assert get_dirty_boxes(blank_frame(), blank_frame(100, 100)) is None
+
+    def test_unchanged_frame(self):
+        assert get_dirty_boxes(blank_frame(), blank_frame()) == []
+
+    def test_window_is_byte_aligned(self):
+        frame = blank_frame()
+        frame[10:20, 13:30] = 0
+
+        assert get_dirty_boxes(frame, blank_frame()) == [(8, 10, 32, 20)]
+
+    def test_distant_changes_get_their_own_windows(self):
+        frame = blank_frame()
+        frame[5:10, 0:16] = 0
+        frame[5:10, 150:160] = 0
+        frame[80:90, 40:48] = 0
+
+        assert get_dirty_boxes(frame, blank_frame()) == [(0, 5, 16, 10), (144, 5, 160, 10), (40, 80, 48, 90)]
+
+    def test_windows_stay_within_frame(self):
+        frame = blank_frame(width=202)
+        frame[0:2, 199:202] = 0
+
+        assert get_dirty_boxes(frame, blank_frame(width=202)) == [(192, 0, 202, 2)]
+
+    def test_too_many_windows_are_merged(self):
+        frame = blank_frame()
+        for row in range(0, 100, 20):
+            frame[row, 0] = 0
+
+        assert get_dirty_boxes(frame, blank_frame(), max_boxes=3) == [(0, 0, 8, 81)]
+
+    def test_rgb_frames(self):
+        previous = np.zeros((10, 16, 3), dtype=np.uint8)
+        frame = previous.copy()
+        frame[4, 9, 2] = 255
+
+        assert get_dirty_boxes(frame, previous) == [(8, 4, 16, 5)]
+
+class TestBoxHelpers:
+
+    def test_bounding_box(self):
+        assert get_bounding_box([(0, 5, 16, 10), (144, 5, 160, 10), (40, 80, 48, 90)]) == (0, 5, 160, 90)
+
+    def test_boxes_area(self):
+        assert get_boxes_area([(0, 0, 8, 10), (16, 0, 32, 2)]) == 112
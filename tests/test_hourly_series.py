@@ -0,0 +1,44 @@
+from datetime import datetime, timezone, timedelta
+
+import pytz
+
+from src.plugins.weather.hourly_series import HourlySeries, parse_local_times, parse_local_time
+
+TIMES = ["2024-05-01T00:00", "2024-05-01T01:00", "2024-05-01T02:00", "2024-05-01T03:00"]
+# 2024-05-01T00:00 at UTC+2
+START = datetime(2024, 4, 30, 22, tzinfo=timezone.utc).timestamp()
+
+class TestHourlySeries:
+
+    def test_parse_local_times(self):
+        epochs = parse_local_times(TIMES, 7200)
+
+        assert epochs[0] == START
+        assert list(epochs[1:] - epochs[:-1]) == [3600] * 3
+
+    def test_invalid_times(self):
+        assert len(parse_local_times(["yesterday"], 0)) == 0
+
+    def test_get_index(self):
+        hours = HourlySeries({"time": TIMES, "temperature_2m": [10, 11, 12]}, 7200)
+
+        assert hours.get_index(START - 1) is None
+        assert hours.get_index(START) == 0
+        assert hours.get_index(START + 2 * 3600 + 1800) == 2
+        assert hours.get_index(START + 4 * 3600) is None
+        assert hours.get_value("temperature_2m", 2) == 12
+        assert hours.get_value("temperature_2m", 3) is None
+        assert hours.get_value("uv_index", 0) is None
+
+    def test_get_datetime(self):
+        hours = HourlySeries.from_response({"utc_offset_seconds": 7200, "hourly": {"time": TIMES}})
+        tz = pytz.timezone("Europe/Berlin")
+
+        assert hours.get_datetime(1, tz).strftime("%H:%M") == "01:00"
+        assert parse_local_time("2024-05-01T06:30", 7200, tz).strftime("%H:%M") == "06:30"
+
+    def test_offset_falls_back_to_timezone(self):
+        tz = pytz.timezone("Europe/Berlin")
+        hours = HourlySeries.from_response({"hourly": {"time": TIMES}}, tz)
+
+        assert hours.utc_offset_seconds == datetime.now(tz).utcoffset() / timedelta(seconds=1)
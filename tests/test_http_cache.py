@@ -0,0 +1,156 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.http_cache import HttpCache
+from src.utils.http_client import HttpClient
+
+class Handler(BaseHTTPRequestHandler):
+    body = b"feed v1"
+    etag = '"v1"'
+    cache_control = None
+    status = 200
+    requests_seen = []
+
+    def do_GET(self):
+        Handler.requests_seen.append(dict(self.headers))
+        if Handler.status != 200:
+            self.send_response(Handler.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == Handler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", Handler.etag)
+        if Handler.cache_control:
+            self.send_header("Cache-Control", Handler.cache_control)
+        self.send_header("Content-Length", str(len(Handler.body)))
+        self.end_headers()
+        self.wfile.write(Handler.body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.body, Handler.etag, Handler.cache_control, Handler.status = b"feed v1", '"v1"', None, 200
+    Handler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/feed"
+    server.shutdown()
+
+@pytest.fixture
+def client(tmp_path):
+    return HttpClient(retries=0, cache=HttpCache(str(tmp_path)), dedup_window=0)
+
+class TestHttpCache:
+
+    def test_fresh_entry_skips_the_origin(self, server, client):
+        Handler.cache_control = "max-age=60"
+
+        first = client.get(server)
+        second = client.get(server)
+
+        assert second.content == first.content == b"feed v1"
+        assert second.from_cache
+        assert len(Handler.requests_seen) == 1
+        assert client.cache.get_stats()["fresh_hits"] == 1
+
+    def test_stale_entry_is_revalidated(self, server, client):
+        client.get(server)
+        response = client.get(server)
+
+        assert Handler.requests_seen[1]["If-None-Match"] == '"v1"'
+        assert response.status_code == 200
+        assert response.content == b"feed v1"
+        assert response.from_cache
+        assert client.cache.get_stats()["revalidated"] == 1
+
+    def test_changed_resource_replaces_entry(self, server, client):
+        client.get(server)
+        Handler.body, Handler.etag = b"feed v2", '"v2"'
+
+        response = client.get(server)
+
+        assert response.content == b"feed v2"
+        assert not response.from_cache
+        assert client.get(server).content == b"feed v2"
+
+    def test_ttl_override(self, server, client):
+        client.get(server)
+        response = client.get(server, cache_ttl=60)
+
+        assert response.from_cache
+        assert len(Handler.requests_seen) == 1
+
+    def test_stale_if_error(self, server, client):
+        client.get(server)
+        Handler.status = 503
+
+        response = client.get(server)
+
+        assert response.status_code == 200
+        assert response.content == b"feed v1"
+        assert client.cache.get_stats()["stale_served"] == 1
+
+    def test_no_stale_beyond_stale_if_error(self, server, tmp_path):
+        client = HttpClient(retries=0, cache=HttpCache(str(tmp_path), stale_if_error=0), dedup_window=0)
+        client.get(server)
+        Handler.status = 503
+
+        assert client.get(server).status_code == 503
+
+    def test_no_store(self, server, client):
+        Handler.cache_control = "no-store"
+        client.get(server)
+
+        assert client.cache.get_stats()["disk_entries"] == 0
+
+    def test_parse_result_reused_while_unchanged(self, server, client):
+        calls = []
+        def parse(response):
+            calls.append(response.content)
+            return response.content.decode()
+
+        assert client.get_parsed(server, parse) == "feed v1"
+        assert client.get_parsed(server, parse) == "feed v1"
+        Handler.body, Handler.etag = b"feed v2", '"v2"'
+        assert client.get_parsed(server, parse) == "feed v2"
+
+        assert calls == [b"feed v1", b"feed v2"]
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = HttpCache(str(tmp_path), max_disk_bytes=1500)
+        for i in range(3):
+            response = requests.Response()
+            response.status_code = 200
+            response.url = f"http://example.com/{i}"
+            response._content = b"x" * 500
+            cache.put(cache.get_key(response.url), response)
+
+        assert cache.get(cache.get_key("http://example.com/0")) is None
+        assert cache.get(cache.get_key("http://example.com/2")) is not None
+        assert cache.get_stats()["evictions"] >= 1
+
+        reloaded = HttpCache(str(tmp_path), max_disk_bytes=1500)
+        assert reloaded.disk_bytes == cache.disk_bytes
+
+    def test_lifetime_from_headers(self, tmp_path):
+        cache = HttpCache(str(tmp_path))
+        now = time.time()
+        meta = {"headers": {"Cache-Control": "public, max-age=300"}, "stored_at": now}
+        assert cache.get_lifetime(meta) == 300
+        assert cache.get_lifetime(meta, ttl=10) == 10
+
+        meta["headers"] = {"Cache-Control": "no-cache, max-age=300"}
+        assert cache.get_lifetime(meta) == 0
+
+        meta["headers"] = {"Date": "Mon, 01 Jan 2024 00:00:00 GMT", "Expires": "Mon, 01 Jan 2024 01:00:00 GMT"}
+        assert cache.get_lifetime(meta) == 3600
@@ -0,0 +1,124 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.http_client import HttpClient
+
+class Handler(BaseHTTPRequestHandler):
+    # statuses returned by the next requests, 200 once exhausted
+    statuses = []
+    delay = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Handler.lock:
+            Handler.in_flight += 1
+            Handler.max_in_flight = max(Handler.max_in_flight, Handler.in_flight)
+            status = Handler.statuses.pop(0) if Handler.statuses else 200
+        time.sleep(Handler.delay)
+        with Handler.lock:
+            Handler.in_flight -= 1
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.statuses, Handler.delay, Handler.max_in_flight = [], 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+class TestHttpClient:
+
+    def test_retries_error_statuses(self, server):
+        Handler.statuses = [503, 502]
+        client = HttpClient(backoff=0)
+
+        response = client.get(server)
+
+        assert response.status_code == 200
+        stats = client.get_stats()[server[len("http://"):]]
+        assert stats["requests"] == 3
+        assert stats["retries"] == 2
+        assert stats["errors"] == 2
+
+    def test_gives_up_after_retries(self, server):
+        Handler.statuses = [503, 503, 503]
+        client = HttpClient(retries=1, backoff=0)
+
+        assert client.get(server).status_code == 503
+
+    def test_post_is_not_retried(self, server):
+        Handler.statuses = [503]
+        client = HttpClient(backoff=0)
+
+        assert client.post(server).status_code == 503
+
+    def test_read_timeout(self, server):
+        Handler.delay = 0.5
+        client = HttpClient(timeout=(1, 0.1), retries=0)
+
+        with pytest.raises(requests.exceptions.Timeout):
+            client.get(server)
+
+    def test_per_host_limit(self, server):
+        Handler.delay = 0.1
+        client = HttpClient(max_per_host=2)
+
+        threads = [threading.Thread(target=client.get, args=(server,), kwargs={"coalesce": False}) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert Handler.max_in_flight == 2
+
+    def test_identical_requests_share_one_round_trip(self, server):
+        Handler.delay = 0.1
+        client = HttpClient()
+        responses = []
+
+        threads = [threading.Thread(target=lambda: responses.append(client.get(server, params={"b": 2, "a": 1})))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        responses.append(client.get(server + "?a=1&b=2"))
+
+        assert all(response.content == b"ok" for response in responses)
+        stats = client.get_dedup_stats()["requests"]
+        assert stats["executions"] == 1
+        assert stats["dedup_hits"] == 4
+        assert client.get_stats()[server[len("http://"):]]["requests"] == 1
+
+    def test_dedup_window(self, server):
+        client = HttpClient(dedup_window=0)
+
+        client.get(server)
+        client.get(server)
+        client.post(server)
+        client.post(server)
+
+        assert client.get_stats()[server[len("http://"):]]["requests"] == 4
+        assert client.get_dedup_stats()["requests"]["dedup_hits"] == 0
+
+    def test_retry_after_header_is_capped(self):
+        client = HttpClient()
+
+        assert client._get_backoff(0, "3") == 3
+        assert client._get_backoff(0, "600") == 10
+        assert 0 <= client._get_backoff(5) <= 10
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+from src.plugins.calendar.ics_cache import IcsCache
+
+ICS = b"""BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//test//EN
+BEGIN:VEVENT
+UID:standup
+DTSTART:20240501T090000
+DTEND:20240501T091500
+RRULE:FREQ=DAILY
+SUMMARY:Standup
+END:VEVENT
+BEGIN:VEVENT
+UID:offsite
+DTSTART;VALUE=DATE:20240503
+DTEND;VALUE=DATE:20240505
+SUMMARY:Offsite
+END:VEVENT
+END:VCALENDAR
+"""
+
+def make_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    return response
+
+def parse_event(event):
+    start, end = event.decoded("dtstart"), event.decoded("dtend")
+    return {"title": str(event.get("summary")), "start": start.isoformat(), "end": end.isoformat()}
+
+def titles(events):
+    return sorted((event["title"], event["start"][:10]) for event in events)
+
+class TestIcsCache:
+
+    def test_expands_occurrences(self):
+        cache = IcsCache()
+
+        events = cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 4), parse_event)
+
+        assert titles(events) == [("Offsite", "2024-05-03"), ("Standup", "2024-05-01"),
+                                  ("Standup", "2024-05-02"), ("Standup", "2024-05-03")]
+
+    def test_unchanged_feed_is_not_parsed_or_expanded_again(self):
+        cache = IcsCache()
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 8), parse_event)
+
+        events = cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 8), parse_event)
+
+        assert len(events) == 8
+        assert cache.get_stats()["parses"] == 1
+        assert cache.get_stats()["expansions"] == 1
+        assert cache.get_stats()["hits"] == 1
+
+    def test_failed_expansion_is_not_cached(self):
+        cache = IcsCache()
+        calls = []
+
+        def failing_once(event):
+            calls.append(event)
+            if len(calls) == 1:
+                raise ValueError("Unsupported event")
+            return parse_event(event)
+
+        with pytest.raises(ValueError):
+            cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 4), failing_once)
+        events = cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 4), failing_once)
+
+        assert len(events) == 4
+        assert cache.get_stats()["hits"] == 0
+        assert cache.get_stats()["expansions"] == 1
+
+    def test_sliding_window_expands_new_days_only(self):
+        cache = IcsCache()
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 8), parse_event)
+
+        events = cache.get_events("feed", make_response(ICS), datetime(2024, 5, 2), datetime(2024, 5, 9), parse_event)
+
+        assert cache.get_stats()["expanded_days"] == 8
+        # the multi-day event spans two cached days but is listed once
+        assert titles(events).count(("Offsite", "2024-05-03")) == 1
+        assert ("Standup", "2024-05-08") in titles(events)
+
+    def test_changed_feed_is_parsed_again(self):
+        cache = IcsCache()
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 2), parse_event)
+
+        changed = ICS.replace(b"SUMMARY:Standup", b"SUMMARY:Daily")
+        events = cache.get_events("feed", make_response(changed), datetime(2024, 5, 1), datetime(2024, 5, 2), parse_event)
+
+        assert titles(events) == [("Daily", "2024-05-01")]
+        assert cache.get_stats()["parses"] == 2
+
+    def test_keeps_limited_days(self):
+        cache = IcsCache(max_days=10)
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 8), parse_event)
+        cache.get_events("feed", make_response(ICS), datetime(2024, 6, 1), datetime(2024, 6, 8), parse_event)
+
+        assert len(cache.feeds[("feed", "")]["days"]) == 10
+
+    def test_cached_events_of_last_parsed_feed(self):
+        cache = IcsCache()
+        assert cache.get_cached_events("feed", datetime(2024, 5, 1), datetime(2024, 5, 2), parse_event) is None
+
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 2), parse_event)
+        events = cache.get_cached_events("feed", datetime(2024, 5, 2), datetime(2024, 5, 3), parse_event)
+
+        assert titles(events) == [("Standup", "2024-05-02")]
+
+    def test_cached_events_while_feed_is_busy(self):
+        cache = IcsCache()
+        cache.get_events("feed", make_response(ICS), datetime(2024, 5, 1), datetime(2024, 5, 8), parse_event)
+
+        with cache.feed_locks[("feed", "")]:
+            events = cache.get_cached_events("feed", datetime(2024, 5, 4), datetime(2024, 5, 6), parse_event)
+
+        assert titles(events) == [("Offsite", "2024-05-03"), ("Standup", "2024-05-04"), ("Standup", "2024-05-05")]
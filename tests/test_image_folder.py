@@ -0,0 +1,44 @@
+import copy
+import os
+
+from PIL import Image
+
+from plugins.image_folder import image_folder
+from plugins.image_folder.image_folder import ImageFolder
+
+class FakeConfig:
+    def get_resolution(self):
+        return (40, 30)
+
+    def get_config(self, key=None, default=None):
+        return default
+
+def make_folder(tmp_path, count):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for i in range(count):
+        Image.new("RGB", (8, 6), (i * 40, 0, 0)).save(folder / f"{i}.png")
+    return folder
+
+class TestShuffle:
+
+    def test_instances_of_a_folder_keep_their_own_order(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(image_folder, "get_cache_dir", lambda name: str(tmp_path))
+        folder = make_folder(tmp_path, 3)
+        plugin = ImageFolder({"id": "image_folder"})
+        selected = []
+        monkeypatch.setattr(image_folder, "load_image",
+                            lambda path, dimensions, **kwargs: selected.append(os.path.basename(path)) or Image.new("RGB", dimensions))
+
+        instances = {name: {"folder_path": str(folder), "shuffle": "true"} for name in ["often", "rarely"]}
+        shown = {"often": [], "rarely": []}
+        for name in ["often", "often", "rarely", "often", "often", "rarely", "often", "often", "rarely"]:
+            # the refresh task renders a copy of the settings and writes the rendered settings back
+            settings = copy.deepcopy(instances[name])
+            plugin.generate_image(settings, FakeConfig())
+            instances[name] = settings
+            shown[name].append(selected[-1])
+
+        assert instances["often"]["shuffle_id"] != instances["rarely"]["shuffle_id"]
+        assert sorted(shown["rarely"]) == ["0.png", "1.png", "2.png"]
+        assert sorted(shown["often"][:3]) == sorted(shown["often"][3:]) == ["0.png", "1.png", "2.png"]
@@ -0,0 +1,115 @@
+import os
+import time
+
+from src.plugins.image_folder import image_index
+from src.plugins.image_folder.image_index import ImageIndex
+
+def make_folder(tmp_path, files):
+    folder = tmp_path / "photos"
+    for name in files:
+        path = folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return folder
+
+def age_dirs(folder):
+    """Moves the mtimes of all directories back so the next scan can trust them."""
+    past = time.time() - 60
+    for root, dirs, files in os.walk(folder):
+        os.utime(root, (past, past))
+
+class TestImageIndex:
+
+    def test_indexes_images_only(self, tmp_path):
+        folder = make_folder(tmp_path, ["a.jpg", "b.PNG", "notes.txt", ".hidden.jpg", "2024/c.jpeg"])
+        index = ImageIndex(str(folder))
+        index.refresh()
+
+        assert sorted(index.files) == ["2024/c.jpeg", "a.jpg", "b.PNG"]
+        assert index.get_random().startswith(str(folder))
+
+    def test_unchanged_directories_are_not_listed_again(self, tmp_path):
+        folder = make_folder(tmp_path, ["a.jpg", "2023/b.jpg", "2024/c.jpg"])
+        age_dirs(folder)
+        index = ImageIndex(str(folder))
+        index.refresh()
+
+        (folder / "2024" / "d.jpg").write_bytes(b"")
+        os.remove(folder / "2023" / "b.jpg")
+        assert index.refresh(force=True)
+
+        assert sorted(index.files) == ["2024/c.jpg", "2024/d.jpg", "a.jpg"]
+        assert index.get_stats()["listed_dirs"] == 3 + 2
+
+    def test_persisted_index_is_reused(self, tmp_path):
+        folder = make_folder(tmp_path, ["a.jpg", "2024/b.jpg"])
+        age_dirs(folder)
+        ImageIndex(str(folder), str(tmp_path)).refresh()
+
+        index = ImageIndex(str(folder), str(tmp_path))
+        assert sorted(index.files) == ["2024/b.jpg", "a.jpg"]
+        assert not index.refresh(force=True)
+        assert index.get_stats()["listed_dirs"] == 0
+
+    def test_shuffle_shows_every_image_once_per_cycle(self, tmp_path):
+        folder = make_folder(tmp_path, [f"{i}.jpg" for i in range(5)])
+        index = ImageIndex(str(folder), str(tmp_path))
+        index.refresh()
+
+        cursor, shown = 0, []
+        for _ in range(10):
+            path, cursor = index.get_next(cursor)
+            shown.append(os.path.basename(path))
+
+        assert sorted(shown[:5]) == sorted(shown[5:]) == [f"{i}.jpg" for i in range(5)]
+        assert shown[4] != shown[5]
+        # the order survives a restart
+        assert ImageIndex(str(folder), str(tmp_path)).orders == index.orders
+
+    def test_shuffle_orders_are_kept_per_caller(self, tmp_path):
+        folder = make_folder(tmp_path, [f"{i}.jpg" for i in range(3)])
+        index = ImageIndex(str(folder))
+        index.refresh()
+
+        # the first caller wraps around twice while the second walks its first cycle
+        cursors, shown = {"first": 0, "second": 0}, {"first": [], "second": []}
+        for order_id in ["first", "first", "second", "first", "first", "second", "first", "first", "second"]:
+            path, cursors[order_id] = index.get_next(cursors[order_id], order_id)
+            shown[order_id].append(os.path.basename(path))
+
+        assert sorted(shown["second"]) == ["0.jpg", "1.jpg", "2.jpg"]
+        for cycle in range(2):
+            assert sorted(shown["first"][cycle * 3:cycle * 3 + 3]) == ["0.jpg", "1.jpg", "2.jpg"]
+
+    def test_least_recently_used_orders_are_dropped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(image_index, "MAX_SHUFFLE_ORDERS", 2)
+        folder = make_folder(tmp_path, ["a.jpg", "b.jpg"])
+        index = ImageIndex(str(folder))
+        index.refresh()
+
+        cursors = {order_id: index.get_next(0, order_id)[1] for order_id in ["first", "second"]}
+        index.get_next(cursors["first"], "first")
+        index.get_next(0, "third")
+
+        assert list(index.orders) == ["first", "third"]
+
+    def test_shuffle_cursor_survives_changes(self, tmp_path):
+        folder = make_folder(tmp_path, ["a.jpg", "b.jpg", "c.jpg"])
+        age_dirs(folder)
+        index = ImageIndex(str(folder))
+        index.refresh()
+
+        first, cursor = index.get_next(0)
+        remaining = {"a.jpg", "b.jpg", "c.jpg"} - {os.path.basename(first)}
+        removed = sorted(remaining)[0]
+        os.remove(folder / removed)
+        (folder / "d.jpg").write_bytes(b"")
+        index.refresh(force=True)
+
+        shown = []
+        for _ in range(3):
+            path, cursor = index.get_next(cursor)
+            shown.append(os.path.basename(path))
+
+        assert sorted(shown[:2]) == sorted((remaining - {removed}) | {"d.jpg"})
+        assert removed not in shown
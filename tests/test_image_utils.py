@@ -0,0 +1,239 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from utils import image_utils
+from utils.image_utils import quantize_image, load_image, download_image, prepare_display_image, change_orientation, resize_image, \
+    get_enhancement_lut, clear_enhancement_luts, PANEL_PALETTES, DITHER_MODES, EXIF_ORIENTATION
+
+def gradient(size=(64, 48)):
+    """A frame with every hue and grey level, so every palette colour gets used."""
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    y = np.linspace(0, 255, height, dtype=np.uint8)
+    pixels = np.stack([np.tile(x, (height, 1)), np.tile(y[:, None], (1, width)),
+                       np.tile(x[::-1], (height, 1))], axis=-1)
+    return Image.fromarray(pixels, "RGB")
+
+def waves(size):
+    """Smooth but steep patterns, a crop off by one pixel changes them by several levels."""
+    width, height = size
+    x, y = np.arange(width)[np.newaxis, :], np.arange(height)[:, np.newaxis]
+    pixels = np.stack([np.broadcast_to(128 + 100 * np.sin(x / 9), (height, width)),
+                       np.broadcast_to(128 + 100 * np.sin(y / 7), (height, width)),
+                       128 + 100 * np.sin((x + 2 * y) / 11)], axis=-1)
+    return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+def max_difference(image, other):
+    assert image.size == other.size
+    return int(np.abs(np.asarray(image, dtype=np.int16) - np.asarray(other, dtype=np.int16)).max())
+
+class TestQuantizeImage:
+
+    @pytest.mark.parametrize("palette_name", sorted(PANEL_PALETTES))
+    @pytest.mark.parametrize("dither_mode", DITHER_MODES)
+    def test_indices_are_driver_indices(self, palette_name, dither_mode):
+        quantized = quantize_image(gradient(), palette_name, dither_mode)
+
+        assert quantized.mode == "P"
+        assert quantized.size == (64, 48)
+        assert set(np.unique(np.asarray(quantized))) <= set(PANEL_PALETTES[palette_name])
+
+    def test_pure_palette_colours_map_exactly(self):
+        colors = PANEL_PALETTES["spectra6"]
+        frame = Image.new("RGB", (len(colors), 1))
+        for x, color in enumerate(colors.values()):
+            frame.putpixel((x, 0), color)
+
+        quantized = quantize_image(frame, "spectra6", "none")
+
+        assert list(np.asarray(quantized)[0]) == list(colors)
+
+    def test_cached_by_frame_palette_and_dither_mode(self):
+        frame = gradient()
+
+        first = quantize_image(frame, "waveshare_7colour")
+        assert quantize_image(frame.copy(), "waveshare_7colour") is first
+        assert quantize_image(frame, "waveshare_7colour", "ordered") is not first
+        assert quantize_image(frame, "spectra6") is not first
+
+    def test_unknown_palette_or_dither_mode(self):
+        with pytest.raises(ValueError):
+            quantize_image(gradient(), "cga")
+        with pytest.raises(ValueError):
+            quantize_image(gradient(), "spectra6", "atkinson")
+
+def encode(image, image_format, **params):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+class TestLoadImage:
+
+    def test_jpeg_is_decoded_at_a_reduced_scale(self):
+        data = encode(gradient((1600, 1200)), "JPEG")
+
+        img = load_image(data, (200, 150))
+
+        assert img.size == (400, 300)
+
+    def test_png_is_reduced_to_at_least_twice_the_target(self):
+        data = encode(gradient((1000, 800)), "PNG")
+
+        img = load_image(data, (100, 80))
+
+        assert img.size == (200, 160)
+        assert load_image(data).size == (1000, 800)
+
+    def test_small_images_are_not_reduced(self):
+        data = encode(gradient((300, 200)), "PNG")
+
+        assert load_image(data, (200, 150)).size == (300, 200)
+
+    def test_pixel_budget(self, monkeypatch):
+        monkeypatch.setattr(image_utils, "_max_image_pixels", 100 * 100)
+        load_image(encode(gradient((100, 100)), "PNG"))
+
+        with pytest.raises(ValueError):
+            load_image(encode(gradient((101, 100)), "PNG"))
+        with pytest.raises(ValueError):
+            load_image(encode(gradient((1600, 1200)), "JPEG"), (200, 150))
+
+    def test_exif_rotation_swaps_the_target(self):
+        # stored landscape, shown portrait after rotating by 90 degrees
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        data = encode(gradient((1600, 800)), "JPEG", exif=exif)
+
+        img = load_image(data, (100, 200), exif_transpose=True)
+
+        assert img.size == (200, 400)
+
+class FakeResponse:
+    """Streams the body in chunks and counts how many of them were read."""
+
+    def __init__(self, body, chunk_size=1000, headers=None):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.headers = headers or {}
+        self.chunks_read = 0
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.chunks:
+            self.chunks_read += 1
+            yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, stream=False, timeout=None, **kwargs):
+        assert stream
+        return self.response
+
+def noise(size):
+    return Image.fromarray(np.random.default_rng(0).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8), "RGB")
+
+class TestDownloadImage:
+
+    def test_decodes_reduced_image(self):
+        response = FakeResponse(encode(gradient((1000, 800)), "PNG"))
+
+        img = download_image("http://example.com/photo.png", (100, 80), session=FakeSession(response))
+
+        assert img.size == (200, 160)
+        assert response.chunks_read == len(response.chunks)
+        assert response.closed
+
+    def test_aborts_on_content_length(self, monkeypatch):
+        monkeypatch.setattr(image_utils, "_max_download_bytes", 10_000)
+        response = FakeResponse(b"x" * 20_000, headers={"Content-Length": "20000"})
+
+        with pytest.raises(ValueError):
+            download_image("http://example.com/photo.png", session=FakeSession(response))
+        assert response.chunks_read == 0
+
+    def test_aborts_once_the_limit_is_received(self, monkeypatch):
+        monkeypatch.setattr(image_utils, "_max_download_bytes", 10_000)
+        # no Content-Length, e.g. a chunked response
+        response = FakeResponse(encode(noise((200, 200)), "PNG"))
+
+        with pytest.raises(ValueError):
+            download_image("http://example.com/photo.png", session=FakeSession(response))
+        assert response.chunks_read == 11 < len(response.chunks)
+
+    def test_aborts_on_pixel_budget_in_header(self, monkeypatch):
+        monkeypatch.setattr(image_utils, "_max_image_pixels", 100 * 100)
+        response = FakeResponse(encode(noise((200, 200)), "PNG"))
+
+        with pytest.raises(ValueError):
+            download_image("http://example.com/photo.png", session=FakeSession(response))
+        assert response.chunks_read == 1 < len(response.chunks)
+
+class TestPrepareDisplayImage:
+
+    @pytest.mark.parametrize("source_size", [(300, 280), (640, 300), (200, 400)])
+    @pytest.mark.parametrize("orientation", ["horizontal", "vertical"])
+    @pytest.mark.parametrize("inverted", [False, True])
+    def test_matches_step_by_step_pipeline(self, source_size, orientation, inverted):
+        image = waves(source_size)
+
+        expected = resize_image(change_orientation(image, orientation), (160, 100))
+        if inverted:
+            expected = expected.rotate(180)
+
+        assert max_difference(prepare_display_image(image, (160, 100), orientation, inverted), expected) <= 2
+
+    def test_keep_width(self):
+        image = waves((200, 400))
+
+        expected = resize_image(image, (160, 100), ["keep-width"])
+
+        assert max_difference(prepare_display_image(image, (160, 100), image_settings=["keep-width"]), expected) <= 2
+
+def enhance_step_by_step(image, enhancement_settings):
+    """The PIL ImageEnhance chain apply_image_enhancement replaces."""
+    image = ImageEnhance.Brightness(image).enhance(enhancement_settings.get("brightness", 1.0))
+    image = ImageEnhance.Contrast(image).enhance(enhancement_settings.get("contrast", 1.0))
+    image = ImageEnhance.Color(image).enhance(enhancement_settings.get("saturation", 1.0))
+    return ImageEnhance.Sharpness(image).enhance(enhancement_settings.get("sharpness", 1.0))
+
+class TestImageEnhancement:
+
+    @pytest.mark.parametrize("orientation", ["horizontal", "vertical"])
+    @pytest.mark.parametrize("enhancement_settings", [
+        {"brightness": 1.1, "contrast": 1.3, "saturation": 1.4, "sharpness": 1.6},
+        {"brightness": 0.8, "contrast": 0.7, "saturation": 0.5, "sharpness": 0.5},
+        {"contrast": 1.5},
+    ])
+    def test_matches_image_enhance_chain(self, orientation, enhancement_settings):
+        image = waves((300, 280))
+        image.paste((250, 20, 20), (60, 60, 160, 140))
+
+        fused = prepare_display_image(image, (160, 100), orientation, enhancement_settings=enhancement_settings)
+        expected = enhance_step_by_step(prepare_display_image(image, (160, 100), orientation), enhancement_settings)
+
+        assert max_difference(fused, expected) <= 2
+
+    def test_lookup_tables_are_cached_until_cleared(self):
+        clear_enhancement_luts()
+        enhancement_settings = {"brightness": 1.2, "contrast": 1.1, "saturation": 0.9}
+
+        prepare_display_image(waves((300, 280)), (160, 100), enhancement_settings=enhancement_settings)
+        prepare_display_image(waves((300, 280)), (160, 100), enhancement_settings=enhancement_settings)
+        assert get_enhancement_lut.cache_info().currsize == 1
+        assert get_enhancement_lut.cache_info().hits == 1
+
+        clear_enhancement_luts()
+        assert get_enhancement_lut.cache_info().currsize == 0
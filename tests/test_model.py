@@ -1,6 +1,8 @@
 import pytest
+import pytz
+from datetime import datetime, timezone
 
-from src.model import Playlist
+from src.model import Playlist, PluginInstance
 
 class TestPlaylist:
 
@@ -49,4 +51,90 @@ class TestPlaylist:
         playlist = Playlist("Test Playlist", start, end)
         assert playlist.is_active(current) == expected
         assert playlist.get_priority() == priority
-        
\ No newline at end of file
+        
+    @pytest.mark.parametrize(
+        "start,end,current,expected",
+        [
+            ("09:00", "15:00", "08:00", "2025-01-01T09:00"),  # before start
+            ("09:00", "15:00", "09:00", "2025-01-01T15:00"),  # exactly at start
+            ("09:00", "15:00", "16:00", "2025-01-02T09:00"),  # after end, next day
+            ("21:00", "03:00", "23:00", "2025-01-02T03:00"),  # wrapping, before midnight
+            ("21:00", "03:00", "02:00", "2025-01-01T03:00"),  # wrapping, after midnight
+            ("18:00", "24:00", "19:00", "2025-01-02T00:00"),  # ends at midnight
+            ("12:00", "12:00", "10:00", None),                # never active
+            ("00:00", "24:00", "10:00", None),                # always active
+        ]
+    )
+    def test_get_next_transition_dt(self, start, end, current, expected):
+        playlist = Playlist("Test Playlist", start, end)
+        current_dt = datetime.fromisoformat(f"2025-01-01T{current}").replace(tzinfo=timezone.utc)
+        next_dt = playlist.get_next_transition_dt(current_dt)
+        if expected is None:
+            assert next_dt is None
+        else:
+            assert next_dt == datetime.fromisoformat(expected).replace(tzinfo=timezone.utc)
+
+    @pytest.mark.parametrize(
+        "current,expected",
+        [
+            ("2025-03-29T23:00", "2025-03-30T09:00"),  # DST starts overnight
+            ("2025-10-25T23:00", "2025-10-26T09:00"),  # DST ends overnight
+        ]
+    )
+    def test_get_next_transition_dt_across_dst(self, current, expected):
+        tz = pytz.timezone("Europe/Berlin")
+        playlist = Playlist("Test Playlist", "09:00", "15:00")
+        next_dt = playlist.get_next_transition_dt(tz.localize(datetime.fromisoformat(current)))
+
+        assert next_dt == tz.localize(datetime.fromisoformat(expected))
+        assert next_dt.strftime("%H:%M") == "09:00"
+
+    def test_peek_next_plugin_does_not_advance(self):
+        playlist = Playlist("Test Playlist", "00:00", "24:00", plugins=[
+            {"plugin_id": "clock", "name": "First", "plugin_settings": {}, "refresh": {}},
+            {"plugin_id": "clock", "name": "Second", "plugin_settings": {}, "refresh": {}},
+        ])
+
+        assert playlist.peek_next_plugin().name == "First"
+        assert playlist.get_next_plugin().name == "First"
+        assert playlist.peek_next_plugin().name == "Second"
+        assert playlist.peek_next_plugin().name == "Second"
+        assert playlist.get_next_plugin().name == "Second"
+        assert playlist.peek_next_plugin().name == "First"
+
+    def test_peek_next_plugin_empty(self):
+        assert Playlist("Test Playlist", "00:00", "24:00").peek_next_plugin() is None
+
+class TestPluginInstance:
+
+    @pytest.mark.parametrize(
+        "refresh,latest,expected",
+        [
+            ({"interval": 600}, None, "2025-01-01T12:00"),                        # never refreshed
+            ({"interval": 600}, "2025-01-01T11:55", "2025-01-01T12:05"),
+            ({"scheduled": "14:30"}, "2025-01-01T11:55", "2025-01-01T14:30"),
+            ({"scheduled": "08:00"}, "2025-01-01T11:55", "2025-01-02T08:00"),   # next day
+            ({"scheduled": "11:55"}, "2025-01-01T11:55", "2025-01-02T11:55"),   # just refreshed
+            ({}, "2025-01-01T11:55", None),
+        ]
+    )
+    def test_get_next_refresh_dt(self, refresh, latest, expected):
+        latest_refresh_time = f"{latest}:00+00:00" if latest else None
+        plugin_instance = PluginInstance("clock", "Clock", {}, refresh, latest_refresh_time)
+        current_dt = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+        next_dt = plugin_instance.get_next_refresh_dt(current_dt)
+        if expected is None:
+            assert next_dt is None
+        else:
+            assert next_dt == datetime.fromisoformat(expected).replace(tzinfo=timezone.utc)
+
+    def test_get_next_refresh_dt_across_dst(self):
+        tz = pytz.timezone("Europe/Berlin")
+        # refreshed on the evening before DST starts, stored with the winter offset
+        plugin_instance = PluginInstance("clock", "Clock", {}, {"scheduled": "08:00"}, "2025-03-29T20:00:00+01:00")
+        current_dt = tz.localize(datetime(2025, 3, 29, 22, 0))
+
+        next_dt = plugin_instance.get_next_refresh_dt(current_dt)
+
+        assert next_dt == tz.localize(datetime(2025, 3, 30, 8, 0))
+        assert next_dt.utcoffset().total_seconds() == 2 * 3600
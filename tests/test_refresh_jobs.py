@@ -0,0 +1,50 @@
+from src.refresh_jobs import RefreshJob, RefreshJobRegistry, report_stage, set_current_job
+
+class DummyAction:
+    def get_plugin_id(self):
+        return "clock"
+
+class TestRefreshJobs:
+
+    def test_job_records_stages_in_order(self):
+        registry = RefreshJobRegistry()
+        job = registry.create(DummyAction())
+
+        job.set_stage(RefreshJob.FETCHING)
+        job.set_stage(RefreshJob.RENDERING)
+        job.finish("Display updated")
+
+        job_dict = job.to_dict()
+        assert [stage["stage"] for stage in job_dict["stages"]] == ["queued", "fetching", "rendering", "done"]
+        assert job_dict["message"] == "Display updated"
+        assert job.wait(timeout=0)
+
+    def test_finished_job_ignores_later_stages(self):
+        job = RefreshJobRegistry().create(DummyAction())
+        job.fail(ValueError("boom"))
+        job.set_stage(RefreshJob.DISPLAYING)
+
+        assert job.stage == RefreshJob.FAILED
+        assert job.error == "boom"
+
+    def test_report_stage_updates_current_job(self):
+        job = RefreshJobRegistry().create(DummyAction())
+        set_current_job(job)
+        try:
+            report_stage(RefreshJob.RENDERING)
+        finally:
+            set_current_job(None)
+        report_stage(RefreshJob.HASHING)
+
+        assert job.stage == RefreshJob.RENDERING
+
+    def test_registry_prunes_finished_jobs(self):
+        registry = RefreshJobRegistry(max_finished_jobs=2)
+        jobs = [registry.create(DummyAction()) for _ in range(3)]
+        for job in jobs:
+            job.finish()
+        pending = registry.create(DummyAction())
+
+        assert registry.get(jobs[0].job_id) is None
+        assert registry.get(jobs[2].job_id) is jobs[2]
+        assert registry.get(pending.job_id) is pending
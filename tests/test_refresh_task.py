@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytz
+from PIL import Image
+
+import refresh_task
+from model import Playlist
+from refresh_task import RefreshTask, PlaylistRefresh
+
+class FakeConfig:
+    def __init__(self, plugin_image_dir):
+        self.config = {"timezone": "UTC"}
+        self.plugin_image_dir = plugin_image_dir
+
+    def get_config(self, key=None, default=None):
+        if key is None:
+            return self.config
+        return self.config.get(key, default)
+
+    def get_plugin(self, plugin_id):
+        return {"id": plugin_id}
+
+class SlideshowPlugin:
+    """Advances a cursor in its settings on every render, like image_upload."""
+
+    config = {}
+
+    def generate_image(self, settings, device_config):
+        settings["image_index"] = settings.get("image_index", 0) + 1
+        return Image.new("RGB", (40, 30))
+
+class FakePlaylistManager:
+    def __init__(self, playlist):
+        self.playlist = playlist
+
+    def determine_active_playlist(self, current_dt):
+        return self.playlist
+
+class TestPrerender:
+
+    def prerender_cycle(self, task, playlist, cycle_dt):
+        plugin_instance = playlist.peek_next_plugin()
+        task._start_prerender(FakePlaylistManager(playlist), cycle_dt)
+        prerendered = task._take_prerendered(playlist, plugin_instance)
+        assert prerendered is not None
+
+        playlist.get_next_plugin()
+        PlaylistRefresh(playlist, plugin_instance, prerendered=prerendered).execute(
+            SlideshowPlugin(), task.device_config, cycle_dt)
+        return plugin_instance
+
+    def test_settings_changed_while_prerendering_are_kept(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(refresh_task, "get_plugin_instance", lambda plugin_config: SlideshowPlugin())
+        task = RefreshTask(FakeConfig(str(tmp_path)), display_manager=None)
+        playlist = Playlist("Default", "00:00", "24:00", plugins=[
+            {"plugin_id": "image_upload", "name": "Photos", "plugin_settings": {"image_index": 0}, "refresh": {"interval": 60}},
+        ])
+        cycle_dt = datetime.now(pytz.utc)
+
+        plugin_instance = self.prerender_cycle(task, playlist, cycle_dt)
+        assert plugin_instance.settings["image_index"] == 1
+
+        self.prerender_cycle(task, playlist, cycle_dt + timedelta(minutes=5))
+        assert plugin_instance.settings["image_index"] == 2
+        assert task.get_prerender_stats()["used"] == 2
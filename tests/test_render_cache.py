@@ -0,0 +1,93 @@
+import os
+
+from PIL import Image
+
+from utils.render_cache import RenderCache
+
+def image(color="white", size=(40, 30)):
+    return Image.new("RGB", size, color)
+
+def touch(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    # move the mtime so a rewrite within the same timestamp tick still changes it
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+class TestRenderCache:
+
+    def test_fingerprint_covers_html_and_dimensions(self, tmp_path):
+        cache = RenderCache(str(tmp_path))
+
+        assert cache.fingerprint("<p>a</p>", (800, 480)) == cache.fingerprint("<p>a</p>", (800, 480))
+        assert cache.fingerprint("<p>a</p>", (800, 480)) != cache.fingerprint("<p>b</p>", (800, 480))
+        assert cache.fingerprint("<p>a</p>", (800, 480)) != cache.fingerprint("<p>a</p>", (480, 800))
+
+    def test_fingerprint_changes_with_referenced_assets(self, tmp_path):
+        (tmp_path / "cache").mkdir()
+        cache = RenderCache(str(tmp_path / "cache"))
+        stylesheet = tmp_path / "plugin" / "style.css"
+        touch(stylesheet, "body { color: black; }")
+        html = f'<link rel="stylesheet" href="{stylesheet}">'
+
+        before = cache.fingerprint(html, (800, 480))
+        touch(stylesheet, "body { color: red; }")
+
+        assert cache.fingerprint(html, (800, 480)) != before
+
+    def test_fingerprint_follows_relative_css_urls(self, tmp_path):
+        (tmp_path / "cache").mkdir()
+        cache = RenderCache(str(tmp_path / "cache"))
+        font = tmp_path / "plugin" / "fonts" / "Jost.ttf"
+        touch(font, "font v1")
+        stylesheet = tmp_path / "plugin" / "render" / "style.css"
+        touch(stylesheet, "@font-face { src: url('../fonts/Jost.ttf?v=1') format('truetype'); }"
+                          " body { background: url(data:image/png;base64,AAAA); }")
+        html = f'<link rel="stylesheet" href="file://{stylesheet}">'
+
+        before = cache.fingerprint(html, (800, 480))
+        touch(font, "font v2")
+
+        assert cache.fingerprint(html, (800, 480)) != before
+
+    def test_memory_and_disk_hits_and_misses(self, tmp_path):
+        cache = RenderCache(str(tmp_path))
+        assert cache.get("a") is None
+
+        cache.put("a", image())
+        assert cache.get("a").size == (40, 30)
+
+        reloaded = RenderCache(str(tmp_path))
+        assert reloaded.get("a").size == (40, 30)
+        assert reloaded.get("a") is not None
+
+        assert cache.get_stats()["misses"] == 1
+        assert cache.get_stats()["memory_hits"] == 1
+        assert reloaded.get_stats()["disk_hits"] == 1
+        assert reloaded.get_stats()["memory_hits"] == 1
+        assert reloaded.get_stats()["hit_rate"] == 1.0
+
+    def test_memory_tier_evicts_least_recently_used(self, tmp_path):
+        cache = RenderCache(str(tmp_path), max_memory_entries=2)
+        cache.put("a", image())
+        cache.put("b", image())
+        cache.get("a")
+        cache.put("c", image())
+
+        assert list(cache.memory) == ["a", "c"]
+        # b is still served from disk
+        assert cache.get("b") is not None
+        assert cache.get_stats()["disk_hits"] == 1
+
+    def test_disk_tier_evicts_least_recently_used(self, tmp_path):
+        cache = RenderCache(str(tmp_path))
+        cache.put("a", image("red"))
+        entry_bytes = cache.disk_bytes
+        cache.max_disk_bytes = entry_bytes * 2 + entry_bytes // 2
+        cache.put("b", image("green"))
+        cache.get("a")
+        cache.put("c", image("blue"))
+
+        assert list(cache.disk) == ["a", "c"]
+        assert not os.path.exists(tmp_path / "b.png")
+        assert cache.get_stats()["evictions"] == 1
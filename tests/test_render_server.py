@@ -0,0 +1,110 @@
+import time
+
+from PIL import Image
+
+from utils import image_utils
+from utils.render_server import RenderServer, RenderServerError, MAX_RENDERS_PER_PROCESS
+
+class FakeProcess:
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+class FakeBrowserServer(RenderServer):
+    """Render server with the browser process and DevTools round trips stubbed out."""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.processes = []
+
+    def _ensure_started(self):
+        if self.is_running():
+            return
+        self.process = FakeProcess()
+        self.processes.append(self.process)
+        self.renders = 0
+        self.restarts += 1
+
+    def _capture(self, url, dimensions, timeout_ms):
+        if self.failures:
+            self.failures -= 1
+            raise RenderServerError("browser crashed")
+        return Image.new("RGB", dimensions, "white")
+
+class FailingServer:
+    def screenshot(self, url, dimensions, timeout_ms=None):
+        raise RenderServerError("browser missing")
+
+class TestRenderServer:
+
+    def test_recycles_browser_after_max_renders(self):
+        server = FakeBrowserServer(idle_timeout=0)
+        for _ in range(MAX_RENDERS_PER_PROCESS):
+            server.screenshot("file:///tmp/page.html", (80, 60))
+
+        assert not server.is_running()
+        assert server.processes[0].returncode is not None
+
+        server.screenshot("file:///tmp/page.html", (80, 60))
+        assert server.restarts == 2
+        assert server.renders == 1
+
+    def test_shuts_down_when_idle(self):
+        server = FakeBrowserServer(idle_timeout=0.05)
+        server.screenshot("file:///tmp/page.html", (80, 60))
+        assert server.is_running()
+
+        deadline = time.monotonic() + 2
+        while server.is_running() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert not server.is_running()
+        assert server.idle_timer is None
+
+    def test_render_cancels_pending_idle_shutdown(self):
+        server = FakeBrowserServer(idle_timeout=0.2)
+        server.screenshot("file:///tmp/page.html", (80, 60))
+        first_timer = server.idle_timer
+        server.screenshot("file:///tmp/page.html", (80, 60))
+
+        assert first_timer.finished.is_set()
+        assert server.restarts == 1
+        server.shutdown()
+
+    def test_restarts_crashed_browser_once(self):
+        server = FakeBrowserServer(failures=1, idle_timeout=0)
+        image = server.screenshot("file:///tmp/page.html", (80, 60))
+
+        assert image.size == (80, 60)
+        assert server.restarts == 2
+
+    def test_falls_back_to_one_shot_screenshot(self, monkeypatch):
+        screenshots = []
+        def take_screenshot(target, dimensions, timeout_ms=None):
+            screenshots.append(target)
+            return Image.new("RGB", dimensions)
+
+        monkeypatch.setattr(image_utils, "get_render_server", lambda: FailingServer())
+        monkeypatch.setattr(image_utils, "take_screenshot", take_screenshot)
+        image = image_utils.take_screenshot_html("<html></html>", (80, 60))
+
+        assert image.size == (80, 60)
+        assert len(screenshots) == 1 and screenshots[0].endswith(".html")
+
+    def test_disabled_render_server_uses_one_shot_screenshot(self, monkeypatch):
+        monkeypatch.setattr(image_utils, "get_render_server", lambda: None)
+        monkeypatch.setattr(image_utils, "take_screenshot", lambda target, dimensions, timeout_ms=None: Image.new("RGB", dimensions))
+
+        assert image_utils.take_screenshot_html("<html></html>", (80, 60)).size == (80, 60)
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from src.scheduler import RefreshScheduler
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+class TestRefreshScheduler:
+
+    def test_next_deadline_is_earliest(self):
+        scheduler = RefreshScheduler()
+        scheduler.schedule(("cycle",), NOW + timedelta(minutes=30), RefreshScheduler.CYCLE)
+        scheduler.schedule(("playlist", "Day"), NOW + timedelta(minutes=10), RefreshScheduler.PLAYLIST, playlist="Day")
+
+        assert scheduler.next_deadline() == NOW + timedelta(minutes=10)
+        assert len(scheduler) == 2
+
+    def test_reschedule_replaces_previous_deadline(self):
+        scheduler = RefreshScheduler()
+        scheduler.schedule(("cycle",), NOW + timedelta(minutes=5), RefreshScheduler.CYCLE)
+        scheduler.schedule(("cycle",), NOW + timedelta(minutes=20), RefreshScheduler.CYCLE)
+
+        assert scheduler.next_deadline() == NOW + timedelta(minutes=20)
+        assert scheduler.pop_due(NOW + timedelta(minutes=10)) == []
+        assert len(scheduler) == 1
+
+    def test_schedule_none_cancels(self):
+        scheduler = RefreshScheduler()
+        scheduler.schedule(("plugin",), NOW, RefreshScheduler.PLUGIN)
+        scheduler.schedule(("plugin",), None, RefreshScheduler.PLUGIN)
+
+        assert scheduler.next_deadline() is None
+        assert len(scheduler) == 0
+
+    def test_pop_due_returns_due_entries_in_order(self):
+        scheduler = RefreshScheduler()
+        scheduler.schedule(("cycle",), NOW + timedelta(minutes=2), RefreshScheduler.CYCLE)
+        scheduler.schedule(("plugin",), NOW + timedelta(minutes=1), RefreshScheduler.PLUGIN)
+        scheduler.schedule(("playlist", "Night"), NOW + timedelta(hours=8), RefreshScheduler.PLAYLIST, playlist="Night")
+
+        due = scheduler.pop_due(NOW + timedelta(minutes=2))
+
+        assert [entry.kind for entry in due] == [RefreshScheduler.PLUGIN, RefreshScheduler.CYCLE]
+        assert scheduler.next_deadline() == NOW + timedelta(hours=8)
+
+    def test_cancel_matching(self):
+        scheduler = RefreshScheduler()
+        scheduler.schedule(("playlist", "Day"), NOW, RefreshScheduler.PLAYLIST, playlist="Day")
+        scheduler.schedule(("playlist", "Night"), NOW, RefreshScheduler.PLAYLIST, playlist="Night")
+        scheduler.schedule(("cycle",), NOW, RefreshScheduler.CYCLE)
+
+        scheduler.cancel_matching(lambda key: key[0] == RefreshScheduler.PLAYLIST)
+
+        assert [entry["kind"] for entry in scheduler.get_queue()] == [RefreshScheduler.CYCLE]
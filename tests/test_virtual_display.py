@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+from src.display.virtual_display import VirtualDisplay
+
+class FakeConfig:
+    def __init__(self, **config):
+        self.config = config
+
+    def get_config(self, key, default=None):
+        return self.config.get(key, default)
+
+    def update_value(self, key, value, write=False):
+        self.config[key] = value
+
+def frame(text="", size=(800, 480)):
+    image = Image.new("L", size, 255)
+    ImageDraw.Draw(image).text((10, 10), text, fill=0)
+    return image
+
+class TestVirtualDisplay:
+
+    def test_uses_model_resolution_and_palette(self):
+        config = FakeConfig(virtual_model="epd12in48", virtual_time_scale=0)
+        display = VirtualDisplay(config)
+
+        assert config.config["resolution"] == [1304, 984]
+        assert display.palette == "waveshare_bw"
+
+    def test_unknown_model(self):
+        with pytest.raises(ValueError):
+            VirtualDisplay(FakeConfig(virtual_model="epd0in0"))
+
+    def test_wrong_resolution_is_rejected(self):
+        display = VirtualDisplay(FakeConfig(virtual_time_scale=0))
+
+        with pytest.raises(ValueError):
+            display.display_image(frame(size=(640, 400)))
+
+    def test_partial_refreshes_until_limit(self):
+        display = VirtualDisplay(FakeConfig(virtual_model="epd7in5_V2", virtual_time_scale=0, partial_refresh_limit=2))
+
+        modes = []
+        for i in range(4):
+            display.display_image(frame(str(i)))
+            modes.append(display.last_refresh["mode"])
+
+        assert modes == ["full", "partial", "partial", "full"]
+        stats = display.get_stats()
+        assert stats["refreshes"] == 4
+        assert stats["busy_seconds"] == 2 * 4.0 + 2 * 0.5
+
+    def test_models_without_partial_refresh(self):
+        display = VirtualDisplay(FakeConfig(virtual_model="epd7in3f", virtual_time_scale=0))
+
+        display.display_image(frame("a"))
+        display.display_image(frame("b"))
+
+        assert display.get_stats()["full_refreshes"] == 2
+        assert display.get_stats()["busy_seconds"] == 70.0
+
+    def test_frames_kept_in_ring_buffer(self):
+        display = VirtualDisplay(FakeConfig(virtual_time_scale=0, virtual_frame_buffer=2))
+
+        for i in range(3):
+            display.display_image(frame(str(i)))
+
+        assert len(display.get_frames()) == 2
+
+    def test_disk_retention_is_bounded(self, tmp_path):
+        display = VirtualDisplay(FakeConfig(virtual_time_scale=0, virtual_disk_frames=2, output_dir=str(tmp_path)))
+
+        for i in range(4):
+            display.display_image(frame(str(i)))
+
+        saved = sorted(path.name for path in tmp_path.iterdir())
+        assert len(saved) == 3
+        assert "latest.png" in saved
+
+    def test_stats_are_readable_during_a_refresh(self):
+        # a full refresh of the epd7in5_V2 takes 4s, scaled to 1s
+        display = VirtualDisplay(FakeConfig(virtual_model="epd7in5_V2", virtual_time_scale=0.25))
+        push = threading.Thread(target=display.display_image, args=(frame("a"),))
+        push.start()
+        while not display.is_busy():
+            time.sleep(0.01)
+
+        start = time.monotonic()
+        stats = display.get_stats()
+        frames = display.get_frames()
+        assert time.monotonic() - start < 0.5
+        assert display.is_busy()
+        assert stats["refreshes"] == 0
+        assert frames == []
+
+        push.join()
+        assert display.get_stats()["refreshes"] == 1
@@ -0,0 +1,192 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from display.buffer_packing import pack_pixels
+from display.waveshare_display import WaveshareDisplay
+from utils.image_utils import quantize_image
+
+def bwr_frame():
+    frame = Image.new("RGB", (16, 4), "white")
+    for x in range(4):
+        frame.putpixel((x, 0), (0, 0, 0))
+        frame.putpixel((x, 1), (255, 0, 0))
+    return quantize_image(frame, "waveshare_bwr", "none")
+
+class TestSplitColorPlanes:
+
+    def setup_method(self):
+        # split_color_planes does not depend on the driver
+        self.display = WaveshareDisplay.__new__(WaveshareDisplay)
+
+    def test_quantized_frame_is_split_by_palette_index(self):
+        black_image, color_image = self.display.split_color_planes(bwr_frame())
+
+        black, color = np.asarray(black_image), np.asarray(color_image)
+        assert black_image.mode == color_image.mode == "1"
+        # a cleared bit is drawn, black on the black plane and red on the colour plane
+        assert not black[0, :4].any() and black[1:].all() and black[0, 4:].all()
+        assert not color[1, :4].any() and color[0].all() and color[2:].all()
+
+    def test_two_colour_palette_has_no_colour_plane(self):
+        frame = quantize_image(Image.new("RGB", (16, 4), "white"), "waveshare_bw", "none")
+        black_image, color_image = self.display.split_color_planes(frame)
+
+        assert color_image is None
+        assert black_image.mode == "RGB"
+
+    def test_unquantized_frame_has_no_colour_plane(self):
+        frame = Image.new("RGB", (16, 4), "white")
+        assert self.display.split_color_planes(frame) == (frame, None)
+
+
+class FakeEPD:
+    """Records the calls a Waveshare driver gets, the refresh methods are added per panel."""
+
+    width = 64
+    height = 32
+
+    def __init__(self):
+        self.calls = []
+
+    def init(self):
+        self.calls.append(("init",))
+
+    def Clear(self):
+        self.calls.append(("Clear",))
+
+    def getbuffer(self, image):
+        assert image.size == (self.width, self.height)
+        return bytearray(image.convert("1").tobytes())
+
+    def display(self, image):
+        self.calls.append(("display", bytes(image)))
+
+    def sleep(self):
+        self.calls.append(("sleep",))
+
+class WindowedEPD(FakeEPD):
+    def init_part(self):
+        self.calls.append(("init_part",))
+
+    def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
+        # the buffer only holds the window, (Xend - Xstart) / 8 bytes per row
+        assert len(Image) == (Xend - Xstart) // 8 * (Yend - Ystart)
+        self.calls.append(("display_Partial", bytes(Image), Xstart, Ystart, Xend, Yend))
+
+class PartialEPD(FakeEPD):
+    def displayPartBaseImage(self, image):
+        self.calls.append(("displayPartBaseImage", bytes(image)))
+
+    def displayPartial(self, image):
+        self.calls.append(("displayPartial", bytes(image)))
+
+class FastEPD(FakeEPD):
+    def init_fast(self):
+        self.calls.append(("init_fast",))
+
+    def display_fast(self, image):
+        self.calls.append(("display_fast", bytes(image)))
+
+class UnknownPartialEPD(FakeEPD):
+    def display_Partial(self, image, duration, mode, retries, delay):
+        self.calls.append(("display_Partial",))
+
+class FakeConfig:
+    def __init__(self, **config):
+        self.config = {"resolution": [64, 32], **config}
+
+    def get_config(self, key, default=None):
+        return self.config.get(key, default)
+
+def load_display(monkeypatch, epd_class):
+    display_type = f"epd9in9_{epd_class.__name__.lower()}"
+    module = types.ModuleType(display_type)
+    module.EPD = epd_class
+    monkeypatch.setitem(sys.modules, f"display.waveshare_epd.{display_type}", module)
+    return WaveshareDisplay(FakeConfig(display_type=display_type))
+
+def panel_frame(boxes=()):
+    frame = Image.new("RGB", (64, 32), "white")
+    draw = ImageDraw.Draw(frame)
+    for box in boxes:
+        draw.rectangle(box, fill="black")
+    return quantize_image(frame, "waveshare_bw", "none")
+
+def calls(display, name):
+    return [call for call in display.epd_display.calls if call[0] == name]
+
+class TestRefreshModes:
+
+    def test_windowed_partial_refresh_sends_window_buffers(self, monkeypatch):
+        display = load_display(monkeypatch, WindowedEPD)
+        assert display.display_window and not display.display_partial
+
+        display.display_image(panel_frame())
+        changed = panel_frame([(10, 4, 13, 5)])
+        display.display_image(changed)
+
+        assert display.last_refresh["mode"] == "partial"
+        assert calls(display, "init_part") == [("init_part",)]
+        (_, buffer, *box), = calls(display, "display_Partial")
+        assert box == [8, 4, 16, 6]
+        expected = pack_pixels(np.asarray(changed)[4:6, 8:16], 1)
+        assert buffer == bytes(expected) == bytes([0b11000011, 0b11000011])
+
+    def test_windowed_partial_refresh_of_unquantized_frames(self, monkeypatch):
+        display = load_display(monkeypatch, WindowedEPD)
+        display.display_image(Image.new("L", (64, 32), 255))
+        changed = Image.new("L", (64, 32), 255)
+        changed.putpixel((17, 20), 0)
+        display.display_image(changed)
+
+        (_, buffer, *box), = calls(display, "display_Partial")
+        assert box == [16, 20, 24, 21]
+        assert buffer == bytes([0b10111111])
+
+    def test_full_frame_partial_refresh_keeps_the_base_image(self, monkeypatch):
+        display = load_display(monkeypatch, PartialEPD)
+        assert display.display_partial and not display.display_window
+
+        display.display_image(panel_frame())
+        inits = len(calls(display, "init"))
+        changed = panel_frame([(10, 4, 13, 5)])
+        display.display_image(changed)
+
+        assert display.last_refresh["mode"] == "partial"
+        assert len(calls(display, "displayPartBaseImage")) == 1
+        # a full init between the base image and the partial refresh would reset the base image
+        assert len(calls(display, "init")) == inits
+        assert calls(display, "displayPartial") == [("displayPartial", bytes(pack_pixels(np.asarray(changed), 1)))]
+
+    def test_fast_refresh(self, monkeypatch):
+        display = load_display(monkeypatch, FastEPD)
+        display.display_image(panel_frame())
+        display.display_image(panel_frame([(10, 4, 13, 5)]))
+
+        assert display.last_refresh["mode"] == "fast"
+        assert calls(display, "init_fast") == [("init_fast",)]
+        assert len(calls(display, "display_fast")[0][1]) == 64 // 8 * 32
+
+    def test_unknown_partial_signature_is_not_used(self, monkeypatch):
+        display = load_display(monkeypatch, UnknownPartialEPD)
+        assert not display.display_window and not display.display_partial
+
+        display.display_image(panel_frame())
+        display.display_image(panel_frame([(10, 4, 13, 5)]))
+
+        assert display.last_refresh["mode"] == "full"
+        assert not calls(display, "display_Partial")
+
+    @pytest.mark.parametrize("epd_class", [WindowedEPD, PartialEPD, FastEPD])
+    def test_full_refresh_after_partial_refresh_limit(self, monkeypatch, epd_class):
+        display = load_display(monkeypatch, epd_class)
+        display.device_config.config["partial_refresh_limit"] = 1
+        display.display_image(panel_frame())
+        display.display_image(panel_frame([(10, 4, 13, 5)]))
+        display.display_image(panel_frame([(30, 4, 33, 5)]))
+
+        assert display.last_refresh["mode"] == "full"
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from PIL import Image
+
+from plugins.base_plugin import base_plugin
+from plugins.weather import weather
+from plugins.weather.weather import Weather
+
+WEATHER_DATA = {
+    "timezone": "UTC",
+    "current": {"dt": 1714550400, "weather": [{"icon": "01d"}], "temp": 18.4, "feels_like": 17.9, "sunrise": 1714537800,
+                "sunset": 1714590000, "wind_speed": 3.1, "humidity": 60, "pressure": 1015, "uvi": 4.2, "visibility": 10000},
+    "daily": [],
+    "hourly": []
+}
+
+class FakeConfig:
+    def load_env_key(self, key):
+        return "secret"
+
+    def get_config(self, key=None, default=None):
+        return {"timezone": "UTC", "time_format": "24h"}.get(key, default)
+
+    def get_resolution(self):
+        return (800, 480)
+
+class TestOptionalFetches:
+
+    def setup_method(self):
+        self.plugin = Weather({"id": "weather"})
+        self.rendered = []
+
+    def render_image(self, dimensions, html_file, css_file=None, template_params={}):
+        self.rendered.append(template_params)
+        return Image.new("RGB", dimensions)
+
+    @pytest.fixture(autouse=True)
+    def fetch_without_store(self, monkeypatch):
+        monkeypatch.setattr(base_plugin, "get_data_store", lambda: None)
+        monkeypatch.setattr(self.plugin, "render_image", self.render_image)
+        monkeypatch.setattr(self.plugin, "get_weather_data", lambda api_key, units, lat, long: WEATHER_DATA)
+
+    def generate(self, **settings):
+        return self.plugin.generate_image({"latitude": "52.52", "longitude": "13.40", "units": "metric", **settings}, FakeConfig())
+
+    def labels(self):
+        return [data_point["label"] for data_point in self.rendered[-1]["data_points"]]
+
+    def test_air_quality_and_location(self, monkeypatch):
+        monkeypatch.setattr(self.plugin, "get_air_quality", lambda api_key, lat, long: {"list": [{"main": {"aqi": 2}}]})
+        monkeypatch.setattr(self.plugin, "get_location", lambda api_key, lat, long: "Berlin, Berlin")
+
+        self.generate(latitude="52.5201")
+
+        assert "Air Quality" in self.labels()
+        assert self.rendered[-1]["title"] == "Berlin, Berlin"
+
+    def test_failing_air_quality_and_location_are_left_out(self, monkeypatch):
+        def fail(*args):
+            raise RuntimeError("offline")
+        monkeypatch.setattr(self.plugin, "get_air_quality", fail)
+        monkeypatch.setattr(self.plugin, "get_location", fail)
+
+        self.generate(customTitle="Home")
+
+        assert "Air Quality" not in self.labels()
+        assert "Wind" in self.labels()
+        assert self.rendered[-1]["title"] == "Home"
+
+    def test_air_quality_past_the_deadline_is_left_out(self, monkeypatch):
+        monkeypatch.setattr(weather, "FETCH_DEADLINE", 0.2)
+        monkeypatch.setattr(self.plugin, "get_air_quality", lambda api_key, lat, long: time.sleep(1) or {"list": [{"main": {"aqi": 2}}]})
+
+        started = time.monotonic()
+        self.generate(titleSelection="custom", customTitle="Home")
+
+        assert time.monotonic() - started < 1
+        assert "Air Quality" not in self.labels()
+
+    def test_failing_weather_fails_the_refresh(self, monkeypatch):
+        def fail(*args):
+            raise RuntimeError("offline")
+        monkeypatch.setattr(self.plugin, "get_weather_data", fail)
+        monkeypatch.setattr(self.plugin, "get_air_quality", lambda api_key, lat, long: {"list": [{"main": {"aqi": 2}}]})
+
+        with pytest.raises(RuntimeError):
+            self.generate(titleSelection="custom")
+        assert not self.rendered